@@ -0,0 +1,51 @@
+"""Add job queue table.
+
+Revision ID: 4b1f0c7d9e21
+Revises: d2132ce05cf8
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '4b1f0c7d9e21'
+down_revision = 'd2132ce05cf8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('kind', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('status', sa.Enum('QUEUED', 'RUNNING', 'SUCCEEDED', 'FAILED', name='jobstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(length=2048), nullable=True),
+    sa.Column('document_id', sa.Uuid(), nullable=True),
+    sa.Column('run_after', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('locked_by', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True),
+    sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_job_kind'), 'job', ['kind'], unique=False)
+    op.create_index(op.f('ix_job_status'), 'job', ['status'], unique=False)
+    op.create_index(op.f('ix_job_document_id'), 'job', ['document_id'], unique=False)
+    # Partial index used by the worker when polling for due jobs
+    op.create_index('ix_job_due', 'job', ['run_after'], unique=False, postgresql_where=sa.text("status = 'QUEUED'"))
+
+
+def downgrade():
+    op.drop_index('ix_job_due', table_name='job')
+    op.drop_index(op.f('ix_job_document_id'), table_name='job')
+    op.drop_index(op.f('ix_job_status'), table_name='job')
+    op.drop_index(op.f('ix_job_kind'), table_name='job')
+    op.drop_table('job')
+    sa.Enum(name='jobstatus').drop(op.get_bind(), checkfirst=True)
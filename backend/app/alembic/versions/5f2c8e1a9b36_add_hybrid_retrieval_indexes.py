@@ -0,0 +1,38 @@
+"""Add hybrid retrieval indexes and course settings.
+
+Revision ID: 5f2c8e1a9b36
+Revises: e4a9b2d6f813
+Create Date: 2026-10-18 13:48:20.504117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2c8e1a9b36'
+down_revision = 'e4a9b2d6f813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('course', sa.Column('retrieval_top_k', sa.Integer(), nullable=True))
+    op.add_column('course', sa.Column('retrieval_vector_weight', sa.Float(), nullable=True))
+    op.add_column('course', sa.Column('retrieval_lexical_weight', sa.Float(), nullable=True))
+    op.create_index(op.f('ix_chunk_course_id'), 'chunk', ['course_id'], unique=False)
+    op.create_index(
+        'ix_chunk_text_content_tsv',
+        'chunk',
+        [sa.text("to_tsvector('english', text_content)")],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade():
+    op.drop_index('ix_chunk_text_content_tsv', table_name='chunk')
+    op.drop_index(op.f('ix_chunk_course_id'), table_name='chunk')
+    op.drop_column('course', 'retrieval_lexical_weight')
+    op.drop_column('course', 'retrieval_vector_weight')
+    op.drop_column('course', 'retrieval_top_k')
@@ -0,0 +1,32 @@
+"""Add embedding cache table.
+
+Revision ID: 8d3e5a1c2b47
+Revises: 4b1f0c7d9e21
+Create Date: 2026-10-18 11:04:27.552190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3e5a1c2b47'
+down_revision = '4b1f0c7d9e21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('embeddingcache',
+    sa.Column('content_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+    sa.Column('model', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+    sa.Column('dimension', sa.Integer(), nullable=False),
+    sa.Column('embedding', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.PrimaryKeyConstraint('content_hash')
+    )
+
+
+def downgrade():
+    op.drop_table('embeddingcache')
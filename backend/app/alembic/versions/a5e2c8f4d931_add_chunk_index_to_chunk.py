@@ -0,0 +1,30 @@
+"""Add chunk index to chunk.
+
+Revision ID: a5e2c8f4d931
+Revises: f1c8d3a5b697
+Create Date: 2026-10-19 10:14:36.207815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5e2c8f4d931'
+down_revision = 'f1c8d3a5b697'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows stay NULL: their created_at order is not document order
+    op.add_column('chunk', sa.Column('chunk_index', sa.Integer(), nullable=True))
+    op.create_index(
+        'ix_chunk_document_id_chunk_index', 'chunk', ['document_id', 'chunk_index'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_chunk_document_id_chunk_index', table_name='chunk')
+    op.drop_column('chunk', 'chunk_index')
@@ -0,0 +1,24 @@
+"""Add token count to chat.
+
+Revision ID: a7e3c5d1f482
+Revises: 5f2c8e1a9b36
+Create Date: 2026-10-18 15:02:44.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e3c5d1f482'
+down_revision = '5f2c8e1a9b36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('chat', sa.Column('token_count', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('chat', 'token_count')
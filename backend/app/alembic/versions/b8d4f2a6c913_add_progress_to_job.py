@@ -0,0 +1,25 @@
+"""Add progress to job.
+
+Revision ID: b8d4f2a6c913
+Revises: a7e3c5d1f482
+Create Date: 2026-10-18 15:41:12.904317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d4f2a6c913'
+down_revision = 'a7e3c5d1f482'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('job', sa.Column('progress', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade():
+    op.drop_column('job', 'progress')
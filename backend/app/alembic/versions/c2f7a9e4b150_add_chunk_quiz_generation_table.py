@@ -0,0 +1,45 @@
+"""Add chunk quiz generation watermark table.
+
+Revision ID: c2f7a9e4b150
+Revises: b8d4f2a6c913
+Create Date: 2026-10-18 16:10:37.552081
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2f7a9e4b150'
+down_revision = 'b8d4f2a6c913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('chunkquizgeneration',
+    sa.Column('chunk_id', sa.Uuid(), nullable=False),
+    sa.Column('difficulty_level', postgresql.ENUM('EASY', 'MEDIUM', 'HARD', 'EXPERT', 'ALL', name='difficulty_level_enum', create_type=False), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.ForeignKeyConstraint(['chunk_id'], ['chunk.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('chunk_id', 'difficulty_level')
+    )
+    # Documents that already have quizzes of a level count as done for it,
+    # so the next upload doesn't regenerate them
+    op.execute(
+        """
+        INSERT INTO chunkquizgeneration (chunk_id, difficulty_level)
+        SELECT chunk.id, generated.difficulty_level
+        FROM chunk
+        JOIN (
+            SELECT DISTINCT document_id, difficulty_level
+            FROM quiz
+            WHERE difficulty_level IS NOT NULL
+        ) AS generated ON generated.document_id = chunk.document_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('chunkquizgeneration')
@@ -0,0 +1,24 @@
+"""Add embedding to chat.
+
+Revision ID: c61f2e9a7d05
+Revises: 8d3e5a1c2b47
+Create Date: 2026-10-18 12:21:09.640771
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c61f2e9a7d05'
+down_revision = '8d3e5a1c2b47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('chat', sa.Column('embedding', sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('chat', 'embedding')
@@ -0,0 +1,36 @@
+"""Add last_used_at to embeddingcache.
+
+Revision ID: c7d2f9a4e610
+Revises: a5e2c8f4d931
+Create Date: 2026-10-20 09:41:12.318406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2f9a4e610'
+down_revision = 'a5e2c8f4d931'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing entries start their TTL now
+    op.add_column(
+        'embeddingcache',
+        sa.Column(
+            'last_used_at', sa.DateTime(),
+            server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False,
+        ),
+    )
+    op.create_index(
+        op.f('ix_embeddingcache_last_used_at'), 'embeddingcache', ['last_used_at'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(op.f('ix_embeddingcache_last_used_at'), table_name='embeddingcache')
+    op.drop_column('embeddingcache', 'last_used_at')
@@ -0,0 +1,24 @@
+"""Add token count to chunk.
+
+Revision ID: d4a1b7c9e352
+Revises: c2f7a9e4b150
+Create Date: 2026-10-18 19:21:07.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a1b7c9e352'
+down_revision = 'c2f7a9e4b150'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('chunk', sa.Column('token_count', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('chunk', 'token_count')
@@ -0,0 +1,58 @@
+"""Add chunkembedding pgvector table.
+
+Revision ID: e4a9b2d6f813
+Revises: c61f2e9a7d05
+Create Date: 2026-10-18 13:05:42.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a9b2d6f813'
+down_revision = 'c61f2e9a7d05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    available = conn.execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'vector'")
+    ).scalar()
+    if not available:
+        # Only VECTOR_STORE=pgvector uses the table; PgVectorStore creates it
+        # on first use if pgvector is installed later
+        if settings.VECTOR_STORE == 'pgvector':
+            raise RuntimeError(
+                'VECTOR_STORE=pgvector requires the pgvector extension on the '
+                'database server (e.g. the pgvector/pgvector Postgres image)'
+            )
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS vector')
+    op.create_table('chunkembedding',
+    sa.Column('chunk_id', sa.Uuid(), nullable=False),
+    sa.Column('course_id', sa.Uuid(), nullable=False),
+    sa.Column('document_id', sa.Uuid(), nullable=False),
+    sa.PrimaryKeyConstraint('chunk_id')
+    )
+    op.execute('ALTER TABLE chunkembedding ADD COLUMN embedding vector(1536) NOT NULL')
+    op.create_index(op.f('ix_chunkembedding_course_id'), 'chunkembedding', ['course_id'], unique=False)
+    op.create_index(op.f('ix_chunkembedding_document_id'), 'chunkembedding', ['document_id'], unique=False)
+    # Approximate nearest-neighbour index for cosine distance (<=>)
+    op.execute(
+        'CREATE INDEX ix_chunkembedding_embedding ON chunkembedding '
+        'USING hnsw (embedding vector_cosine_ops)'
+    )
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('chunkembedding'):
+        return
+    op.drop_index('ix_chunkembedding_embedding', table_name='chunkembedding')
+    op.drop_index(op.f('ix_chunkembedding_document_id'), table_name='chunkembedding')
+    op.drop_index(op.f('ix_chunkembedding_course_id'), table_name='chunkembedding')
+    op.drop_table('chunkembedding')
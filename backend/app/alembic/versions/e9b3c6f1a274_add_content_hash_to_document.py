@@ -0,0 +1,27 @@
+"""Add content hash to document.
+
+Revision ID: e9b3c6f1a274
+Revises: d4a1b7c9e352
+Create Date: 2026-10-18 20:04:51.119376
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9b3c6f1a274'
+down_revision = 'd4a1b7c9e352'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('document', sa.Column('content_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+    op.create_index(op.f('ix_document_content_hash'), 'document', ['content_hash'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_document_content_hash'), table_name='document')
+    op.drop_column('document', 'content_hash')
@@ -0,0 +1,33 @@
+"""Add MinHash signature and near-duplicate link to chunk.
+
+Revision ID: f1c8d3a5b697
+Revises: e9b3c6f1a274
+Create Date: 2026-10-18 21:37:12.905518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c8d3a5b697'
+down_revision = 'e9b3c6f1a274'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('chunk', sa.Column('minhash', sa.LargeBinary(), nullable=True))
+    op.add_column('chunk', sa.Column('duplicate_of', sa.Uuid(), nullable=True))
+    op.create_foreign_key(
+        'chunk_duplicate_of_fkey', 'chunk', 'chunk', ['duplicate_of'], ['id'],
+        ondelete='SET NULL',
+    )
+    op.create_index(op.f('ix_chunk_duplicate_of'), 'chunk', ['duplicate_of'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_chunk_duplicate_of'), table_name='chunk')
+    op.drop_constraint('chunk_duplicate_of_fkey', 'chunk', type_='foreignkey')
+    op.drop_column('chunk', 'duplicate_of')
+    op.drop_column('chunk', 'minhash')
@@ -4,7 +4,7 @@ from collections.abc import AsyncGenerator
 from fastapi import APIRouter
 from fastapi.responses import StreamingResponse
 
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import AsyncSessionDep, CurrentUser
 from app.schemas.public import ChatPublic, ChatMessage
 from app.services.chat_db import (
     create_greeting_if_needed,
@@ -18,7 +18,6 @@ router = APIRouter(prefix="/chat", tags=["chat"])
 async def generate_chat_response(
     question: str,
     course_id: uuid.UUID,
-    session: SessionDep,
     current_user: CurrentUser,
     continue_response: bool = False,
 ) -> AsyncGenerator[str, None]:
@@ -28,12 +27,12 @@ async def generate_chat_response(
     try:
         if continue_response:
             # Delegate to continuation handler
-            async for chunk in handle_continuation(course_id, session, current_user):
+            async for chunk in handle_continuation(course_id, current_user):
                 yield chunk
         else:
             # Delegate to regular question handler
             async for chunk in handle_regular_question(
-                question, course_id, session, current_user
+                question, course_id, current_user
             ):
                 yield chunk
 
@@ -55,7 +54,6 @@ async def generate_chat_response(
 async def stream_chat(
     course_id: uuid.UUID,
     chat: ChatMessage,
-    session: SessionDep,
     current_user: CurrentUser,
 ) -> StreamingResponse:
     """
@@ -67,12 +65,14 @@ async def stream_chat(
 
     Returns:
         Streaming response of AI-generated content
+
+    The generator opens its own short-lived sessions (see chat_service), so
+    no connection is held for the duration of the stream.
     """
     return StreamingResponse(
         generate_chat_response(
             chat.message,
             course_id,
-            session,
             current_user,
             chat.continue_response,
         ),
@@ -98,7 +98,7 @@ async def stream_chat(
 )
 async def get_chat_history(
     course_id: uuid.UUID,
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: CurrentUser,
     limit: int = 50,
 ) -> list[ChatPublic]:
@@ -113,14 +113,14 @@ async def get_chat_history(
         List of chat messages ordered by creation date, empty list if none found
     """
     # Verify course exists and user has access
-    course = verify_course_access(course_id, session, current_user)
+    course = await verify_course_access(course_id, session, current_user)
 
     # Get existing messages
-    messages = get_all_messages(course_id, session, limit)
+    messages = await get_all_messages(course_id, session, limit)
 
     # Generate Athena greeting if no messages exist
     if not messages:
-        greeting = create_greeting_if_needed(course, session)
+        greeting = await create_greeting_if_needed(course, session)
         if greeting:
             return [greeting]
         else:
@@ -6,15 +6,14 @@ from http import HTTPStatus
 from random import shuffle
 from typing import Annotated, Any, cast
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy import desc
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import QueryableAttribute, selectinload
 from sqlalchemy.sql import and_, text
 from sqlmodel import func, select
 
-from app.api.deps import CurrentUser, SessionDep
-from app.llm_clients.openai_client import INDEX_NAME
+from app.api.deps import AsyncSessionDep, CurrentUser, SessionDep
 from app.models.common import Message
 from app.models.course import (
     Course,
@@ -39,6 +38,7 @@ from app.schemas.public import (
     QuizzesPublic,
 )
 from app.services.courses import generate_flashcards_from_text, get_retrieved_docs
+from app.services.vector_store import course_namespaces, get_vector_store
 from app.tasks import (
     fetch_and_format_quizzes,
     select_quizzes_by_course_criteria,
@@ -155,9 +155,25 @@ def update_course(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def delete_course_embeddings_task(
+    course_id: uuid.UUID, namespaces: list[str | None]
+) -> None:
+    """Background task to delete a course's embeddings from the vector store."""
+    store = get_vector_store()
+    for namespace in namespaces:
+        try:
+            store.delete(filter={"course_id": str(course_id)}, namespace=namespace)
+        except Exception as e:
+            logger.error(f"Failed to delete embeddings for course {course_id}: {e}")
+
+
 @router.delete("/{id}", response_model=Message)
 def delete_course(
-    *, session: SessionDep, current_user: CurrentUser, id: uuid.UUID
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,
+    background_tasks: BackgroundTasks,
 ) -> Any:
     """
     Delete an course.
@@ -167,6 +183,8 @@ def delete_course(
         raise HTTPException(status_code=404, detail="Course not found")
     if not current_user.is_superuser and (course.owner_id != current_user.id):
         raise HTTPException(status_code=400, detail="Not enough permissions")
+    # Looked up before the documents are gone
+    background_tasks.add_task(delete_course_embeddings_task, id, course_namespaces(id))
     session.delete(course)
     session.commit()
     return {"message": "Course deleted successfully"}
@@ -174,7 +192,7 @@ def delete_course(
 
 @router.get("/{id}/documents", response_model=list[dict[str, Any]])
 async def list_documents(
-    id: str, session: SessionDep, skip: int = 0, limit: int = 100
+    id: str, session: AsyncSessionDep, skip: int = 0, limit: int = 100
 ) -> list[dict[str, Any]]:  # type: ignore
     """
     List documents for a specific course.
@@ -182,7 +200,7 @@ async def list_documents(
     statement = (
         select(Document).where(Document.course_id == id).offset(skip).limit(limit)
     )
-    documents = session.exec(statement).all()
+    documents = (await session.exec(statement)).all()
     return [
         {
             "id": str(doc.id),
@@ -428,7 +446,7 @@ def get_quiz_stats(
 @router.get("/{id}/flashcards", response_model=list[QAItem])
 async def generate_flashcards_by_course_id(
     id: uuid.UUID,
-    session: SessionDep,
+    session: AsyncSessionDep,
     current_user: CurrentUser,
 ) -> list[QAItem]:
     """
@@ -438,7 +456,7 @@ async def generate_flashcards_by_course_id(
     statement = (
         select(Course).where(Course.id == id).options(selectinload(Course.owner))
     )
-    course = session.exec(statement).first()
+    course = (await session.exec(statement)).first()
 
     if not course:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Course not found")
@@ -452,7 +470,7 @@ async def generate_flashcards_by_course_id(
         .order_by(Document.created_at.desc())
         .limit(1)
     )
-    document = session.exec(latest_doc_stmt).first()
+    document = (await session.exec(latest_doc_stmt)).first()
 
     if not document:
         raise HTTPException(
@@ -462,7 +480,7 @@ async def generate_flashcards_by_course_id(
 
     try:
         retrieved_texts = await get_retrieved_docs(
-            document_id=document.id, index_name=INDEX_NAME, query=PROMPT
+            document_id=document.id, query=PROMPT
         )
     except ConnectionError as exc:
         raise HTTPException(status_code=HTTPStatus.SERVICE_UNAVAILABLE, detail=str(exc))
@@ -1,191 +1,92 @@
 import asyncio
+import contextlib
+import hashlib
 import os
 
 # import shutil
-import tempfile
 import uuid
-from asyncio.log import logger
-from datetime import datetime, timezone
 from typing import Any
 
-import aiofiles
-import openai
 from fastapi import APIRouter, BackgroundTasks, File, Form, HTTPException, UploadFile
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from pinecone import Pinecone, ServerlessSpec
-from pypdf import PdfReader
 from sqlalchemy.orm import selectinload
 from sqlmodel import select
 
 from app.api.deps import CurrentUser, SessionDep
+from app.core.config import settings
 from app.models.common import Message
 from app.models.course import Course
 from app.models.document import Document
-from app.models.embeddings import Chunk
-from app.schemas.public import DocumentStatus
-from app.tasks import generate_quizzes_task
+from app.schemas.public import JobPublic
+from app.services.bulk_insert import bulk_insert
+from app.services.chunk_dedup import promote_duplicates
+from app.services.embeddings import delete_embeddings_task
+from app.services.job_queue import PROCESS_PDF_JOB, enqueue_job, get_document_jobs
 
 router = APIRouter(prefix="/documents", tags=["documents"])
-index_name = "developer-quickstart-py"
 
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-PINECONE_ENV_NAME = os.getenv("PINECONE_ENV_NAME")
-EMBEDDING_MODEL = "text-embedding-3-small"
-
-EXPECTED_DIMENSION = 1536
 MAX_FILES = 10
 MAX_FILE_SIZE_MB = 25
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+UPLOAD_BLOCK_BYTES = 1024 * 1024
+# PDF readers accept the header anywhere in the first KiB
+PDF_MAGIC = b"%PDF-"
+PDF_HEADER_WINDOW = 1024
 
-pc = Pinecone(api_key=PINECONE_API_KEY, environment=PINECONE_ENV_NAME)
-
-task_status: dict[str, str] = {}
-
-async_openai_client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-
-def ensure_index_exists():
-    """Ensure Pinecone index exists with the correct dimension, recreate if wrong."""
-    if pc.has_index(index_name):
-        existing = pc.describe_index(index_name)
-        if existing.dimension != EXPECTED_DIMENSION:
-            pc.delete_index(index_name)
-            pc.create_index(
-                name=index_name,
-                dimension=EXPECTED_DIMENSION,
-                metric="cosine",
-                spec=ServerlessSpec(cloud="aws", region="us-east-1"),
-            )
-    else:
-        pc.create_index(
-            name=index_name,
-            dimension=EXPECTED_DIMENSION,
-            metric="cosine",
-            spec=ServerlessSpec(cloud="aws", region="us-east-1"),
-        )
-
-
-def chunk_text(text: str):
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        separators=["\n\n", "\n", ".", "!", "?", " ", ""],
-    )
-    return splitter.split_text(text)
-
-
-async def embed_chunks(chunks: list[str]) -> list[list[float]]:
-    try:
-        # Use the asynchronous client
-        response = await async_openai_client.embeddings.create(
-            input=chunks,
-            model=EMBEDDING_MODEL,
-        )
-        return [item.embedding for item in response.data]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Embedding generation failed: {e}")
-
-
-async def process_pdf_task(
-    file_path: str, document_id: uuid.UUID, course_id: uuid.UUID, session: SessionDep
-):
-    """Background task to parse, chunk, embed, and store PDF."""
-    document = session.get(Document, document_id)
-    if not document:
-        return
 
+def spool_upload(file: UploadFile, path: str) -> str:
+    """
+    Copy an upload to `path` in large blocks, rejecting it as soon as it
+    exceeds the size limit or turns out not to be a PDF; returns the sha256
+    of the content. Blocking, so run it on a worker thread. A rejected upload
+    leaves no file behind.
+
+    The request body is already spooled by Starlette, but its rolled-over
+    temporary file has no name and can't be linked elsewhere, so it is
+    copied in the same pass that hashes and validates it.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    file.file.seek(0)
     try:
-        ensure_index_exists()
-        index = pc.Index(index_name)
-
-        document.status = DocumentStatus.PROCESSING
-        session.add(document)
-        session.commit()
-
-        with open(file_path, "rb") as f:
-            reader = PdfReader(f)
-            full_text = "\n".join(
-                [page.extract_text() for page in reader.pages if page.extract_text()]
-            )
-
-        if not full_text.strip():
-            document.status = DocumentStatus.FAILED
-            session.add(document)
-            session.commit()
-            return
-
-        chunks = chunk_text(full_text)
-
-        chunk_records = []
-        for chunk in chunks:
-            chunk_record = Chunk(
-                document_id=document_id,
-                text_content=chunk,
-                embedding_id=uuid.uuid4().hex,
-                course_id=course_id,
+        with open(path, "wb") as target:
+            while block := file.file.read(UPLOAD_BLOCK_BYTES):
+                if not size and PDF_MAGIC not in block[:PDF_HEADER_WINDOW]:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File '{file.filename}' is not a valid PDF.",
+                    )
+                size += len(block)
+                if size > MAX_FILE_SIZE_BYTES:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File '{file.filename}' exceeds the {MAX_FILE_SIZE_MB}MB size limit.",
+                    )
+                digest.update(block)
+                target.write(block)
+        if not size:
+            raise HTTPException(
+                status_code=400, detail=f"File '{file.filename}' is empty."
             )
-            session.add(chunk_record)
-            chunk_records.append(chunk_record)
-        session.commit()
-        logger.info(f"Chunks length {len(chunks)}")
-        embeddings = []
-        BATCH_SIZE = 50
-        for i in range(0, len(chunks), BATCH_SIZE):
-            batch = chunks[i : i + BATCH_SIZE]
-            embeddings.extend(await embed_chunks(batch))
-            await asyncio.sleep(0)
-
-        vectors_to_upsert = []
-
-        for i, (record, embedding) in enumerate(
-            zip(chunk_records, embeddings, strict=False)
-        ):
-            embedding_uuid = str(uuid.uuid4())
-            record.embedding_id = embedding_uuid
-            _vector = {
-                "id": embedding_uuid,
-                "values": embedding,
-                "metadata": {
-                    "course_id": str(course_id),
-                    "document_id": str(document_id),
-                    "chunk_id": str(record.id),
-                    "text": record.text_content,
-                    "chunk_index": i,
-                },
-            }
-            vectors_to_upsert.append(_vector)
-
-        session.commit()
-
-        index = pc.Index(index_name)
-        index.upsert(vectors=vectors_to_upsert)
-
-        document.updated_at = datetime.now(timezone.utc)
-        document.status = DocumentStatus.COMPLETED
-        document.chunk_count = len(chunks)
-        session.add(document)
-        session.commit()
-
-        await generate_quizzes_task(document_id, course_id, session)
-
-    except Exception as e:
-        logger.error(f"[process_pdf_task] Error processing document: {e}")
-        document.status = DocumentStatus.FAILED
-        session.add(document)
-        session.commit()
-    finally:
-        os.remove(file_path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        raise
+    return digest.hexdigest()
 
 
 @router.post("/process")
 async def process_multiple_documents(
     session: SessionDep,
-    background_tasks: BackgroundTasks,
     files: list[UploadFile] = File(...),
     course_id: uuid.UUID = Form(...),
 ):
     """
-    Accept multiple PDF uploads, save to temp files, and queue a background task for each.
+    Accept multiple PDF uploads, save them to the shared upload directory,
+    and queue a durable processing job for each.
+
+    Files are spooled concurrently and validated while they stream; if any
+    is rejected none are kept. The Document rows and jobs are then written
+    in one transaction.
     """
     if len(files) > MAX_FILES:
         raise HTTPException(
@@ -193,8 +94,6 @@ async def process_multiple_documents(
             detail=f"You can only upload a maximum of {MAX_FILES} files at a time.",
         )
 
-    results = []
-
     for file in files:
         if file.content_type != "application/pdf":
             raise HTTPException(
@@ -208,37 +107,74 @@ async def process_multiple_documents(
                 detail=f"File '{file.filename}' exceeds the {MAX_FILE_SIZE_MB}MB size limit.",
             )
 
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    documents = []
+    for file in files:
         filename_str = file.filename if file.filename is not None else ""
         title_without_extension = os.path.splitext(filename_str)[0]
-
-        db_document = Document(
-            title=(title_without_extension or "").capitalize(),
-            filename=filename_str,
-            course_id=course_id,
+        documents.append(
+            Document(
+                title=(title_without_extension or "").capitalize(),
+                filename=filename_str,
+                course_id=course_id,
+            )
         )
-        session.add(db_document)
+    paths = [
+        os.path.join(settings.UPLOAD_DIR, f"{document.id}.pdf")
+        for document in documents
+    ]
+
+    spooled = await asyncio.gather(
+        *(
+            asyncio.to_thread(spool_upload, file, path)
+            for file, path in zip(files, paths, strict=True)
+        ),
+        return_exceptions=True,
+    )
+    failure = next((r for r in spooled if isinstance(r, BaseException)), None)
+    if failure is not None:
+        for path, result in zip(paths, spooled, strict=True):
+            if not isinstance(result, BaseException):
+                os.remove(path)
+        raise failure
+
+    for document, content_hash in zip(documents, spooled, strict=True):
+        # Lets a re-upload reuse earlier results
+        document.content_hash = content_hash
+    try:
+        bulk_insert(session, documents)
+        jobs = [
+            enqueue_job(
+                session,
+                PROCESS_PDF_JOB,
+                {
+                    "file_path": path,
+                    "document_id": str(document.id),
+                    "course_id": str(document.course_id),
+                },
+                document_id=document.id,
+                commit=False,
+            )
+            for document, path in zip(documents, paths, strict=True)
+        ]
+        # Generated client-side; read before the commit expires the rows
+        job_ids = [job.id for job in jobs]
         session.commit()
-        session.refresh(db_document)
-
-        tmp_dir = tempfile.mkdtemp()
-        tmp_path = os.path.join(tmp_dir, f"{db_document.id}_{file.filename}")
-
-        async with aiofiles.open(tmp_path, "wb") as buffer:
-            while chunk := await file.read(1024):
-                await buffer.write(chunk)
-
-        background_tasks.add_task(
-            process_pdf_task, tmp_path, db_document.id, db_document.course_id, session
-        )
-
-        results.append(
-            {
-                "document_id": db_document.id,
-                "filename": file.filename,
-                "status": db_document.status,
-            }
-        )
-
+    except Exception:
+        session.rollback()
+        for path in paths:
+            os.remove(path)
+        raise
+
+    results = [
+        {
+            "document_id": document.id,
+            "filename": document.filename,
+            "status": document.status,
+            "job_id": job_id,
+        }
+        for document, job_id in zip(documents, job_ids, strict=True)
+    ]
     return {"message": "Processing started for multiple files", "documents": results}
 
 
@@ -263,14 +199,25 @@ def read_document(session: SessionDep, current_user: CurrentUser, id: uuid.UUID)
     return document
 
 
-def delete_embeddings_task(document_id: uuid.UUID):
-    """Background task to delete embeddings from Pinecone."""
-    try:
-        if pc.has_index(index_name):
-            index = pc.Index(index_name)
-            index.delete(filter={"document_id": str(document_id)})
-    except Exception as e:
-        logger.error(f"Failed to delete embeddings for document {document_id}: {e}")
+@router.get("/{id}/jobs", response_model=list[JobPublic])
+def read_document_jobs(
+    session: SessionDep, current_user: CurrentUser, id: uuid.UUID
+) -> Any:
+    """List the background jobs (processing, quiz generation) for a document."""
+    statement = (
+        select(Document)
+        .join(Course)
+        .where(Document.id == id)
+        .where(Course.owner_id == current_user.id)
+    )
+
+    if not current_user.is_superuser and not session.exec(statement).first():
+        raise HTTPException(
+            status_code=404,
+            detail="Document not found or you do not have permission to access it.",
+        )
+
+    return get_document_jobs(session, id)
 
 
 @router.delete("/{id}")
@@ -298,8 +245,9 @@ def delete_document(
             detail="Not enough permissions to delete this document.",
         )
 
-    background_tasks.add_task(delete_embeddings_task, id)
+    background_tasks.add_task(delete_embeddings_task, id, document.embedding_namespace)
 
+    promote_duplicates(session, id)
     session.delete(document)
     session.commit()
 
@@ -1,8 +1,14 @@
+import os
+from typing import Any
+
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
+from app.core.db import async_engine, engine
+from app.core.db_pool import pool_stats
 from app.models.common import Message
+from app.services.response_cache import response_cache
 from app.utils import generate_test_email, send_email
 
 router = APIRouter(prefix="/utils", tags=["utils"])
@@ -29,3 +35,29 @@ def test_email(email_to: EmailStr) -> Message:
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
+
+
+@router.get(
+    "/response-cache-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def response_cache_stats() -> dict[str, Any]:
+    """
+    Hit/miss counters of this worker's chat response cache.
+    """
+    return response_cache.stats()
+
+
+@router.get(
+    "/db-pool-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def db_pool_stats() -> dict[str, Any]:
+    """
+    Connection pool occupancy and checkout wait times of this worker.
+    """
+    return {
+        "pid": os.getpid(),
+        "sync": pool_stats(engine.pool),
+        "async": pool_stats(async_engine.pool),
+    }
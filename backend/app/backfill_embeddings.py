@@ -0,0 +1,77 @@
+"""
+Backfill the pgvector store: `python -m app.backfill_embeddings`
+
+Embeds every chunk that has no `chunkembedding` row, near-duplicates aside,
+and writes it through PgVectorStore, whatever VECTOR_STORE is currently set
+to, so the table can be filled before switching over. Chunks ingested since the embedding cache was
+added are served from its Postgres tier without calling the API. Safe to
+interrupt and re-run.
+"""
+
+import argparse
+import asyncio
+import logging
+
+from sqlmodel import Session, col, select
+
+from app.core.db import engine
+from app.models.embeddings import Chunk, ChunkEmbedding
+from app.services.embeddings import embed_chunks
+from app.services.vector_store import PgVectorStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _missing_chunks(session: Session, limit: int) -> list[Chunk]:
+    return list(
+        session.exec(
+            select(Chunk)
+            .outerjoin(ChunkEmbedding, col(ChunkEmbedding.chunk_id) == col(Chunk.id))
+            .where(
+                col(ChunkEmbedding.chunk_id).is_(None),
+                col(Chunk.duplicate_of).is_(None),
+            )
+            .order_by(col(Chunk.created_at))
+            .limit(limit)
+        ).all()
+    )
+
+
+async def backfill(batch_size: int) -> int:
+    store = PgVectorStore()
+    total = 0
+    with Session(engine) as session:
+        while chunks := _missing_chunks(session, batch_size):
+            embeddings = await embed_chunks([chunk.text_content for chunk in chunks])
+            store.upsert(
+                [
+                    {
+                        "id": chunk.embedding_id,
+                        "values": embedding,
+                        "metadata": {
+                            "course_id": str(chunk.course_id),
+                            "document_id": str(chunk.document_id),
+                            "chunk_id": str(chunk.id),
+                        },
+                    }
+                    for chunk, embedding in zip(chunks, embeddings, strict=True)
+                ]
+            )
+            total += len(chunks)
+            logger.info(f"Backfilled {total} chunk embeddings")
+            session.expunge_all()
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    total = asyncio.run(backfill(args.batch_size))
+    logger.info(f"Backfill finished: {total} chunk embeddings written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Compare chunk insert paths: `python -m app.bulk_insert_benchmark`
+
+Inserts the same number of Chunk rows once through the ORM (`add_all` and a
+flush) and once through `bulk_insert`, under a throwaway course and document
+owned by the first user, and logs rows per second for each. Everything runs
+in one transaction that is rolled back, so nothing is left behind.
+"""
+
+import argparse
+import logging
+import time
+import uuid
+from collections.abc import Callable
+
+from sqlmodel import Session, select
+
+from app.core.db import engine
+from app.models.course import Course
+from app.models.document import Document
+from app.models.embeddings import Chunk
+from app.models.user import User
+from app.services.bulk_insert import bulk_insert
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ~1000 characters, about CHUNK_TOKENS tokens
+CHUNK_TEXT = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 18
+
+
+def _chunks(document: Document, rows: int) -> list[Chunk]:
+    return [
+        Chunk(
+            document_id=document.id,
+            course_id=document.course_id,
+            text_content=CHUNK_TEXT,
+            embedding_id=str(uuid.uuid4()),
+        )
+        for _ in range(rows)
+    ]
+
+
+def _orm_insert(session: Session, chunks: list[Chunk]) -> None:
+    session.add_all(chunks)
+    session.flush()
+
+
+def _timed(
+    label: str,
+    session: Session,
+    insert: Callable[[Session, list[Chunk]], object],
+    chunks: list[Chunk],
+) -> None:
+    began = time.perf_counter()
+    insert(session, chunks)
+    elapsed = time.perf_counter() - began
+    logger.info(
+        f"{label}: {len(chunks)} rows in {elapsed:.3f}s "
+        f"({len(chunks) / elapsed:,.0f} rows/s)"
+    )
+
+
+def benchmark(rows: int) -> None:
+    with Session(engine) as session:
+        owner = session.exec(select(User).limit(1)).first()
+        if owner is None:
+            raise SystemExit("The benchmark needs at least one user")
+        course = Course(name="bulk insert benchmark", owner_id=owner.id)
+        document = Document(
+            title="bulk insert benchmark", filename="benchmark.pdf", course=course
+        )
+        session.add_all([course, document])
+        session.flush()
+        try:
+            _timed("ORM add_all", session, _orm_insert, _chunks(document, rows))
+            _timed("bulk_insert", session, bulk_insert, _chunks(document, rows))
+        finally:
+            session.rollback()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    benchmark(args.rows)
+
+
+if __name__ == "__main__":
+    main()
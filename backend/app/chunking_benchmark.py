@@ -0,0 +1,71 @@
+"""
+Compare document chunkers: `python -m app.chunking_benchmark FILE.pdf ...`
+
+Extracts the pages of each PDF once, then times the previous ingestion path
+(langchain's RecursiveCharacterTextSplitter at 1000/200 characters plus the
+separate token count pass quiz generation made over its chunks) against the
+token-aware chunker, which counts tokens while splitting.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from app.services.chunking import iter_text_chunks
+from app.services.pdf_extraction import extract_pdf_pages, shutdown_extraction_pool
+from app.tasks import get_token_counts
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _character_split(pages: list[str]) -> list[int]:
+    # Only needed here, so langchain stays out of the ingestion imports
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        separators=["\n\n", "\n", ".", "!", "?", " ", ""],
+    )
+    chunks = splitter.split_text("\n".join(page for page in pages if page))
+    return get_token_counts(chunks)
+
+
+def _token_split(pages: list[str]) -> list[int]:
+    return [chunk.token_count for chunk in iter_text_chunks(pages)]
+
+
+def benchmark(file_path: str) -> None:
+    try:
+        pages = asyncio.run(extract_pdf_pages(file_path))
+    finally:
+        shutdown_extraction_pool()
+    name = os.path.basename(file_path)
+    for label, split in (
+        ("character splitter", _character_split),
+        ("token chunker", _token_split),
+    ):
+        began = time.perf_counter()
+        counts = split(pages)
+        elapsed = time.perf_counter() - began
+        logger.info(
+            f"{name} ({len(pages)} pages) {label}: {len(counts)} chunks, "
+            f"{sum(counts) / max(len(counts), 1):.0f} tokens on average, "
+            f"largest {max(counts, default=0)}, in {elapsed:.3f}s"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    for file_path in args.files:
+        benchmark(file_path)
+
+
+if __name__ == "__main__":
+    main()
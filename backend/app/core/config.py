@@ -1,4 +1,5 @@
 import secrets
+import tempfile
 import warnings
 from typing import Annotated, Any, Literal
 
@@ -67,6 +68,18 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Connection pool of each process (sync and async engine alike); keep
+    # processes * 2 * (size + overflow) under the server's connection cap
+    DB_POOL_SIZE: int = 4
+    DB_MAX_OVERFLOW: int = 4
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 60 * 30
+    DB_POOL_PRE_PING: bool = True
+    # 0 disables the server-side statement timeout
+    DB_STATEMENT_TIMEOUT_MS: int = 30_000
+    # Connecting through PgBouncer in transaction mode: no prepared statements
+    DB_PGBOUNCER: bool = False
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -89,6 +102,86 @@ class Settings(BaseSettings):
     def emails_enabled(self) -> bool:
         return bool(self.SMTP_HOST and self.EMAILS_FROM_EMAIL)
 
+    # Durable job queue used for document ingestion (see app/worker.py)
+    JOB_WORKER_CONCURRENCY: int = 2
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_BACKOFF_SECONDS: float = 10.0
+    JOB_POLL_INTERVAL_SECONDS: float = 2.0
+    # Running jobs whose lock is older than this are assumed orphaned and retried;
+    # workers renew the lock of the jobs they run every JOB_HEARTBEAT_SECONDS
+    JOB_LOCK_TIMEOUT_SECONDS: int = 60 * 30
+    JOB_HEARTBEAT_SECONDS: float = 60.0
+    # Must be shared between the API and the worker processes
+    UPLOAD_DIR: str = f"{tempfile.gettempdir()}/uploads"
+    # PDF text extraction process pool (0 means one process per CPU)
+    PDF_EXTRACTION_PROCESSES: int = 0
+    PDF_PAGES_PER_TASK: int = 16
+    # Document chunks, in tokens of the quiz model (~1000 and ~200 characters
+    # of English text)
+    CHUNK_TOKENS: int = 256
+    CHUNK_OVERLAP_TOKENS: int = 48
+    # Chunks this similar (MinHash estimate of word-shingle Jaccard) to an
+    # earlier chunk of the course are stored but not embedded
+    CHUNK_DEDUP: bool = True
+    CHUNK_DEDUP_THRESHOLD: float = 0.85
+    # Vector upserts are split into requests under Pinecone's 2 MB / 1000
+    # vector limits and sent this many at a time per process
+    VECTOR_UPSERT_MAX_BYTES: int = 2 * 1024 * 1024
+    VECTOR_UPSERT_MAX_VECTORS: int = 1000
+    VECTOR_UPSERT_CONCURRENCY: int = 4
+    # Shared per-process budget for OpenAI embedding requests
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    EMBEDDING_REQUESTS_PER_MINUTE: int = 3000
+    EMBEDDING_TOKENS_PER_MINUTE: int = 1_000_000
+    EMBEDDING_MAX_RETRIES: int = 6
+    EMBEDDING_RETRY_BASE_SECONDS: float = 1.0
+    # Quiz generation: concurrent LLM requests per worker process and their
+    # shared budget (each request counts its prompt plus ~5k output tokens)
+    QUIZ_GENERATION_MAX_CONCURRENCY: int = 4
+    QUIZ_REQUESTS_PER_MINUTE: int = 60
+    QUIZ_TOKENS_PER_MINUTE: int = 200_000
+    QUIZ_MAX_RETRIES: int = 5
+    QUIZ_RETRY_BASE_SECONDS: float = 2.0
+    # Embedding cache: in-process LRU entries (~6 KB each) plus a Postgres tier
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 5000
+    EMBEDDING_CACHE_PERSIST: bool = True
+    # Postgres-tier rows not served for EMBEDDING_CACHE_TTL_DAYS are deleted by
+    # the job worker every EMBEDDING_CACHE_PRUNE_SECONDS (0 days keeps them)
+    EMBEDDING_CACHE_TTL_DAYS: int = 90
+    EMBEDDING_CACHE_PRUNE_SECONDS: float = 6 * 60 * 60
+    # Chat semantic response cache (per-course in-memory index)
+    RESPONSE_CACHE_POLICY: Literal["lru", "ttl"] = "lru"
+    RESPONSE_CACHE_MAX_ENTRIES_PER_COURSE: int = 500
+    RESPONSE_CACHE_TTL_SECONDS: int = 60 * 60 * 24
+    # "shared" re-syncs each course from the chat table so answers produced by
+    # other API worker processes become cache hits here too
+    RESPONSE_CACHE_BACKEND: Literal["local", "shared"] = "local"
+    RESPONSE_CACHE_SYNC_SECONDS: float = 30.0
+    # Chat messages are written in batches every CHAT_WRITE_FLUSH_SECONDS or
+    # once CHAT_WRITE_BATCH_SIZE are queued; False writes each one at once
+    CHAT_WRITE_BEHIND: bool = True
+    CHAT_WRITE_FLUSH_SECONDS: float = 0.5
+    CHAT_WRITE_BATCH_SIZE: int = 100
+    # "local" keeps memory-mapped vectors under VECTOR_STORE_DIR (shared by the
+    # API and the worker); "pgvector" keeps them in the chunkembedding table
+    VECTOR_STORE: Literal["pinecone", "local", "pgvector"] = "pinecone"
+    VECTOR_STORE_DIR: str = f"{tempfile.gettempdir()}/vectors"
+    # HNSW candidate list for pgvector queries (at least top_k); on pgvector
+    # >= 0.8 filtered queries also keep scanning until top_k rows match
+    PGVECTOR_EF_SEARCH: int = 100
+    # Hybrid (full-text + vector) retrieval; top_k and weights can be
+    # overridden per course
+    RETRIEVAL_TOP_K: int = 5
+    RETRIEVAL_VECTOR_WEIGHT: float = 1.0
+    RETRIEVAL_LEXICAL_WEIGHT: float = 1.0
+    # Candidates fetched by each leg before fusion, and the RRF constant
+    RETRIEVAL_CANDIDATES: int = 20
+    RETRIEVAL_RRF_K: int = 60
+    # RAG context assembly: token budget for retrieved passages and the MMR
+    # relevance/diversity trade-off (1.0 = relevance only)
+    RAG_CONTEXT_TOKEN_BUDGET: int = 1500
+    RAG_MMR_LAMBDA: float = 0.7
+
     EMAIL_TEST_USER: EmailStr = "test@example.com"
     FIRST_SUPERUSER: EmailStr
     FIRST_SUPERUSER_PASSWORD: str
@@ -1,10 +1,17 @@
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, create_engine, select
 
 from app import crud
 from app.core.config import settings
+from app.core.db_pool import engine_options
 from app.models.user import User, UserCreate
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), **engine_options())
+# Same database through psycopg's async driver, for queries issued from
+# `async def` routes so they never block the event loop
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI), **engine_options(is_async=True)
+)
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -0,0 +1,131 @@
+"""
+Database connection pool configuration and metrics
+
+Every API worker process (`fastapi run --workers 4`) and the job worker own
+their own sync and async pools, so the server sees up to
+processes * 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections. The pools
+record how long checkouts wait so an undersized pool shows up in
+/utils/db-pool-stats/ before requests start timing out.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Checkouts waiting longer than this are logged
+SLOW_CHECKOUT_SECONDS = 0.5
+
+
+class PoolMetrics:
+    """Checkout wait-time counters of one pool (guarded by a lock)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / waits * 1000, 3)
+                if waits
+                else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+class _TimedPoolMixin:
+    """Times `_do_get`, which blocks while the pool and overflow are exhausted."""
+
+    metrics: PoolMetrics
+
+    def _do_get(self) -> Any:
+        began = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()  # type: ignore[misc]
+        except Exception:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - began
+            self.metrics.record(waited, timed_out)
+            if timed_out or waited > SLOW_CHECKOUT_SECONDS:
+                logger.warning(
+                    f"[db_pool] pid={os.getpid()} checkout "
+                    f"{'failed' if timed_out else 'slow'} after "
+                    f"{waited * 1000:.0f} ms ({self.status()})"  # type: ignore[attr-defined]
+                )
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+
+def engine_options(*, is_async: bool = False) -> dict[str, Any]:
+    """Keyword arguments for `create_engine` / `create_async_engine`."""
+    connect_args: dict[str, Any] = {}
+    if settings.DB_PGBOUNCER:
+        # PgBouncer in transaction mode hands each transaction a different
+        # server connection, so psycopg must not prepare statements; startup
+        # options are rejected too, so set statement_timeout on the role
+        connect_args["prepare_threshold"] = None
+    elif settings.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["options"] = (
+            f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+        )
+
+    return {
+        "poolclass": TimedAsyncQueuePool if is_async else TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+def pool_stats(pool: QueuePool) -> dict[str, Any]:
+    """Current occupancy and wait-time counters of a pool."""
+    stats: dict[str, Any] = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+    }
+    metrics = getattr(pool, "metrics", None)
+    if isinstance(metrics, PoolMetrics):
+        stats.update(metrics.snapshot())
+    return stats
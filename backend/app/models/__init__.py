@@ -2,9 +2,23 @@ from .chat import Chat  # noqa: F401
 from .common import *  # noqa: F403, if you have base mixins here
 from .course import Course  # noqa: F401
 from .document import Document  # noqa: F401
-from .embeddings import Chunk  # noqa: F401
+from .embedding_cache import EmbeddingCacheEntry  # noqa: F401
+from .embeddings import Chunk, ChunkEmbedding  # noqa: F401
 from .item import Item  # noqa: F401
-from .quizzes import Quiz  # noqa: F401
+from .jobs import Job  # noqa: F401
+from .quizzes import ChunkQuizGeneration, Quiz  # noqa: F401
 from .user import User  # noqa: F401
 
-__all__ = ["User", "Item", "Course", "Document", "Chunk", "Quiz", "Chat"]  # type: ignore
+__all__ = [
+    "User",
+    "Item",
+    "Course",
+    "Document",
+    "Chunk",
+    "ChunkEmbedding",
+    "Quiz",
+    "ChunkQuizGeneration",
+    "Chat",
+    "Job",
+    "EmbeddingCacheEntry",
+]  # type: ignore
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, event, text
+from sqlalchemy import Column, DateTime, LargeBinary, event, text
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -26,6 +26,13 @@ class ChatUpdate(SQLModel):
 class Chat(ChatBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     course_id: uuid.UUID = Field(foreign_key="course.id", ondelete="CASCADE")
+    # float32 question embedding, stored for user messages at write time
+    embedding: bytes | None = Field(
+        default=None, sa_column=Column(LargeBinary, nullable=True)
+    )
+    # Tokens of `message`, counted on write so history filtering needn't
+    # tokenize the same messages again on every question (None for older rows)
+    token_count: int | None = Field(default=None, nullable=True)
     course: "Course" = Relationship(back_populates="chats")  # noqa: F821
 
 
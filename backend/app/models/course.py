@@ -23,6 +23,9 @@ class CourseCreate(CourseBase):
 class CourseUpdate(CourseBase):
     name: str | None = Field(default=None, min_length=3, max_length=255)  # type: ignore
     description: str | None = Field(default=None, max_length=1020)  # type: ignore
+    retrieval_top_k: int | None = Field(default=None, ge=1, le=20)
+    retrieval_vector_weight: float | None = Field(default=None, ge=0)
+    retrieval_lexical_weight: float | None = Field(default=None, ge=0)
 
 
 # Database model, database table inferred from class name
@@ -32,6 +35,11 @@ class Course(CourseBase, table=True):
         foreign_key="users.id", nullable=False, ondelete="CASCADE", index=True
     )
 
+    # Hybrid retrieval overrides; None falls back to the RETRIEVAL_* settings
+    retrieval_top_k: int | None = None
+    retrieval_vector_weight: float | None = None
+    retrieval_lexical_weight: float | None = None
+
     owner: User | None = Relationship(back_populates="courses")
     documents: list["Document"] = Relationship(  # noqa: F821 # type: ignore
         back_populates="course",
@@ -27,6 +27,8 @@ class Document(DocumentBase, table=True):
     embedding_namespace: str | None = None
     filename: str
     status: DocumentStatus = Field(default=DocumentStatus.PENDING)
+    # sha256 of the uploaded file (see app.services.document_dedup)
+    content_hash: str | None = Field(default=None, max_length=64, index=True)
 
     course: Course | None = Relationship(back_populates="documents")
     chunks: list[Chunk] = Relationship(
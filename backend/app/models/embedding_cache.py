@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, LargeBinary
+from sqlmodel import Field, SQLModel, text
+
+
+class EmbeddingCacheEntry(SQLModel, table=True):
+    """
+    Persistent tier of the embedding cache (see app/services/embedding_cache.py).
+
+    `content_hash` is a SHA-256 of (model, normalized text); `embedding` holds
+    the vector as raw little-endian float32 bytes.
+    """
+
+    __tablename__ = "embeddingcache"
+
+    content_hash: str = Field(primary_key=True, max_length=64)
+    model: str = Field(max_length=64)
+    dimension: int
+    embedding: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP")},
+    )
+    # Refreshed (at most daily) when the entry is served from this table; the
+    # job worker prunes entries unused for EMBEDDING_CACHE_TTL_DAYS
+    last_used_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP")},
+        index=True,
+    )
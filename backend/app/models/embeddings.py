@@ -1,15 +1,49 @@
 import uuid
 from datetime import datetime, timezone
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 from app.models.course import Course
-from sqlalchemy import text
+from sqlalchemy import Column, Index, cast, text
+from sqlalchemy.types import UserDefinedType
 from sqlmodel import Field, Relationship, SQLModel
 
 if TYPE_CHECKING:
     from app.models.document import Document
     from app.models.quizzes import Quiz
 
+EMBEDDING_DIMENSION = 1536
+
+
+class PgVector(UserDefinedType):
+    """pgvector `vector(n)` column, exchanged with the driver in its text form."""
+
+    cache_ok = True
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    def get_col_spec(self, **kw: Any) -> str:
+        return f"vector({self.dimension})"
+
+    def bind_expression(self, bindvalue: Any) -> Any:
+        return cast(bindvalue, self)
+
+    def bind_processor(self, dialect: Any) -> Any:
+        def process(value: list[float] | None) -> str | None:
+            if value is None:
+                return None
+            return "[" + ",".join(str(float(x)) for x in value) + "]"
+
+        return process
+
+    def result_processor(self, dialect: Any, coltype: Any) -> Any:
+        def process(value: str | None) -> list[float] | None:
+            if value is None:
+                return None
+            return [float(x) for x in value.strip("[]").split(",")]
+
+        return process
+
 
 class ChunkBase(SQLModel):
     text_content: str
@@ -28,6 +62,17 @@ class ChunkUpdate(SQLModel):
 
 
 class Chunk(ChunkBase, table=True):
+    __table_args__ = (
+        # Full-text index for the lexical leg of hybrid retrieval; queries must
+        # use the same to_tsvector('english', ...) expression to hit it
+        Index(
+            "ix_chunk_text_content_tsv",
+            text("to_tsvector('english', text_content)"),
+            postgresql_using="gin",
+        ),
+        Index("ix_chunk_document_id_chunk_index", "document_id", "chunk_index"),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     document_id: uuid.UUID = Field(foreign_key="document.id", nullable=False)
 
@@ -35,8 +80,18 @@ class Chunk(ChunkBase, table=True):
     quizzes: list["Quiz"] = Relationship(
         back_populates="chunk", sa_relationship_kwargs={"cascade": "delete"}
     )
-    course_id: uuid.UUID = Field(foreign_key="course.id", nullable=False)
+    course_id: uuid.UUID = Field(foreign_key="course.id", nullable=False, index=True)
     course: Course | None = Relationship(back_populates="chunks")
+    # Tokens of the quiz model, counted by the chunker (None for older rows)
+    token_count: int | None = Field(default=None, nullable=True)
+    # Position in the document (None for rows from before it was stored)
+    chunk_index: int | None = Field(default=None, nullable=True)
+    # MinHash signature and, for near-duplicates (which have no vector), the
+    # chunk of the course they repeat (see app.services.chunk_dedup)
+    minhash: bytes | None = None
+    duplicate_of: uuid.UUID | None = Field(
+        default=None, foreign_key="chunk.id", ondelete="SET NULL", index=True
+    )
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
         sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP")},
@@ -44,4 +99,31 @@ class Chunk(ChunkBase, table=True):
     updated_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
         sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP")},
-    )
\ No newline at end of file
+    )
+
+class ChunkEmbedding(SQLModel, table=True):
+    """
+    Chunk vectors for the pgvector store (VECTOR_STORE=pgvector).
+
+    Kept out of `chunk` so loading chunks never drags 6 KB vectors along.
+    Like a Pinecone record it is keyed by the chunk but not tied to it by a
+    foreign key: vectors are written before their Chunk rows are committed and
+    are removed through the vector store by document.
+    """
+
+    __table_args__ = (
+        # Approximate nearest-neighbour index for cosine distance (<=>)
+        Index(
+            "ix_chunkembedding_embedding",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
+
+    chunk_id: uuid.UUID = Field(primary_key=True)
+    course_id: uuid.UUID = Field(index=True)
+    document_id: uuid.UUID = Field(index=True)
+    embedding: list[float] = Field(
+        sa_column=Column(PgVector(EMBEDDING_DIMENSION), nullable=False)
+    )
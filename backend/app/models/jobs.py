@@ -0,0 +1,61 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import Column, DateTime, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Field, SQLModel, text
+
+from app.schemas.public import JobStatus
+
+
+class Job(SQLModel, table=True):
+    """
+    A unit of background work persisted in Postgres.
+
+    Rows are claimed by `app.worker` with `SELECT ... FOR UPDATE SKIP LOCKED`,
+    so any number of worker processes can share the same table.
+    """
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    kind: str = Field(max_length=64, index=True)
+    payload: dict[str, Any] = Field(sa_column=Column(JSONB), default_factory=dict)
+    status: JobStatus = Field(default=JobStatus.QUEUED, index=True)
+
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=5)
+    last_error: str | None = Field(default=None, max_length=2048)
+    # Handler-reported progress, e.g. quiz batches done out of total
+    progress: dict[str, Any] | None = Field(
+        default=None, sa_column=Column(JSONB, nullable=True)
+    )
+
+    # Not a foreign key on purpose: job history survives document deletion
+    document_id: uuid.UUID | None = Field(default=None, index=True)
+
+    run_after: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(
+            DateTime(timezone=True), server_default=func.now(), nullable=False
+        ),
+    )
+    locked_by: str | None = Field(default=None, max_length=255)
+    locked_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True), nullable=True)
+    )
+
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP")},
+    )
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column_kwargs={
+            "server_default": text("CURRENT_TIMESTAMP"),
+            "onupdate": func.now(),
+        },
+    )
+
+    @property
+    def is_final_attempt(self) -> bool:
+        return self.attempts >= self.max_attempts
@@ -138,3 +138,29 @@ class Quiz(QuizBase, table=True):
             "onupdate": func.now(),
         },
     )
+
+
+class ChunkQuizGeneration(SQLModel, table=True):
+    """
+    Watermark: quizzes of `difficulty_level` have been generated from a chunk.
+
+    Written in the same transaction as the quizzes, so a retried or repeated
+    generation job only sends the chunk/difficulty pairs not done yet.
+    """
+
+    chunk_id: uuid.UUID = Field(
+        sa_column=Column(
+            UUID(as_uuid=True),
+            ForeignKey("chunk.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+    )
+    difficulty_level: DifficultyLevel = Field(
+        sa_column=Column(
+            SAEnum(DifficultyLevel, name="difficulty_level_enum"), primary_key=True
+        ),
+    )
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP")},
+    )
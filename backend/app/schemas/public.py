@@ -7,6 +7,7 @@ import uuid
 from collections.abc import Sequence
 from datetime import datetime
 from enum import Enum, StrEnum
+from typing import Any
 
 from pydantic import BaseModel, Field
 
@@ -35,6 +36,27 @@ class DocumentStatus(str, Enum):
     FAILED = "failed"
 
 
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobPublic(PydanticBase):
+    id: uuid.UUID
+    kind: str
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    last_error: str | None = None
+    progress: dict[str, Any] | None = None
+    document_id: uuid.UUID | None = None
+    run_after: datetime
+    created_at: datetime
+    updated_at: datetime
+
+
 class DocumentPublic(PydanticBase):
     id: uuid.UUID
     course_id: uuid.UUID
@@ -50,6 +72,9 @@ class CoursePublic(PydanticBase):
     owner_id: uuid.UUID
     name: str
     description: str | None = None
+    retrieval_top_k: int | None = None
+    retrieval_vector_weight: float | None = None
+    retrieval_lexical_weight: float | None = None
     documents: Sequence[DocumentPublic]
     created_at: datetime
     updated_at: datetime
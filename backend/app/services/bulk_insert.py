@@ -0,0 +1,44 @@
+"""
+Bulk row persistence
+
+Writes many rows of one table with a single executemany, which SQLAlchemy
+sends as a few multi-row INSERT ... VALUES statements ("insertmanyvalues"),
+instead of flushing every object through the ORM unit of work. Primary keys
+are generated client-side (uuid4 default factories), so nothing has to be
+read back with RETURNING.
+"""
+
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel
+
+
+def bulk_insert(session: Session, rows: Sequence[SQLModel]) -> list[Any]:
+    """
+    INSERT `rows` (instances of one table model) in the session's current
+    transaction and return their primary keys in order (tuples for composite
+    keys). The objects are not added to the session; the caller commits.
+
+    Columns with a server default are left out of rows that don't set them,
+    so the default applies as it would through the ORM; rows setting the same
+    columns share one statement.
+    """
+    if not rows:
+        return []
+    table = type(rows[0]).__table__  # type: ignore[attr-defined]
+    groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+    for row in rows:
+        values = {
+            column.key: getattr(row, column.key)
+            for column in table.columns
+            if column.server_default is None or getattr(row, column.key) is not None
+        }
+        groups.setdefault(tuple(values), []).append(values)
+    for group in groups.values():
+        session.execute(insert(table), group)
+    keys = [column.key for column in table.primary_key.columns]
+    if len(keys) == 1:
+        return [getattr(row, keys[0]) for row in rows]
+    return [tuple(getattr(row, key) for key in keys) for row in rows]
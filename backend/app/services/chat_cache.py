@@ -1,18 +1,27 @@
 """
 Chat response caching service
 """
+import logging
+import time
 import uuid
+from typing import List
+
 import numpy as np
-from typing import Optional, Tuple, List
 from sqlmodel import select
 
-from app.api.routes.documents import async_openai_client, EMBEDDING_MODEL
+from app.core.config import settings
 from app.models.chat import Chat
-from app.api.deps import SessionDep
+from app.services.chat_db import chat_session
+from app.services.embedding_cache import vector_from_bytes
+from app.services.embeddings import get_embeddings
+from app.services.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
 
 # Caching constants
 SIMILARITY_THRESHOLD = 0.85  # Minimum similarity for cache hit
-MAX_CACHE_ENTRIES = 100  # Maximum cached responses per course
+MAX_CACHE_ENTRIES = 100  # Recent pairs loaded from the database per course
+TRUNCATION_NOTICE = "[Response was truncated. Ask me to continue for more details.]"
 
 
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
@@ -30,51 +39,80 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     return dot_product / (norm_v1 * norm_v2)
 
 
+def is_cacheable_response(response: str) -> bool:
+    """Truncated and failed answers are never served from the cache"""
+    return bool(response) and not (
+        response.startswith("Error generating response")
+        or response.endswith(TRUNCATION_NOTICE)
+    )
+
+
+async def sync_course_cache(course_id: uuid.UUID) -> None:
+    """
+    Load recent question-answer pairs for a course into the in-memory index.
+
+    With the local backend this happens once per course and process; with the
+    shared backend it repeats every RESPONSE_CACHE_SYNC_SECONDS so answers
+    written by other API workers are picked up.
+    """
+    synced_at = response_cache.synced_at(course_id)
+    now = time.monotonic()
+    if synced_at is not None and (
+        settings.RESPONSE_CACHE_BACKEND == "local"
+        or now - synced_at < settings.RESPONSE_CACHE_SYNC_SECONDS
+    ):
+        return
+
+    # Get recent user questions with their system responses for this course
+    async with chat_session() as session:
+        recent_messages = (await session.exec(
+            select(Chat)
+            .where(Chat.course_id == course_id)
+            .order_by(Chat.created_at.desc())
+            .limit(MAX_CACHE_ENTRIES * 2)  # Get more to find pairs
+        )).all()
+
+    # Group messages into question-answer pairs (question followed by its answer)
+    chronological = list(reversed(recent_messages))
+    pairs: list[tuple[Chat, Chat]] = []
+    for user_msg, answer_msg in zip(chronological, chronological[1:], strict=False):
+        if (not user_msg.is_system and
+            answer_msg.is_system and
+            user_msg.message and
+            answer_msg.message and
+            is_cacheable_response(answer_msg.message)):
+            pairs.append((user_msg, answer_msg))
+
+    pairs = pairs[-MAX_CACHE_ENTRIES:]
+
+    # Rows written before embeddings were stored are embedded in one batched call
+    legacy = [user_msg.message for user_msg, _ in pairs if user_msg.embedding is None]
+    legacy_embeddings = iter(await get_embeddings(legacy)) if legacy else iter([])
+
+    for user_msg, answer_msg in pairs:
+        embedding = (
+            vector_from_bytes(user_msg.embedding)
+            if user_msg.embedding is not None
+            else next(legacy_embeddings)
+        )
+        response_cache.add(
+            course_id, answer_msg.id, user_msg.message, answer_msg.message, embedding
+        )
+    response_cache.mark_synced(course_id, now)
+
+
 async def check_cached_response(
     question: str,
-    question_embedding: List[float],
+    question_embedding: list[float],
     course_id: uuid.UUID,
-    session: SessionDep,
-) -> Optional[Tuple[str, str]]:
+) -> tuple[str, str] | None:
     """
     Check if a similar question has been asked before and return cached response
     Returns: (cached_response, original_question) or None if no similar question found
     """
-    # Get recent user questions with their system responses for this course
-    recent_pairs = session.exec(
-        select(Chat)
-        .where(Chat.course_id == course_id)
-        .order_by(Chat.created_at.desc())
-        .limit(MAX_CACHE_ENTRIES * 2)  # Get more to find pairs
-    ).all()
-    
-    # Group messages into question-answer pairs
-    pairs = []
-    for i in range(len(recent_pairs) - 1):
-        if (not recent_pairs[i].is_system and 
-            recent_pairs[i+1].is_system and
-            recent_pairs[i].message and 
-            recent_pairs[i+1].message):
-            pairs.append((recent_pairs[i].message, recent_pairs[i+1].message))
-    
-    # Check similarity with recent questions
-    for cached_question, cached_response in pairs[:MAX_CACHE_ENTRIES]:
-        try:
-            # Generate embedding for cached question
-            embed_resp = await async_openai_client.embeddings.create(
-                input=[cached_question],
-                model=EMBEDDING_MODEL,
-            )
-            cached_embedding = embed_resp.data[0].embedding
-            
-            # Calculate similarity
-            similarity = cosine_similarity(question_embedding, cached_embedding)
-            
-            if similarity >= SIMILARITY_THRESHOLD:
-                return cached_response, cached_question
-                
-        except Exception as e:
-            print(f"Error checking cache similarity: {e}")
-            continue
-    
-    return None
\ No newline at end of file
+    try:
+        await sync_course_cache(course_id)
+    except Exception as e:
+        logger.warning(f"Error loading response cache: {e}")
+
+    return response_cache.lookup(course_id, question_embedding, SIMILARITY_THRESHOLD)
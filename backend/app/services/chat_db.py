@@ -4,17 +4,33 @@ Chat database operations service
 import uuid
 from typing import List, Optional
 from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.api.deps import SessionDep
+from app.api.deps import AsyncSessionDep
+from app.core.db import async_engine
 from app.models.chat import Chat, ChatCreate
 from app.models.course import Course
 from app.schemas.public import ChatPublic
-from app.services.chat_utils import create_greeting_message
+from app.services.chat_utils import count_tokens, create_greeting_message
+from app.services.chat_write_buffer import chat_write_buffer
+from app.services.embedding_cache import vector_to_bytes
+from app.services.response_cache import response_cache
 
 
-def verify_course_access(
+def chat_session() -> AsyncSession:
+    """
+    Short-lived session for one step of the chat pipeline
+
+    Streamed responses read through one before talking to the model and
+    write through the chat write buffer afterwards, so no connection stays
+    checked out while the answer is generated.
+    """
+    return AsyncSession(async_engine, expire_on_commit=False)
+
+
+async def verify_course_access(
     course_id: uuid.UUID, 
-    session: SessionDep, 
+    session: AsyncSessionDep, 
     current_user
 ) -> Course:
     """
@@ -25,7 +41,9 @@ def verify_course_access(
     """
     from fastapi import HTTPException
     
-    course = session.exec(select(Course).where(Course.id == course_id)).first()
+    course = (
+        await session.exec(select(Course).where(Course.id == course_id))
+    ).first()
 
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
@@ -35,95 +53,118 @@ def verify_course_access(
     return course
 
 
-def get_recent_messages(
+async def get_recent_messages(
     course_id: uuid.UUID, 
-    session: SessionDep, 
+    session: AsyncSessionDep, 
     limit: int = 10
 ) -> List[Chat]:
     """Get recent chat messages for a course"""
-    return session.exec(
+    rows = (await session.exec(
         select(Chat)
         .where(Chat.course_id == course_id)
         .order_by(Chat.created_at.desc())
         .limit(limit)
-    ).all()
+    )).all()
+    return chat_write_buffer.merge(
+        course_id, list(rows), limit=limit, newest_first=True
+    )
 
 
-def get_all_messages(
+async def get_all_messages(
     course_id: uuid.UUID, 
-    session: SessionDep, 
+    session: AsyncSessionDep, 
     limit: int = 50
 ) -> List[Chat]:
     """Get all chat messages for a course in chronological order"""
-    return session.exec(
+    rows = (await session.exec(
         select(Chat)
         .where(Chat.course_id == course_id)
         .order_by(Chat.created_at.asc())
         .limit(limit)
-    ).all()
+    )).all()
+    return chat_write_buffer.merge(
+        course_id, list(rows), limit=limit, newest_first=False
+    )
 
 
-def get_last_system_message(
+async def get_last_system_message(
     course_id: uuid.UUID, 
-    session: SessionDep
+    session: AsyncSessionDep
 ) -> Optional[Chat]:
     """Get the most recent system message for continuation"""
-    return session.exec(
+    rows = (await session.exec(
         select(Chat)
         .where(Chat.course_id == course_id, Chat.is_system == True)
         .order_by(Chat.created_at.desc())
         .limit(1)
-    ).first()
+    )).all()
+    merged = chat_write_buffer.merge(
+        course_id, list(rows), limit=1, newest_first=True, is_system=True
+    )
+    return merged[0] if merged else None
 
 
-def save_user_message(
+async def save_user_message(
     message: str, 
     course_id: uuid.UUID, 
-    session: SessionDep
+    embedding: list[float] | None = None,
 ) -> Chat:
-    """Save a user message to the database"""
+    """
+    Save a user message, with its question embedding for the response cache
+
+    The row is written by the chat write buffer shortly after; reads through
+    this module see it right away.
+    """
     user_chat_data = ChatCreate(
         message=message,
         is_system=False,
         course_id=course_id,
     )
-    user_msg = Chat(**user_chat_data.model_dump())
-    session.add(user_msg)
-    session.commit()
-    return user_msg
+    user_msg = Chat(**user_chat_data.model_dump(), token_count=count_tokens(message))
+    if embedding is not None:
+        user_msg.embedding = vector_to_bytes(embedding)
+    return await chat_write_buffer.add(user_msg)
 
 
-def save_system_message(
+async def save_system_message(
     message: str, 
     course_id: uuid.UUID, 
-    session: SessionDep
+    question: str | None = None,
+    question_embedding: list[float] | None = None,
 ) -> Chat:
-    """Save a system message to the database"""
+    """
+    Save a system message (through the chat write buffer)
+
+    When the question it answers is given, the answer is also added to the
+    in-memory semantic response cache for the course.
+    """
     system_chat_data = ChatCreate(
         message=message,
         is_system=True,
         course_id=course_id,
     )
-    system_msg = Chat(**system_chat_data.model_dump())
-    session.add(system_msg)
-    session.commit()
+    system_msg = Chat(
+        **system_chat_data.model_dump(), token_count=count_tokens(message)
+    )
+    await chat_write_buffer.add(system_msg)
+    if question and question_embedding is not None:
+        response_cache.add(
+            course_id, system_msg.id, question, message, question_embedding
+        )
     return system_msg
 
 
-def update_system_message(
+async def update_system_message(
     message: Chat, 
     new_content: str, 
-    session: SessionDep
 ) -> None:
-    """Update an existing system message"""
-    message.message = new_content
-    session.add(message)
-    session.commit()
+    """Update an existing system message (through the chat write buffer)"""
+    await chat_write_buffer.update(message, new_content, count_tokens(new_content))
 
 
-def create_greeting_if_needed(
+async def create_greeting_if_needed(
     course: Course, 
-    session: SessionDep
+    session: AsyncSessionDep
 ) -> Optional[ChatPublic]:
     """
     Create and save a greeting message if no messages exist for the course
@@ -140,10 +181,12 @@ def create_greeting_if_needed(
             is_system=True,
             course_id=course.id,
         )
-        greeting_msg = Chat(**greeting_data.model_dump())
+        greeting_msg = Chat(
+            **greeting_data.model_dump(), token_count=count_tokens(greeting_text)
+        )
         session.add(greeting_msg)
-        session.commit()
-        session.refresh(greeting_msg)
+        await session.commit()
+        await session.refresh(greeting_msg)
         
         # Return greeting as ChatPublic
         return ChatPublic(**greeting_msg.model_dump())
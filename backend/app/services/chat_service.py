@@ -5,8 +5,9 @@ import uuid
 from collections.abc import AsyncGenerator
 from typing import List
 
-from app.api.deps import SessionDep, CurrentUser
+from app.api.deps import CurrentUser
 from app.services.chat_db import (
+    chat_session,
     verify_course_access,
     get_recent_messages,
     get_last_system_message,
@@ -19,30 +20,30 @@ from app.services.chat_utils import (
     build_system_prompt,
     build_continuation_prompt,
 )
-from app.services.chat_cache import check_cached_response
+from app.services.chat_cache import check_cached_response, is_cacheable_response
 from app.services.rag_service import get_question_embedding, retrieve_relevant_context
 from app.services.openai_service import stream_cached_response, generate_openai_response
 
 
 async def handle_continuation(
     course_id: uuid.UUID,
-    session: SessionDep,
     current_user: CurrentUser,
 ) -> AsyncGenerator[str, None]:
     """Handle response continuation logic"""
-    # Verify access
-    course = verify_course_access(course_id, session, current_user)
-    
-    # Get the last system message to continue from
-    last_system_msg = get_last_system_message(course_id, session)
-    
+    async with chat_session() as session:
+        # Verify access
+        course = await verify_course_access(course_id, session, current_user)
+
+        # Get the last system message to continue from
+        last_system_msg = await get_last_system_message(course_id, session)
+
+        # Get recent chat history for context (limited for continuations)
+        recent_messages = await get_recent_messages(course_id, session, limit=6)
+
     if not last_system_msg or not last_system_msg.message:
         yield "Error: No previous response found to continue"
         return
     
-    # Get recent chat history for context (limited for continuations)
-    recent_messages = get_recent_messages(course_id, session, limit=6)
-    
     # Build conversation history with token filtering
     conversation_history = filter_chat_history(
         recent_messages, 
@@ -81,55 +82,55 @@ async def handle_continuation(
             "\n\n[Response was truncated. Ask me to continue for more details.]", 
             ""
         )
-        update_system_message(
-            last_system_msg, 
-            cleaned_message + full_response, 
-            session
-        )
+        await update_system_message(last_system_msg, cleaned_message + full_response)
 
 
 async def handle_regular_question(
     question: str,
     course_id: uuid.UUID,
-    session: SessionDep,
     current_user: CurrentUser,
 ) -> AsyncGenerator[str, None]:
-    """Handle regular question processing with RAG and caching"""
-    # Verify access
-    course = verify_course_access(course_id, session, current_user)
+    """
+    Handle regular question processing with RAG and caching
+
+    Reads happen in one short session and the question is queued in the chat
+    write buffer before the answer is streamed, the answer once it is
+    complete, so a stream holds no database connection while the model
+    generates and a dropped stream still keeps the question.
+    """
+    async with chat_session() as session:
+        # Verify access
+        course = await verify_course_access(course_id, session, current_user)
+
+        # Get recent chat history for conversational context
+        recent_messages = await get_recent_messages(course_id, session)
     
     # Generate embedding for the question
     question_embedding = await get_question_embedding(question)
 
     # Check for cached similar response first
     cached_result = await check_cached_response(
-        question, question_embedding, course_id, session
+        question, question_embedding, course_id
     )
     
     if cached_result:
         cached_response, _ = cached_result
-        
-        # Save user message
-        save_user_message(question, course_id, session)
-        
+        await save_user_message(question, course_id, question_embedding)
+
         # Stream cached response directly (without similarity note for cleaner UX)
         async for chunk in stream_cached_response(cached_response):
             yield chunk
-        
-        # Save system message with cached response
-        save_system_message(cached_response, course_id, session)
+
+        await save_system_message(cached_response, course_id)
         return
 
     # Retrieve relevant context from documents
-    context_str = await retrieve_relevant_context(question_embedding, course_id)
+    context_str = await retrieve_relevant_context(question, question_embedding, course)
     
     if not context_str:
         yield "Error: No relevant content found for this question"
         return
 
-    # Get recent chat history for conversational context
-    recent_messages = get_recent_messages(course_id, session)
-    
     # Filter history based on token limits
     conversation_history = filter_chat_history(
         recent_messages, 
@@ -137,9 +138,6 @@ async def handle_regular_question(
         context_str
     )
 
-    # Save user message
-    save_user_message(question, course_id, session)
-
     # Build messages with filtered conversation history
     messages = [
         {
@@ -158,11 +156,18 @@ async def handle_regular_question(
         "content": f"Context from course materials:\n{context_str}\n\nQuestion: {question}"
     })
 
+    await save_user_message(question, course_id, question_embedding)
+
     # Generate and stream response
     full_response = ""
     async for chunk in generate_openai_response(messages):
         full_response += chunk
         yield chunk
 
-    # Save system message
-    save_system_message(full_response, course_id, session)
\ No newline at end of file
+    # Complete answers also populate the response cache
+    if is_cacheable_response(full_response):
+        await save_system_message(
+            full_response, course_id, question, question_embedding
+        )
+    else:
+        await save_system_message(full_response, course_id)
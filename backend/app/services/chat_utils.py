@@ -1,24 +1,70 @@
 """
 Chat service utilities for token management and text processing
 """
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List
+
 import tiktoken
-from typing import List, Dict, Any
 
 # Token management constants
 MAX_CONTEXT_TOKENS = 3500  # Leave room for response (~500 tokens)
 SYSTEM_PROMPT_TOKENS = 100  # Estimate for system prompt
 MAX_HISTORY_MESSAGES = 10
+# Memoized counts of recently seen texts (history, retrieved chunks)
+TOKEN_COUNT_CACHE_SIZE = 10_000
+# An encoding that failed to load (e.g. no network for the BPE file) is
+# retried after this long; until then counts are estimated
+ENCODING_RETRY_SECONDS = 300
 
+_encodings: dict[str, tiktoken.Encoding] = {}
+_encoding_failures: dict[str, float] = {}
+_token_counts: "OrderedDict[tuple[str, bytes], int]" = OrderedDict()
+_lock = threading.Lock()
 
-def count_tokens(text: str, model: str = "gpt-4") -> int:
-    """Count tokens in text using tiktoken"""
+
+def get_encoding(model: str = "gpt-4") -> tiktoken.Encoding | None:
+    """Shared tokenizer for a model, loaded once per process"""
+    encoding = _encodings.get(model)
+    if encoding is not None:
+        return encoding
+    failed_at = _encoding_failures.get(model)
+    if failed_at is not None and time.monotonic() - failed_at < ENCODING_RETRY_SECONDS:
+        return None
     try:
         encoding = tiktoken.encoding_for_model(model)
-        return len(encoding.encode(text))
     except Exception:
-        # Fallback estimation: ~4 chars per token
+        _encoding_failures[model] = time.monotonic()
+        return None
+    _encodings[model] = encoding
+    return encoding
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Count tokens in text using tiktoken, memoized by content hash"""
+    key = (model, hashlib.blake2b(text.encode(), digest_size=16).digest())
+    with _lock:
+        cached = _token_counts.get(key)
+        if cached is not None:
+            _token_counts.move_to_end(key)
+            return cached
+
+    encoding = get_encoding(model)
+    try:
+        tokens = len(encoding.encode(text))  # type: ignore[union-attr]
+    except Exception:
+        # Fallback estimation: ~4 chars per token (not cached, so the exact
+        # count is used once the tokenizer loads)
         return len(text) // 4
 
+    with _lock:
+        _token_counts[key] = tokens
+        if len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return tokens
+
 
 def filter_chat_history(
     messages: List[Any], 
@@ -54,7 +100,10 @@ def filter_chat_history(
             "content": msg.message
         }
         
-        message_tokens = count_tokens(msg.message)
+        # Counted when the message was saved; older rows are counted here
+        message_tokens = getattr(msg, "token_count", None)
+        if message_tokens is None:
+            message_tokens = count_tokens(msg.message)
         
         # Check if adding this message would exceed token limit
         if current_tokens + message_tokens > available_tokens:
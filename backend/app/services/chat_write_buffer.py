@@ -0,0 +1,243 @@
+"""
+Write-behind buffer for chat messages
+
+Chat rows are queued in memory and written in one transaction every
+CHAT_WRITE_FLUSH_SECONDS, or as soon as CHAT_WRITE_BATCH_SIZE rows are
+waiting, instead of one commit per message. Reads in chat_db merge the
+queued rows in, so a worker always sees its own writes; other workers see
+them after the next flush. The app flushes the buffer on shutdown.
+"""
+
+import asyncio
+import logging
+import uuid
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import async_engine
+from app.models.chat import Chat
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _default_session() -> AsyncSession:
+    return AsyncSession(async_engine, expire_on_commit=False)
+
+
+class ChatWriteBuffer:
+    def __init__(
+        self,
+        flush_seconds: float,
+        batch_size: int,
+        enabled: bool = True,
+        session_factory: Callable[[], AsyncSession] = _default_session,
+    ) -> None:
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.enabled = enabled
+        self._session_factory = session_factory
+        # Rows and message edits waiting for the next flush, and those of the
+        # flush in progress; both are visible to reads
+        self._pending: list[Chat] = []
+        self._updates: dict[uuid.UUID, dict[str, Any]] = {}
+        self._in_flight: list[Chat] = []
+        self._in_flight_updates: dict[uuid.UUID, dict[str, Any]] = {}
+        self._last_timestamp = datetime.min.replace(tzinfo=timezone.utc)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._flush_lock: asyncio.Lock | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._closing = False
+
+    def _timestamp(self) -> datetime:
+        # Rows of one batch share a transaction, so created_at is set here
+        # rather than by the server's now(); strictly increasing keeps a
+        # question before its answer
+        now = datetime.now(timezone.utc)
+        if now <= self._last_timestamp:
+            now = self._last_timestamp + timedelta(microseconds=1)
+        self._last_timestamp = now
+        return now
+
+    def _bind_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._flush_lock = asyncio.Lock()
+            self._wakeup = asyncio.Event()
+            self._task = None
+        return loop
+
+    def _ensure_started(self) -> None:
+        loop = self._bind_loop()
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_seconds)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"[chat_write_buffer] Flush failed: {e}")
+            if self._closing:
+                return
+
+    async def add(self, row: Chat) -> Chat:
+        """Queue a new message; its created_at is the time of this call."""
+        self._ensure_started()
+        row.created_at = self._timestamp()
+        self._pending.append(row)
+        if not self.enabled:
+            await self.flush()
+        elif len(self._pending) >= self.batch_size:
+            assert self._wakeup is not None
+            self._wakeup.set()
+        return row
+
+    async def update(
+        self, row: Chat, message: str, token_count: int | None = None
+    ) -> None:
+        """Replace the text of a message, queued or already written."""
+        self._ensure_started()
+        values = {"message": message, "token_count": token_count}
+        queued = [pending for pending in self._pending if pending.id == row.id]
+        for target in [row, *queued]:
+            for key, value in values.items():
+                setattr(target, key, value)
+        if not queued:
+            self._updates[row.id] = values
+        if not self.enabled:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything queued so far in one transaction."""
+        self._bind_loop()
+        assert self._flush_lock is not None
+        async with self._flush_lock:
+            rows, self._pending = self._pending, []
+            updates, self._updates = self._updates, {}
+            if not rows and not updates:
+                return
+            self._in_flight, self._in_flight_updates = rows, updates
+            try:
+                try:
+                    await self._write(rows, updates)
+                except Exception as e:
+                    # One bad row (e.g. its course was deleted meanwhile)
+                    # must not lose the rest of the batch
+                    logger.warning(
+                        f"[chat_write_buffer] Batch of {len(rows)} rows failed "
+                        f"({e}), writing them one by one"
+                    )
+                    await self._write_each(rows, updates)
+            finally:
+                self._in_flight, self._in_flight_updates = [], {}
+
+    async def _write(
+        self, rows: list[Chat], updates: dict[uuid.UUID, dict[str, Any]]
+    ) -> None:
+        async with self._session_factory() as session:
+            session.add_all(rows)
+            # Flush the inserts first so edits of rows in this batch apply
+            await session.flush()
+            for id, values in updates.items():
+                await session.execute(
+                    update(Chat)
+                    .where(Chat.id == id)  # type: ignore[arg-type]
+                    .values(**values, updated_at=datetime.utcnow())
+                )
+            await session.commit()
+
+    async def _write_each(
+        self, rows: list[Chat], updates: dict[uuid.UUID, dict[str, Any]]
+    ) -> None:
+        """
+        Rows the database rejects are dropped; anything else that fails (the
+        database is unreachable) is queued again for the next flush.
+        """
+        retry: list[Chat] = []
+        for row in rows:
+            try:
+                await self._write([row], {})
+            except IntegrityError as e:
+                logger.error(f"[chat_write_buffer] Dropped chat {row.id}: {e}")
+            except Exception:
+                retry.append(row)
+        retry_updates: dict[uuid.UUID, dict[str, Any]] = {}
+        for id, values in updates.items():
+            try:
+                await self._write([], {id: values})
+            except Exception:
+                retry_updates[id] = values
+        self._pending[:0] = retry
+        self._updates = {**retry_updates, **self._updates}
+
+    async def close(self) -> None:
+        """Stop the background flusher after it has written what is left."""
+        if self._task is not None and not self._task.done():
+            assert self._wakeup is not None
+            self._closing = True
+            self._wakeup.set()
+            try:
+                await self._task
+            finally:
+                self._closing = False
+        if self._pending or self._updates:
+            await self.flush()
+        if self._pending or self._updates:
+            logger.error(
+                f"[chat_write_buffer] {len(self._pending)} messages and "
+                f"{len(self._updates)} edits could not be written"
+            )
+
+    def merge(
+        self,
+        course_id: uuid.UUID,
+        rows: list[Chat],
+        *,
+        limit: int,
+        newest_first: bool,
+        is_system: bool | None = None,
+    ) -> list[Chat]:
+        """
+        Combine rows read from the database with this worker's queued ones,
+        in created_at order and cut to `limit`, with queued edits applied.
+        """
+        by_id = {row.id: row for row in rows}
+        for row in self._in_flight + self._pending:
+            if row.course_id == course_id and (
+                is_system is None or row.is_system == is_system
+            ):
+                by_id.setdefault(row.id, row)
+
+        edits = {**self._in_flight_updates, **self._updates}
+        merged = sorted(
+            by_id.values(), key=lambda row: row.created_at, reverse=newest_first
+        )[:limit]
+        for row in merged:
+            if row.id in edits:
+                # Don't mark the row dirty in the session that loaded it
+                for key, value in edits[row.id].items():
+                    set_committed_value(row, key, value)
+        return merged
+
+
+chat_write_buffer = ChatWriteBuffer(
+    flush_seconds=settings.CHAT_WRITE_FLUSH_SECONDS,
+    batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+    enabled=settings.CHAT_WRITE_BEHIND,
+)
@@ -0,0 +1,177 @@
+"""
+Near-duplicate chunk detection
+
+Slides and handouts of a course repeat the same paragraphs. Every chunk gets
+a MinHash signature of its word shingles, stored on the row, and ingestion
+checks new chunks against an LSH index of the course's signatures (built
+from the database when a document is processed, so documents of one course
+processed at the same time don't see each other). A chunk whose estimated
+Jaccard similarity to an earlier one reaches CHUNK_DEDUP_THRESHOLD is stored
+with `duplicate_of` set but not embedded, upserted or used for quizzes, so it
+can't crowd the top-k with a copy of the same passage. When the chunk it
+repeats is deleted, a duplicate takes its place (`promote_duplicates`).
+"""
+
+import hashlib
+import uuid
+import zlib
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+
+import numpy as np
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.models.embeddings import EMBEDDING_DIMENSION, Chunk
+from app.services.job_queue import EMBED_CHUNKS_JOB, enqueue_job
+
+NUM_PERM = 128
+# 16 bands of 8 rows: pairs above ~0.7 similarity share a bucket
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+
+def _coefficient(label: bytes, i: int) -> int:
+    digest = hashlib.blake2b(label + i.to_bytes(2, "big"), digest_size=4).digest()
+    return int.from_bytes(digest, "big")
+
+
+# Hash permutations (a * x + b) mod p; derived from fixed hashes rather than
+# a random generator so stored signatures stay comparable across versions
+_A = np.array([_coefficient(b"a", i) | 1 for i in range(NUM_PERM)], dtype=np.uint64)
+_B = np.array([_coefficient(b"b", i) for i in range(NUM_PERM)], dtype=np.uint64)
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """MinHash of the text's lowercased word 3-shingles, as NUM_PERM uint32s."""
+    words = text.lower().split()
+    shingles = {
+        " ".join(words[i : i + SHINGLE_SIZE]).encode()
+        for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))
+    }
+    hashes = np.fromiter((zlib.crc32(s) for s in shingles), dtype=np.uint64)
+    permuted = (hashes[:, None] * _A + _B) % _PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def signature_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return float(np.mean(a == b))
+
+
+class MinHashIndex:
+    def __init__(self, threshold: float | None = None) -> None:
+        self.threshold = threshold or settings.CHUNK_DEDUP_THRESHOLD
+        self._signatures: dict[uuid.UUID, np.ndarray] = {}
+        self._buckets: defaultdict[tuple[int, bytes], list[uuid.UUID]] = defaultdict(
+            list
+        )
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    @staticmethod
+    def _bands(signature: np.ndarray) -> list[tuple[int, bytes]]:
+        return [
+            (band, signature[band * ROWS : (band + 1) * ROWS].tobytes())
+            for band in range(BANDS)
+        ]
+
+    def add(self, chunk_id: uuid.UUID, signature: np.ndarray) -> None:
+        self._signatures[chunk_id] = signature
+        for key in self._bands(signature):
+            self._buckets[key].append(chunk_id)
+
+    def find(self, signature: np.ndarray) -> uuid.UUID | None:
+        """The most similar indexed chunk at or above the threshold, if any."""
+        candidates = {
+            chunk_id
+            for key in self._bands(signature)
+            for chunk_id in self._buckets.get(key, ())
+        }
+        best, best_similarity = None, self.threshold
+        for chunk_id in candidates:
+            similarity = signature_similarity(signature, self._signatures[chunk_id])
+            if similarity >= best_similarity:
+                best, best_similarity = chunk_id, similarity
+        return best
+
+
+def load_course_index(session: Session, course_id: uuid.UUID) -> MinHashIndex:
+    """Index of the course's chunks that are not duplicates themselves."""
+    index = MinHashIndex()
+    rows = session.exec(
+        select(Chunk.id, Chunk.minhash).where(
+            Chunk.course_id == course_id,
+            col(Chunk.duplicate_of).is_(None),
+            col(Chunk.minhash).is_not(None),
+        )
+    ).all()
+    for chunk_id, minhash in rows:
+        index.add(chunk_id, np.frombuffer(minhash, dtype=np.uint32))
+    return index
+
+
+def promote_duplicates(session: Session, document_id: uuid.UUID) -> list[uuid.UUID]:
+    """
+    Call before deleting a document's chunks. The earliest near-duplicate of
+    each of them in other documents becomes canonical in its place, and the
+    other duplicates point at it. The promoted chunks have no vector or
+    quizzes yet, so a job to embed them is queued; nothing is committed.
+    Returns the promoted chunk ids.
+    """
+    duplicates = session.exec(
+        select(Chunk)
+        .where(
+            col(Chunk.duplicate_of).in_(
+                select(Chunk.id).where(Chunk.document_id == document_id)
+            ),
+            Chunk.document_id != document_id,
+        )
+        .order_by(col(Chunk.created_at), col(Chunk.chunk_index))
+    ).all()
+    promoted: dict[uuid.UUID | None, Chunk] = {}
+    for chunk in duplicates:
+        original = chunk.duplicate_of
+        if original in promoted:
+            chunk.duplicate_of = promoted[original].id
+        else:
+            promoted[original] = chunk
+            chunk.duplicate_of = None
+        session.add(chunk)
+    if not promoted:
+        return []
+    # Before the originals go; `duplicate_of` must never reference them
+    session.flush()
+    chunk_ids = [chunk.id for chunk in promoted.values()]
+    enqueue_job(
+        session,
+        EMBED_CHUNKS_JOB,
+        {"chunk_ids": [str(chunk_id) for chunk_id in chunk_ids]},
+        commit=False,
+    )
+    return chunk_ids
+
+
+@dataclass
+class DedupStats:
+    chunks: int = 0
+    duplicates: int = 0
+    # Embedding input tokens, and vector store bytes (float32 vector plus
+    # the text kept in its metadata), not spent on duplicates
+    tokens_saved: int = 0
+    bytes_saved: int = 0
+
+    def record(self, chunk: Chunk) -> None:
+        self.chunks += 1
+        if chunk.duplicate_of is not None:
+            self.duplicates += 1
+            self.tokens_saved += chunk.token_count or 0
+            self.bytes_saved += EMBEDDING_DIMENSION * 4 + len(chunk.text_content)
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
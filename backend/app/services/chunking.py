@@ -0,0 +1,187 @@
+"""
+Token-aware document chunking
+
+Splits a stream of page texts into chunks of at most CHUNK_TOKENS tokens,
+consecutive chunks sharing up to CHUNK_OVERLAP_TOKENS, with a single
+tokenizer pass over each page. Cuts prefer paragraph, line, sentence and
+word boundaries, in that order, within the second half of a chunk. Every
+chunk carries its token count and its character offsets in the page texts
+joined by newlines.
+"""
+
+import re
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+import tiktoken
+
+from app.core.config import settings
+from app.services.chat_utils import get_encoding
+
+# Same model as QUIZ_MODEL_ENCODING in app.tasks, so quiz generation can use
+# the stored counts
+CHUNK_ENCODING_MODEL = "gpt-4o"
+
+_SENTENCE_ENDS = (".", "!", "?")
+# Without a tokenizer: words with their leading whitespace, ~4 chars per token
+_WORDS = re.compile(r"\s*\S+|\s+")
+
+
+@dataclass
+class TextChunk:
+    text: str
+    token_count: int
+    start: int
+    end: int
+
+
+def _boundary_rank(left: str, right: str) -> int:
+    """How good a cut between two pieces of text is (higher is better)."""
+    if left.endswith("\n\n") or right.startswith("\n\n"):
+        return 4
+    if left.endswith("\n") or right.startswith("\n"):
+        return 3
+    if left[-1:].isspace() or right[:1].isspace():
+        return 2 if left.rstrip().endswith(_SENTENCE_ENDS) else 1
+    return 0
+
+
+class TokenChunker:
+    """
+    Incremental chunker: `feed` it pages and collect the chunks it returns,
+    then `finish` for the rest.
+
+    A chunk's token count is the number of its tokens in the page stream;
+    encoding the chunk on its own may differ by a token at either edge.
+    """
+
+    def __init__(
+        self,
+        chunk_tokens: int | None = None,
+        overlap_tokens: int | None = None,
+        encoding: tiktoken.Encoding | None = None,
+    ) -> None:
+        self.chunk_tokens = chunk_tokens or settings.CHUNK_TOKENS
+        self.overlap_tokens = (
+            settings.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+        )
+        if not 0 <= self.overlap_tokens < self.chunk_tokens // 2:
+            raise ValueError("overlap_tokens must be less than half of chunk_tokens")
+        self.encoding = encoding or get_encoding(CHUNK_ENCODING_MODEL)
+        # Text pieces that decode on their own, with their token counts
+        self._units: list[tuple[str, int]] = []
+        self._tokens = 0
+        # Character offset of the first unit, and how many leading units were
+        # already emitted as the previous chunk's overlap
+        self._offset = 0
+        self._emitted = 0
+        self._started = False
+
+    def _split(self, text: str) -> list[tuple[str, int]]:
+        if self.encoding is None:
+            return [(word, max(len(word) // 4, 1)) for word in _WORDS.findall(text)]
+        units: list[tuple[str, int]] = []
+        pending = b""
+        count = 0
+        tokens = self.encoding.encode_ordinary(text)
+        for token_bytes in self.encoding.decode_tokens_bytes(tokens):
+            pending += token_bytes
+            count += 1
+            try:
+                units.append((pending.decode(), count))
+            except UnicodeDecodeError:
+                # A character split across tokens; keep them together
+                continue
+            pending, count = b"", 0
+        return units
+
+    def _emit(self, end: int) -> TextChunk | None:
+        units = self._units[:end]
+        text = "".join(piece for piece, _ in units)
+        stripped = text.strip()
+        if not stripped:
+            return None
+        start = self._offset + len(text) - len(text.lstrip())
+        return TextChunk(
+            text=stripped,
+            token_count=sum(count for _, count in units),
+            start=start,
+            end=start + len(stripped),
+        )
+
+    def _cut(self) -> TextChunk | None:
+        """Emit one chunk from the front of the buffer and keep its overlap."""
+        units = self._units
+        # The buffer holds more than chunk_tokens, so the loop stops in it
+        end = half = total = 0
+        while total + units[end][1] <= self.chunk_tokens:
+            total += units[end][1]
+            end += 1
+            if total <= self.chunk_tokens // 2:
+                half = end
+        end = max(end, 1)
+
+        # Cuts past the middle only, so the chunk is longer than its overlap
+        cut, best = end, -1
+        for position in range(end, half, -1):
+            right = units[position][0] if position < len(units) else ""
+            rank = _boundary_rank(units[position - 1][0], right)
+            if rank > best:
+                cut, best = position, rank
+            if best == 4:
+                break
+        chunk = self._emit(cut)
+
+        # Start the next chunk at a word boundary at most overlap_tokens back
+        start, overlap = cut, 0
+        while start > 1 and overlap + units[start - 1][1] <= self.overlap_tokens:
+            overlap += units[start - 1][1]
+            start -= 1
+        while start < cut and _boundary_rank(units[start - 1][0], units[start][0]) == 0:
+            start += 1
+
+        self._offset += sum(len(piece) for piece, _ in units[:start])
+        self._tokens -= sum(count for _, count in units[:start])
+        del units[:start]
+        self._emitted = cut - start
+        return chunk
+
+    def feed(self, text: str) -> list[TextChunk]:
+        """Add the next page and return the chunks completed by it."""
+        if not text:
+            return []
+        if self._started:
+            text = f"\n{text}"
+        self._started = True
+        for unit in self._split(text):
+            self._units.append(unit)
+            self._tokens += unit[1]
+
+        chunks: list[TextChunk] = []
+        while self._tokens > self.chunk_tokens:
+            chunk = self._cut()
+            if chunk is not None:
+                chunks.append(chunk)
+        return chunks
+
+    def finish(self) -> list[TextChunk]:
+        """Return the last chunk, unless the rest was all overlap."""
+        new = self._units[self._emitted :]
+        chunk = None
+        if "".join(piece for piece, _ in new).strip():
+            chunk = self._emit(len(self._units))
+        self._units, self._tokens, self._emitted = [], 0, 0
+        return [chunk] if chunk is not None else []
+
+
+def iter_text_chunks(
+    pages: Iterable[str], chunker: TokenChunker | None = None
+) -> Iterator[TextChunk]:
+    chunker = chunker or TokenChunker()
+    for page in pages:
+        yield from chunker.feed(page)
+    yield from chunker.finish()
+
+
+def chunk_text(text: str, chunker: TokenChunker | None = None) -> list[TextChunk]:
+    return list(iter_text_chunks([text], chunker))
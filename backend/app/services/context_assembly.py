@@ -0,0 +1,178 @@
+"""
+RAG context assembly
+
+Turns ranked retrieval candidates into the context passed to the LLM:
+duplicates and chunks contained in other chunks are dropped, a
+maximal-marginal-relevance pass picks a diverse subset within a token
+budget, and neighbouring chunks of the same document are merged with their
+shared overlap (see CHUNK_OVERLAP_TOKENS in app.services.chunking) removed.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.chat_utils import count_tokens
+from app.services.vector_store import Match
+
+# Overlap between consecutive chunks is at most CHUNK_OVERLAP_TOKENS tokens;
+# allow for long tokens and whitespace the chunker trims
+MAX_OVERLAP_CHARS = settings.CHUNK_OVERLAP_TOKENS * 8
+MIN_OVERLAP_CHARS = 20
+SHINGLE_SIZE = 3
+
+
+@dataclass(eq=False)
+class Candidate:
+    text: str
+    relevance: float
+    document_id: str | None
+    chunk_index: int | None
+    vector: np.ndarray | None
+    shingles: set[tuple[str, ...]] = field(default_factory=set)
+    tokens: int = 0
+
+    @classmethod
+    def from_match(cls, match: Match, relevance: float) -> "Candidate":
+        metadata = match["metadata"]
+        values = match.get("values")
+        vector = None
+        if values is not None:
+            vector = np.asarray(values, dtype=np.float32)
+            norm = float(np.linalg.norm(vector))
+            vector = vector / norm if norm > 0 else None
+        chunk_index = metadata.get("chunk_index")
+        words = metadata["text"].lower().split()
+        return cls(
+            text=metadata["text"],
+            relevance=relevance,
+            document_id=metadata.get("document_id"),
+            chunk_index=int(chunk_index) if chunk_index is not None else None,
+            vector=vector,
+            shingles={
+                tuple(words[i : i + SHINGLE_SIZE])
+                for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))
+            },
+            tokens=count_tokens(metadata["text"]),
+        )
+
+
+def similarity(a: Candidate, b: Candidate) -> float:
+    """Cosine of the stored vectors, or word-shingle Jaccard when one is missing."""
+    if a.vector is not None and b.vector is not None:
+        return float(a.vector @ b.vector)
+    union = len(a.shingles | b.shingles)
+    return len(a.shingles & b.shingles) / union if union else 0.0
+
+
+def overlap_length(before: str, after: str) -> int:
+    """Length of the longest suffix of `before` that is a prefix of `after`."""
+    for size in range(min(len(before), len(after), MAX_OVERLAP_CHARS), 0, -1):
+        if before.endswith(after[:size]):
+            return size if size >= MIN_OVERLAP_CHARS else 0
+    return 0
+
+
+def _drop_duplicates(candidates: list[Candidate]) -> list[Candidate]:
+    """Keep the most relevant copy of texts that are equal to or inside another."""
+    kept: list[Candidate] = []
+    for candidate in sorted(candidates, key=lambda c: c.relevance, reverse=True):
+        stripped = candidate.text.strip()
+        if any(stripped in other.text for other in kept):
+            continue
+        kept = [other for other in kept if other.text.strip() not in stripped] + [
+            candidate
+        ]
+    return kept
+
+
+def _are_adjacent(a: Candidate, b: Candidate) -> bool:
+    if a.document_id != b.document_id:
+        return False
+    if a.chunk_index is not None and b.chunk_index is not None:
+        return b.chunk_index == a.chunk_index + 1
+    return overlap_length(a.text, b.text) > 0
+
+
+def _merge_neighbours(selected: list[Candidate]) -> list[str]:
+    """
+    Join runs of adjacent chunks into single passages, ordered by their most
+    relevant member.
+    """
+    remaining = list(selected)
+    passages: list[tuple[float, str]] = []
+    while remaining:
+        run = [remaining.pop(0)]
+        extended = True
+        while extended:
+            extended = False
+            for other in remaining:
+                if _are_adjacent(run[-1], other):
+                    run.append(other)
+                elif _are_adjacent(other, run[0]):
+                    run.insert(0, other)
+                else:
+                    continue
+                remaining.remove(other)
+                extended = True
+                break
+
+        text = run[0].text
+        for previous, current in zip(run, run[1:], strict=False):
+            overlap = overlap_length(previous.text, current.text)
+            text += current.text[overlap:] if overlap else "\n" + current.text
+        passages.append((max(c.relevance for c in run), text))
+
+    passages.sort(key=lambda passage: passage[0], reverse=True)
+    return [text for _, text in passages]
+
+
+def assemble_context(
+    matches: list[Match],
+    *,
+    max_chunks: int,
+    token_budget: int | None = None,
+    mmr_lambda: float | None = None,
+) -> list[str]:
+    """
+    Pick up to `max_chunks` of `matches` (ranked best first) and return the
+    merged passages, whose total stays within `token_budget` tokens.
+
+    MMR trades relevance (the fused retrieval score, normalized to the best
+    match) against similarity to what has already been picked, so
+    near-identical chunks don't crowd out other parts of the material.
+    """
+    token_budget = token_budget or settings.RAG_CONTEXT_TOKEN_BUDGET
+    mmr_lambda = settings.RAG_MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+
+    usable = [m for m in matches if m.get("metadata", {}).get("text")]
+    if not usable:
+        return []
+    best_score = max(float(m["score"]) for m in usable) or 1.0
+    candidates = _drop_duplicates(
+        [Candidate.from_match(m, float(m["score"]) / best_score) for m in usable]
+    )
+
+    selected: list[Candidate] = []
+    used_tokens = 0
+    while candidates and len(selected) < max_chunks:
+        scored: list[tuple[float, Candidate]] = [
+            (
+                mmr_lambda * candidate.relevance
+                - (1 - mmr_lambda)
+                * max((similarity(candidate, s) for s in selected), default=0.0),
+                candidate,
+            )
+            for candidate in candidates
+        ]
+        _, choice = max(scored, key=lambda item: item[0])
+        candidates.remove(choice)
+        # Overlap with already selected neighbours is removed when merging,
+        # so counting full chunks keeps the estimate on the safe side
+        if used_tokens + choice.tokens > token_budget:
+            continue
+        selected.append(choice)
+        used_tokens += choice.tokens
+
+    return _merge_neighbours(selected)
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import uuid
@@ -6,43 +7,40 @@ from http import HTTPStatus
 from fastapi import HTTPException
 
 from app.llm_clients.openai_client import client
-from app.llm_clients.pinecone_config import pc
 from app.models.course import (
     QAItem,
 )
 from app.prompts.flashcards import PROMPT
+from app.services.embeddings import get_embeddings
+from app.services.vector_store import Match, document_namespace, get_vector_store
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def get_retrieved_docs(
-    document_id: uuid.UUID, index_name: str, query: str, top_k: int = 5
-):
+async def get_retrieved_docs(document_id: uuid.UUID, query: str, top_k: int = 5):
     """
-    Retrieve text chunks directly from Pinecone for a specific document.
+    Retrieve text chunks directly from the vector store for a specific document.
     """
-    index = pc.Index(index_name)
-
     try:
-        embed = await client.embeddings.create(
-            model="text-embedding-3-small",
-            input=query,
-        )
-        query_vector = embed.data[0].embedding
+        query_vector = (await get_embeddings([query]))[0]
 
-        results = index.query(
-            vector=query_vector,
-            top_k=top_k,
-            include_metadata=True,
-            filter={"document_id": str(document_id)},
-        )
+        def search() -> list[Match]:
+            return get_vector_store().query(
+                query_vector,
+                top_k=top_k,
+                filter={"document_id": str(document_id)},
+                namespace=document_namespace(document_id),
+            )
+
+        # The namespace lookup and the store query are blocking I/O
+        matches = await asyncio.to_thread(search)
 
-        return [match["metadata"]["text"] for match in results["matches"]]
+        return [match["metadata"]["text"] for match in matches]
 
     except Exception as exc:
         logger.error(
-            f"Pinecone retrieval failed for document {document_id}: {exc}",
+            f"Vector store retrieval failed for document {document_id}: {exc}",
             exc_info=True,
         )
         raise ConnectionError(
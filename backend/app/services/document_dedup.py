@@ -0,0 +1,137 @@
+"""
+Content-addressed document deduplication
+
+Uploads are hashed (sha256) while they are written to disk. A document whose
+file was already processed, in any course, reuses the earliest completed
+document with the same hash: its chunks are copied instead of parsing the
+PDF again, their embeddings come from the embedding cache, and the quizzes
+generated for them are copied, so only chunk/difficulty pairs the source
+never covered reach the LLM.
+"""
+
+import logging
+import uuid
+
+from sqlalchemy import exists
+from sqlmodel import Session, col, select
+
+from app.models.document import Document
+from app.models.embeddings import Chunk
+from app.models.quizzes import ChunkQuizGeneration, Quiz
+from app.schemas.public import DocumentStatus
+from app.services.bulk_insert import bulk_insert
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Quiz columns that belong to the copy rather than the source
+_QUIZ_OWN_FIELDS = {
+    "id",
+    "chunk_id",
+    "course_id",
+    "document_id",
+    "created_at",
+    "updated_at",
+}
+
+
+def find_source_document(session: Session, document: Document) -> Document | None:
+    """
+    The earliest completed document with the same content, if any. Documents
+    with chunks from before chunk_index was stored can't be sources: their
+    chunk order is unknown.
+    """
+    if document.content_hash is None:
+        return None
+    unordered = exists().where(
+        Chunk.document_id == Document.id, col(Chunk.chunk_index).is_(None)
+    )
+    return session.exec(
+        select(Document)
+        .where(
+            Document.content_hash == document.content_hash,
+            Document.id != document.id,
+            Document.status == DocumentStatus.COMPLETED,
+            ~unordered,
+        )
+        .order_by(col(Document.created_at))
+        .limit(1)
+    ).first()
+
+
+def ordered_chunks(session: Session, document_id: uuid.UUID) -> list[Chunk]:
+    """A document's chunks in document order."""
+    return list(
+        session.exec(
+            select(Chunk)
+            .where(Chunk.document_id == document_id)
+            .order_by(col(Chunk.chunk_index))
+        ).all()
+    )
+
+
+def copy_source_quizzes(session: Session, document: Document) -> int:
+    """
+    Copy the quizzes of the document's source, and the watermarks of the
+    chunk/difficulty pairs they cover, onto its matching chunks. Pairs the
+    document already has are skipped, so this is safe to repeat. Returns the
+    number of quizzes copied.
+    """
+    source = find_source_document(session, document)
+    if source is None:
+        return 0
+    source_chunks = ordered_chunks(session, source.id)
+    chunks = ordered_chunks(session, document.id)
+    # Chunked differently (e.g. the chunk settings changed since)
+    if [c.text_content for c in source_chunks] != [c.text_content for c in chunks]:
+        return 0
+    # Near-duplicates within the document's own course get no quizzes
+    chunk_ids = {
+        source_chunk.id: chunk.id
+        for source_chunk, chunk in zip(source_chunks, chunks, strict=True)
+        if chunk.duplicate_of is None
+    }
+
+    done = {
+        (chunk_id, level)
+        for chunk_id, level in session.exec(
+            select(
+                ChunkQuizGeneration.chunk_id, ChunkQuizGeneration.difficulty_level
+            ).where(col(ChunkQuizGeneration.chunk_id).in_(list(chunk_ids.values())))
+        ).all()
+    }
+    marks = [
+        ChunkQuizGeneration(
+            chunk_id=chunk_ids[mark.chunk_id], difficulty_level=mark.difficulty_level
+        )
+        for mark in session.exec(
+            select(ChunkQuizGeneration).where(
+                col(ChunkQuizGeneration.chunk_id).in_(list(chunk_ids))
+            )
+        ).all()
+        if (chunk_ids[mark.chunk_id], mark.difficulty_level) not in done
+    ]
+    copied = {(mark.chunk_id, mark.difficulty_level) for mark in marks}
+    quizzes = [
+        Quiz(
+            **quiz.model_dump(exclude=_QUIZ_OWN_FIELDS),
+            chunk_id=chunk_ids[quiz.chunk_id],
+            course_id=document.course_id,
+            document_id=document.id,
+        )
+        for quiz in session.exec(
+            select(Quiz).where(Quiz.document_id == source.id)
+        ).all()
+        if (chunk_ids.get(quiz.chunk_id), quiz.difficulty_level) in copied
+    ]
+
+    # Committing nothing would still expire the caller's loaded rows
+    if not marks:
+        return 0
+    bulk_insert(session, quizzes)
+    bulk_insert(session, marks)
+    session.commit()
+    logger.info(
+        f"Copied {len(quizzes)} quizzes from document {source.id} to {document.id}"
+    )
+    return len(quizzes)
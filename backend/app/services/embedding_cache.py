@@ -0,0 +1,186 @@
+"""
+Content-addressed embedding cache
+
+Embeddings are keyed by a hash of (model, normalized text) and looked up in
+two tiers: an in-process LRU and the `embeddingcache` table in Postgres.
+Lookups are batched, so only texts missing from both tiers reach the API.
+Postgres rows record when they were last served, and the job worker deletes
+those unused for EMBEDDING_CACHE_TTL_DAYS (see `prune_embedding_cache`).
+"""
+
+import asyncio
+import hashlib
+import logging
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, delete, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models.embedding_cache import EmbeddingCacheEntry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+
+def vector_to_bytes(vector: list[float] | np.ndarray) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def vector_from_bytes(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC with whitespace runs collapsed; case is preserved."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def content_hash(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode()).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, max_entries: int | None = None, persist: bool | None = None):
+        self.max_entries = (
+            settings.EMBEDDING_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        )
+        self.persist = settings.EMBEDDING_CACHE_PERSIST if persist is None else persist
+        self._lru: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _recall(self, key: str) -> np.ndarray | None:
+        vector = self._lru.get(key)
+        if vector is not None:
+            self._lru.move_to_end(key)
+        return vector
+
+    @staticmethod
+    def _load(keys: list[str]) -> dict[str, np.ndarray]:
+        with Session(engine) as session:
+            rows = session.exec(
+                select(
+                    EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.embedding
+                ).where(col(EmbeddingCacheEntry.content_hash).in_(keys))
+            ).all()
+            if rows:
+                # Daily resolution is plenty for a TTL in days and keeps
+                # repeated hits from rewriting the same rows
+                session.execute(
+                    update(EmbeddingCacheEntry)
+                    .where(
+                        col(EmbeddingCacheEntry.content_hash).in_(
+                            [key for key, _ in rows]
+                        ),
+                        col(EmbeddingCacheEntry.last_used_at)
+                        < datetime.now(timezone.utc) - timedelta(days=1),
+                    )
+                    .values(last_used_at=func.now())
+                )
+                session.commit()
+        return {key: vector_from_bytes(blob) for key, blob in rows}
+
+    @staticmethod
+    def _store(model: str, vectors: dict[str, np.ndarray]) -> None:
+        statement = (
+            insert(EmbeddingCacheEntry)
+            .values(
+                [
+                    {
+                        "content_hash": key,
+                        "model": model,
+                        "dimension": len(vector),
+                        "embedding": vector_to_bytes(vector),
+                    }
+                    for key, vector in vectors.items()
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=["content_hash"])
+        )
+        with Session(engine) as session:
+            session.execute(statement)
+            session.commit()
+
+    async def embed(
+        self, texts: list[str], model: str, fetch: EmbedFn
+    ) -> list[list[float]]:
+        """Return embeddings for `texts` in order, calling `fetch` only for misses."""
+        keys = [content_hash(model, text) for text in texts]
+        found: dict[str, np.ndarray] = {}
+        for key in keys:
+            vector = self._recall(key)
+            if vector is not None:
+                found[key] = vector
+        self.hits += sum(1 for key in keys if key in found)
+
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing and self.persist:
+            try:
+                stored = await asyncio.to_thread(self._load, missing)
+            except Exception as e:
+                logger.warning(f"Embedding cache lookup failed: {e}")
+                stored = {}
+            for key, vector in stored.items():
+                self._remember(key, vector)
+            found.update(stored)
+            self.persistent_hits += len(stored)
+            missing = [key for key in missing if key not in stored]
+
+        if missing:
+            self.misses += len(missing)
+            text_for_key = dict(zip(keys, texts, strict=True))
+            fetched = await fetch([text_for_key[key] for key in missing])
+            new_vectors = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(missing, fetched, strict=True)
+            }
+            for key, vector in new_vectors.items():
+                self._remember(key, vector)
+            found.update(new_vectors)
+
+            if self.persist:
+                try:
+                    await asyncio.to_thread(self._store, model, new_vectors)
+                except Exception as e:
+                    logger.warning(f"Embedding cache write failed: {e}")
+
+        return [found[key].tolist() for key in keys]
+
+
+def prune_embedding_cache(session: Session) -> int:
+    """
+    Delete persistent entries not served for EMBEDDING_CACHE_TTL_DAYS and
+    return how many were removed. Entries hot in a process's LRU are not
+    touched here, so they may be pruned and re-fetched once after a restart.
+    """
+    if settings.EMBEDDING_CACHE_TTL_DAYS <= 0:
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(
+        days=settings.EMBEDDING_CACHE_TTL_DAYS
+    )
+    result = session.execute(
+        delete(EmbeddingCacheEntry).where(
+            col(EmbeddingCacheEntry.last_used_at) < cutoff
+        )
+    )
+    session.commit()
+    return result.rowcount  # type: ignore[attr-defined]
+
+
+embedding_cache = EmbeddingCache()
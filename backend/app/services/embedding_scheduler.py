@@ -0,0 +1,138 @@
+"""
+Rate-limit-aware scheduler for OpenAI embedding requests
+
+A single scheduler is shared by every ingestion running in the process, so
+concurrent uploads draw from one requests-per-minute / tokens-per-minute
+budget instead of each hammering the API until it answers 429.
+"""
+
+import asyncio
+import logging
+import random
+import time
+
+import openai
+
+from app.core.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Continuously refilling budget of `per_minute` units."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(
+            self.capacity, self.available + (now - self.updated) * self.capacity / 60
+        )
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) * 60 / self.capacity
+
+    def consume(self, amount: float) -> None:
+        self.available -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits, granted in FIFO order."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> None:
+        async with self._lock:
+            while True:
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if wait <= 0:
+                    self.requests.consume(1)
+                    self.tokens.consume(tokens)
+                    return
+                await asyncio.sleep(wait)
+
+
+def estimate_tokens(texts: list[str]) -> int:
+    """Cheap upper-bound estimate (~4 chars per token) used for budgeting only."""
+    return sum(len(text) // 4 + 1 for text in texts)
+
+
+def retry_after(error: openai.APIStatusError) -> float | None:
+    value = error.response.headers.get("retry-after") if error.response else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class EmbeddingScheduler:
+    """
+    Runs embedding requests concurrently within a shared rate-limit budget,
+    retrying 429 and 5xx responses with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        client: openai.AsyncOpenAI,
+        model: str,
+        *,
+        max_concurrency: int | None = None,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+        max_retries: int | None = None,
+    ):
+        self.client = client
+        self.model = model
+        self.max_concurrency = max_concurrency or settings.EMBEDDING_MAX_CONCURRENCY
+        self.max_retries = (
+            settings.EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.limiter = RateLimiter(
+            requests_per_minute or settings.EMBEDDING_REQUESTS_PER_MINUTE,
+            tokens_per_minute or settings.EMBEDDING_TOKENS_PER_MINUTE,
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def _backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        delay = min(settings.EMBEDDING_RETRY_BASE_SECONDS * 2**attempt, 60.0)
+        delay = random.uniform(delay / 2, delay)
+        return max(delay, retry_after or 0.0)
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        tokens = estimate_tokens(texts)
+        async with self._semaphore:
+            attempt = 0
+            while True:
+                await self.limiter.acquire(tokens)
+                try:
+                    response = await self.client.embeddings.create(
+                        input=texts, model=self.model
+                    )
+                    return [item.embedding for item in response.data]
+                except (openai.RateLimitError, openai.InternalServerError) as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff(attempt, retry_after(e))
+                except openai.APIConnectionError:
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff(attempt)
+
+                attempt += 1
+                logger.warning(
+                    f"Embedding request failed (attempt {attempt}), retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
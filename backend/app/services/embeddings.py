@@ -0,0 +1,58 @@
+"""
+OpenAI embeddings for chat and ingestion, and their removal from the vector
+store
+
+Interactive texts and document chunks both go through the embedding cache;
+chunk cache misses are additionally rate-limited by the shared scheduler.
+"""
+
+import logging
+import os
+import uuid
+
+import openai
+
+from app.services.embedding_cache import embedding_cache
+from app.services.embedding_scheduler import EmbeddingScheduler
+from app.services.vector_store import get_vector_store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+async_openai_client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+embedding_scheduler = EmbeddingScheduler(async_openai_client, EMBEDDING_MODEL)
+
+
+async def request_embeddings(texts: list[str]) -> list[list[float]]:
+    response = await async_openai_client.embeddings.create(
+        input=texts,
+        model=EMBEDDING_MODEL,
+    )
+    return [item.embedding for item in response.data]
+
+
+async def get_embeddings(texts: list[str]) -> list[list[float]]:
+    """Embed interactive (chat, retrieval) texts; only cache misses hit the API."""
+    return await embedding_cache.embed(texts, EMBEDDING_MODEL, request_embeddings)
+
+
+async def embed_chunks(chunks: list[str]) -> list[list[float]]:
+    try:
+        # Cache misses are rate-limited and retried by the shared scheduler
+        return await embedding_cache.embed(
+            chunks, EMBEDDING_MODEL, embedding_scheduler.embed
+        )
+    except Exception as e:
+        raise RuntimeError(f"Embedding generation failed: {e}") from e
+
+
+def delete_embeddings_task(document_id: uuid.UUID, namespace: str | None = None):
+    """Background task to delete embeddings from the vector store."""
+    try:
+        get_vector_store().delete(
+            filter={"document_id": str(document_id)}, namespace=namespace
+        )
+    except Exception as e:
+        logger.error(f"Failed to delete embeddings for document {document_id}: {e}")
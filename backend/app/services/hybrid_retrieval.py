@@ -0,0 +1,214 @@
+"""
+Hybrid retrieval: Postgres full-text search fused with vector search
+
+Both legs run concurrently and are merged with weighted reciprocal-rank
+fusion, so chunks containing the exact terms of a question (formula names,
+dates) are found even when their embeddings are not the closest.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import Text, cast, func, literal_column
+from sqlalchemy.dialects.postgresql import TSQUERY
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models.course import Course
+from app.models.embeddings import Chunk
+from app.services.vector_store import Match, course_namespaces, get_vector_store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Must match the expression of the ix_chunk_text_content_tsv index
+TEXT_SEARCH_CONFIG = literal_column("'english'")
+
+
+@dataclass
+class RetrievalConfig:
+    top_k: int
+    vector_weight: float
+    lexical_weight: float
+    candidates: int
+    rrf_k: int
+
+    @classmethod
+    def for_course(cls, course: Course | None = None) -> "RetrievalConfig":
+        """Course-level overrides on top of the RETRIEVAL_* settings."""
+
+        def pick(name: str, default: float) -> float:
+            value = getattr(course, f"retrieval_{name}", None)
+            return default if value is None else value
+
+        return cls(
+            top_k=int(pick("top_k", settings.RETRIEVAL_TOP_K)),
+            vector_weight=pick("vector_weight", settings.RETRIEVAL_VECTOR_WEIGHT),
+            lexical_weight=pick("lexical_weight", settings.RETRIEVAL_LEXICAL_WEIGHT),
+            candidates=settings.RETRIEVAL_CANDIDATES,
+            rrf_k=settings.RETRIEVAL_RRF_K,
+        )
+
+
+@dataclass
+class RetrievalResult:
+    # Fused candidates, best first; vector-leg matches carry their "values"
+    matches: list[Match]
+    vector_ms: float = 0.0
+    lexical_ms: float = 0.0
+    vector_matches: list[Match] = field(default_factory=list)
+    lexical_matches: list[Match] = field(default_factory=list)
+
+
+def lexical_search(question: str, course_id: uuid.UUID, limit: int) -> list[Match]:
+    """
+    Rank the course's chunks by full-text relevance to the question.
+
+    Terms are OR-ed rather than AND-ed (plainto_tsquery's default), so a
+    chunk matches on any significant word and ts_rank_cd orders by coverage.
+    """
+    document = func.to_tsvector(TEXT_SEARCH_CONFIG, Chunk.text_content)
+    query = cast(
+        func.replace(
+            cast(func.plainto_tsquery(TEXT_SEARCH_CONFIG, question), Text), "&", "|"
+        ),
+        TSQUERY,
+    )
+    rank = func.ts_rank_cd(document, query)
+    statement = (
+        select(
+            Chunk.id,
+            Chunk.embedding_id,
+            Chunk.text_content,
+            Chunk.document_id,
+            rank.label("rank"),
+        )
+        .where(
+            col(Chunk.course_id) == course_id,
+            # Near-duplicates have no vector and repeat another chunk
+            col(Chunk.duplicate_of).is_(None),
+            document.op("@@")(query),
+        )
+        .order_by(rank.desc())
+        .limit(limit)
+    )
+    with Session(engine) as session:
+        rows = session.exec(statement).all()
+
+    return [
+        {
+            "id": row.embedding_id,
+            "score": float(row.rank),
+            "metadata": {
+                "course_id": str(course_id),
+                "document_id": str(row.document_id),
+                "chunk_id": str(row.id),
+                "text": row.text_content,
+            },
+        }
+        for row in rows
+    ]
+
+
+def reciprocal_rank_fusion(
+    rankings: list[tuple[list[Match], float]], k: int
+) -> list[Match]:
+    """
+    Merge ranked lists: each match scores sum(weight / (k + rank)) over the
+    lists it appears in. Matches are identified by their vector id.
+    """
+    scores: dict[str, float] = defaultdict(float)
+    by_id: dict[str, Match] = {}
+    for matches, weight in rankings:
+        for rank, match in enumerate(matches, start=1):
+            scores[match["id"]] += weight / (k + rank)
+            by_id.setdefault(match["id"], match)
+
+    ordered = sorted(scores, key=scores.__getitem__, reverse=True)
+    return [{**by_id[id], "score": scores[id]} for id in ordered]
+
+
+async def _timed(
+    leg: Callable[..., list[Match]], *args: Any
+) -> tuple[list[Match], float]:
+    began = time.perf_counter()
+    try:
+        matches = await asyncio.to_thread(leg, *args)
+    except Exception as e:
+        logger.error(f"[hybrid_retrieval] {leg.__name__} failed: {e}")
+        matches = []
+    return matches, (time.perf_counter() - began) * 1000
+
+
+def vector_search(
+    question_embedding: list[float], course_id: uuid.UUID, limit: int
+) -> list[Match]:
+    store = get_vector_store()
+    # Only courses with documents ingested before namespaces query twice
+    namespaces = course_namespaces(course_id) if store.supports_namespaces else [None]
+    matches = {
+        match["id"]: match
+        for namespace in namespaces
+        for match in store.query(
+            question_embedding,
+            top_k=limit,
+            filter={"course_id": str(course_id)},
+            include_values=True,
+            namespace=namespace,
+        )
+    }
+    ranked = sorted(matches.values(), key=lambda match: match["score"], reverse=True)
+    return ranked[:limit]
+
+
+async def _skipped() -> tuple[list[Match], float]:
+    return [], 0.0
+
+
+async def hybrid_search(
+    question: str,
+    question_embedding: list[float],
+    course_id: uuid.UUID,
+    config: RetrievalConfig,
+) -> RetrievalResult:
+    """
+    Run both legs concurrently; a failing leg is logged and contributes
+    nothing. All fused candidates are returned; callers pick the final
+    `config.top_k` (see context_assembly).
+    """
+    (vector_matches, vector_ms), (lexical_matches, lexical_ms) = await asyncio.gather(
+        _timed(vector_search, question_embedding, course_id, config.candidates)
+        if config.vector_weight > 0
+        else _skipped(),
+        _timed(lexical_search, question, course_id, config.candidates)
+        if config.lexical_weight > 0
+        else _skipped(),
+    )
+
+    fused = reciprocal_rank_fusion(
+        [
+            (vector_matches, config.vector_weight),
+            (lexical_matches, config.lexical_weight),
+        ],
+        config.rrf_k,
+    )
+
+    logger.info(
+        f"[hybrid_retrieval] course={course_id} vector_ms={vector_ms:.1f} "
+        f"lexical_ms={lexical_ms:.1f} vector_hits={len(vector_matches)} "
+        f"lexical_hits={len(lexical_matches)} fused={len(fused)}"
+    )
+    return RetrievalResult(
+        matches=fused,
+        vector_ms=vector_ms,
+        lexical_ms=lexical_ms,
+        vector_matches=vector_matches,
+        lexical_matches=lexical_matches,
+    )
@@ -0,0 +1,372 @@
+"""
+Streaming document ingestion pipeline
+
+pages -> chunks -> embedding batches -> vector upserts -> Chunk rows
+
+Every stage is an async iterator, so only the batches currently being embedded
+(at most EMBEDDING_MAX_CONCURRENCY) are held in memory, and the first batches
+become searchable while later pages are still being parsed.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from typing import TypeVar
+
+from sqlmodel import Session, col, delete, select
+
+from app.core.config import settings
+from app.models.document import Document
+from app.models.embeddings import Chunk
+from app.models.jobs import Job
+from app.models.quizzes import Quiz
+from app.schemas.public import DocumentStatus
+from app.services.bulk_insert import bulk_insert
+from app.services.chunk_dedup import (
+    DedupStats,
+    MinHashIndex,
+    load_course_index,
+    minhash_signature,
+    promote_duplicates,
+)
+from app.services.chunking import TextChunk, TokenChunker
+from app.services.document_dedup import find_source_document, ordered_chunks
+from app.services.embeddings import delete_embeddings_task, embed_chunks
+from app.services.job_queue import GENERATE_QUIZZES_JOB, enqueue_job
+from app.services.pdf_extraction import iter_pdf_pages
+from app.services.vector_store import (
+    Vector,
+    VectorStore,
+    course_namespace,
+    get_vector_store,
+    upsert_vectors,
+    vector_id,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+EMBED_BATCH_SIZE = 50
+
+
+async def iter_chunks(pages: AsyncIterator[str]) -> AsyncIterator[TextChunk]:
+    """
+    Split a stream of page texts into chunks as the pages arrive; boundaries
+    and overlap are the same as if the whole text had been split at once.
+    """
+    chunker = TokenChunker()
+    async for page in pages:
+        for chunk in chunker.feed(page):
+            yield chunk
+    for chunk in chunker.finish():
+        yield chunk
+
+
+async def iter_batches(items: AsyncIterator[T], size: int) -> AsyncIterator[list[T]]:
+    batch: list[T] = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def iter_records(
+    chunks: AsyncIterator[tuple[str, int | None]],
+    document_id: uuid.UUID,
+    course_id: uuid.UUID,
+    index: MinHashIndex | None,
+    stats: DedupStats,
+) -> AsyncIterator[Chunk]:
+    """
+    Build the Chunk rows of (text, token count) chunks in document order,
+    flagging near-duplicates of earlier chunks in `index`.
+    """
+    chunk_index = 0
+    async for text, token_count in chunks:
+        record = Chunk(
+            document_id=document_id,
+            text_content=text,
+            token_count=token_count,
+            chunk_index=chunk_index,
+            embedding_id=vector_id(document_id),
+            course_id=course_id,
+        )
+        if index is not None:
+            signature = minhash_signature(text)
+            record.minhash = signature.tobytes()
+            record.duplicate_of = index.find(signature)
+            if record.duplicate_of is None:
+                index.add(record.id, signature)
+        stats.record(record)
+        chunk_index += 1
+        yield record
+
+
+def chunk_vector(record: Chunk, embedding: list[float]) -> Vector:
+    return {
+        "id": record.embedding_id,
+        "values": embedding,
+        "metadata": {
+            "course_id": str(record.course_id),
+            "document_id": str(record.document_id),
+            "chunk_id": str(record.id),
+            "text": record.text_content,
+            "chunk_index": record.chunk_index,
+        },
+    }
+
+
+async def store_chunk_batch(
+    records: list[Chunk],
+    store: VectorStore,
+    session: Session,
+    previous: asyncio.Task[None] | None = None,
+) -> None:
+    """
+    Embed one batch, upsert its vectors, then persist the Chunk rows once the
+    `previous` batch has: near-duplicates reference earlier chunks of the
+    document, so rows are written in document order. Near-duplicates are
+    persisted only.
+    """
+    embedded = [record for record in records if record.duplicate_of is None]
+    if embedded:
+        embeddings = await embed_chunks([record.text_content for record in embedded])
+        await upsert_vectors(
+            store,
+            [
+                chunk_vector(record, embedding)
+                for record, embedding in zip(embedded, embeddings, strict=True)
+            ],
+            namespace=course_namespace(records[0].course_id),
+        )
+
+    if previous is not None:
+        await previous
+    bulk_insert(session, records)
+    session.commit()
+
+
+def clear_document_chunks(document_id: uuid.UUID, session: Session) -> None:
+    """Remove output of a previous, interrupted attempt so retries stay idempotent."""
+    namespace = session.exec(
+        select(Document.embedding_namespace).where(Document.id == document_id)
+    ).first()
+    promote_duplicates(session, document_id)
+    session.execute(delete(Quiz).where(Quiz.document_id == document_id))  # type: ignore
+    session.execute(delete(Chunk).where(Chunk.document_id == document_id))  # type: ignore
+    session.commit()
+    delete_embeddings_task(document_id, namespace)
+
+
+async def store_chunks(
+    records: AsyncIterator[Chunk], store: VectorStore, session: Session
+) -> int:
+    """Embed and store a stream of chunks; returns how many were stored."""
+    chunk_count = 0
+    in_flight: set[asyncio.Task[None]] = set()
+    previous: asyncio.Task[None] | None = None
+    try:
+        async for batch in iter_batches(records, EMBED_BATCH_SIZE):
+            # Keep as many batches in flight as the embedding scheduler
+            # can run at once; this also bounds memory use.
+            if len(in_flight) >= settings.EMBEDDING_MAX_CONCURRENCY:
+                done, in_flight = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    task.result()
+            previous = asyncio.create_task(
+                store_chunk_batch(batch, store, session, previous)
+            )
+            in_flight.add(previous)
+            chunk_count += len(batch)
+        await asyncio.gather(*in_flight)
+    finally:
+        for task in in_flight:
+            task.cancel()
+    return chunk_count
+
+
+async def iter_pdf_chunks(file_path: str) -> AsyncIterator[tuple[str, int | None]]:
+    async for chunk in iter_chunks(iter_pdf_pages(file_path)):
+        yield chunk.text, chunk.token_count
+
+
+async def iter_copied_chunks(
+    source_id: uuid.UUID, session: Session
+) -> AsyncIterator[tuple[str, int | None]]:
+    """
+    Chunks of an already processed document with the same content; their
+    embeddings come from the embedding cache rather than the API.
+    """
+    # Read up front: the batches commit, which would expire the rows
+    copied = [
+        (chunk.text_content, chunk.token_count)
+        for chunk in ordered_chunks(session, source_id)
+    ]
+    for chunk in copied:
+        yield chunk
+
+
+async def process_pdf_task(
+    file_path: str,
+    document_id: uuid.UUID,
+    course_id: uuid.UUID,
+    session: Session,
+    *,
+    retry: bool = False,
+    final_attempt: bool = True,
+) -> DedupStats | None:
+    """
+    Parse, chunk, embed, and store a PDF, then queue quiz generation. A PDF
+    that was processed before is not parsed again; the chunks of the earlier
+    document are copied instead. On errors the document is marked FAILED only
+    on the `final_attempt`; otherwise it goes back to PENDING for the retry.
+    A `retry` first removes whatever earlier attempts stored.
+    """
+    document = session.get(Document, document_id)
+    if not document:
+        return None
+
+    try:
+        store = get_vector_store()
+
+        # An earlier attempt may have upserted vectors without committing any
+        # Chunk rows, so retries clean up even when no rows are left behind
+        previous_attempt = (
+            retry
+            or session.exec(
+                select(Chunk.id).where(Chunk.document_id == document_id).limit(1)
+            ).first()
+        )
+        if previous_attempt:
+            clear_document_chunks(document_id, session)
+
+        document.status = DocumentStatus.PROCESSING
+        document.embedding_namespace = course_namespace(course_id)
+        session.add(document)
+        session.commit()
+
+        source = find_source_document(session, document)
+        if source is not None:
+            logger.info(
+                f"Document {document_id} has the same content as {source.id}, "
+                "copying its chunks"
+            )
+            chunks = iter_copied_chunks(source.id, session)
+        else:
+            chunks = iter_pdf_chunks(file_path)
+        index = load_course_index(session, course_id) if settings.CHUNK_DEDUP else None
+        stats = DedupStats()
+        chunk_count = await store_chunks(
+            iter_records(chunks, document_id, course_id, index, stats), store, session
+        )
+        if stats.duplicates:
+            logger.info(
+                f"{stats.duplicates} of {stats.chunks} chunks of document "
+                f"{document_id} repeat earlier chunks of the course; saved "
+                f"{stats.tokens_saved} embedding tokens and "
+                f"{stats.bytes_saved / 1024:.0f} KB of vector storage"
+            )
+
+        logger.info(f"Chunks length {chunk_count}")
+
+        if not chunk_count:
+            document.status = DocumentStatus.FAILED
+            session.add(document)
+            session.commit()
+            return stats
+
+        document.updated_at = datetime.now(timezone.utc)
+        document.status = DocumentStatus.COMPLETED
+        document.chunk_count = chunk_count
+        session.add(document)
+
+        # Quiz generation is slow and LLM-bound; run it as its own job so it
+        # can be retried without re-embedding the document.
+        enqueue_job(
+            session,
+            GENERATE_QUIZZES_JOB,
+            {"document_id": str(document_id), "course_id": str(course_id)},
+            document_id=document_id,
+            commit=False,
+        )
+        session.commit()
+        return stats
+
+    except Exception as e:
+        logger.error(f"[process_pdf_task] Error processing document: {e}")
+        session.rollback()
+        document.status = (
+            DocumentStatus.FAILED if final_attempt else DocumentStatus.PENDING
+        )
+        session.add(document)
+        session.commit()
+        raise
+
+
+async def process_pdf_job(job: Job, session: Session) -> None:
+    """Job handler for PROCESS_PDF_JOB; the upload is removed once the job is settled."""
+    file_path = job.payload["file_path"]
+    try:
+        stats = await process_pdf_task(
+            file_path,
+            uuid.UUID(job.payload["document_id"]),
+            uuid.UUID(job.payload["course_id"]),
+            session,
+            retry=job.attempts > 1,
+            final_attempt=job.is_final_attempt,
+        )
+        if stats is not None:
+            job.progress = stats.as_dict()
+            session.add(job)
+            session.commit()
+    except Exception:
+        if job.is_final_attempt and os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+
+async def embed_chunks_job(job: Job, session: Session) -> None:
+    """
+    Job handler for EMBED_CHUNKS_JOB: embed and upsert chunks that stopped
+    being near-duplicates (see promote_duplicates), then queue quiz
+    generation for their documents.
+    """
+    chunk_ids = [uuid.UUID(chunk_id) for chunk_id in job.payload["chunk_ids"]]
+    rows = session.exec(
+        select(Chunk, Document.embedding_namespace)
+        .join(Document, Document.id == Chunk.document_id)  # type: ignore[arg-type]
+        .where(col(Chunk.id).in_(chunk_ids), col(Chunk.duplicate_of).is_(None))
+    ).all()
+    if not rows:
+        return
+
+    embeddings = await embed_chunks([chunk.text_content for chunk, _ in rows])
+    by_namespace: dict[str | None, list[Vector]] = {}
+    for (chunk, namespace), embedding in zip(rows, embeddings, strict=True):
+        by_namespace.setdefault(namespace, []).append(chunk_vector(chunk, embedding))
+    store = get_vector_store()
+    for namespace, vectors in by_namespace.items():
+        await upsert_vectors(store, vectors, namespace=namespace)
+
+    documents = {(chunk.document_id, chunk.course_id) for chunk, _ in rows}
+    for document_id, course_id in documents:
+        enqueue_job(
+            session,
+            GENERATE_QUIZZES_JOB,
+            {"document_id": str(document_id), "course_id": str(course_id)},
+            document_id=document_id,
+            commit=False,
+        )
+    session.commit()
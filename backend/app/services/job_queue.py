@@ -0,0 +1,174 @@
+"""
+Postgres-backed job queue for background work (document ingestion, quiz generation)
+"""
+
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import or_, update
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models.jobs import Job
+from app.schemas.public import JobStatus
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Job kinds understood by app.worker
+PROCESS_PDF_JOB = "process_pdf"
+GENERATE_QUIZZES_JOB = "generate_quizzes"
+EMBED_CHUNKS_JOB = "embed_chunks"
+
+
+def enqueue_job(
+    session: Session,
+    kind: str,
+    payload: dict[str, Any],
+    *,
+    document_id: uuid.UUID | None = None,
+    max_attempts: int | None = None,
+    commit: bool = True,
+) -> Job:
+    """Persist a new job so that any worker process can pick it up"""
+    job = Job(
+        kind=kind,
+        payload=payload,
+        document_id=document_id,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    session.add(job)
+    if commit:
+        session.commit()
+        session.refresh(job)
+    return job
+
+
+def claim_next_job(
+    session: Session, worker_id: str, kinds: list[str] | None = None
+) -> Job | None:
+    """
+    Atomically claim the oldest due job, optionally restricted to `kinds`.
+
+    Running jobs whose lock has expired (the worker died mid-job) are
+    reclaimed as well, so a restart never loses work.
+    """
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS)
+
+    statement = (
+        select(Job)
+        .where(
+            or_(
+                (Job.status == JobStatus.QUEUED) & (Job.run_after <= now),  # type: ignore
+                (Job.status == JobStatus.RUNNING) & (Job.locked_at < stale_before),  # type: ignore
+            )
+        )
+        .order_by(Job.run_after)  # type: ignore
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    if kinds:
+        statement = statement.where(Job.kind.in_(kinds))  # type: ignore
+    job = session.exec(statement).first()
+    if not job:
+        session.rollback()
+        return None
+
+    job.status = JobStatus.RUNNING
+    job.attempts += 1
+    job.locked_by = worker_id
+    job.locked_at = now
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def renew_job_lock(session: Session, job_id: uuid.UUID, worker_id: str) -> bool:
+    """
+    Refresh the lock of a job the worker is still running, so it isn't
+    reclaimed as orphaned. False if the job is no longer locked by the worker.
+    """
+    result = session.execute(
+        update(Job)
+        .where(
+            Job.id == job_id,  # type: ignore
+            Job.status == JobStatus.RUNNING,  # type: ignore
+            Job.locked_by == worker_id,  # type: ignore
+        )
+        .values(locked_at=datetime.now(timezone.utc))
+    )
+    session.commit()
+    return result.rowcount == 1  # type: ignore[attr-defined]
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter on top of the base delay"""
+    base = settings.JOB_RETRY_BACKOFF_SECONDS
+    return base * 2 ** max(attempts - 1, 0) + random.uniform(0, base)
+
+
+def _release_job(session: Session, job: Job, worker_id: str, **values: Any) -> bool:
+    """
+    Unlock a job the worker still holds and apply `values`. False (and
+    nothing written) if its lock expired and the job was reclaimed.
+    """
+    job_id = job.id
+    result = session.execute(
+        update(Job)
+        .where(
+            Job.id == job_id,  # type: ignore
+            Job.status == JobStatus.RUNNING,  # type: ignore
+            Job.locked_by == worker_id,  # type: ignore
+        )
+        .values(locked_by=None, locked_at=None, **values)
+    )
+    session.commit()
+    if result.rowcount != 1:  # type: ignore[attr-defined]
+        logger.warning(f"[{worker_id}] Job {job_id} is no longer locked by it")
+        return False
+    return True
+
+
+def complete_job(session: Session, job: Job, worker_id: str) -> bool:
+    return _release_job(
+        session, job, worker_id, status=JobStatus.SUCCEEDED, last_error=None
+    )
+
+
+def fail_job(session: Session, job: Job, error: str, worker_id: str) -> bool:
+    """Record a failure and either schedule a retry or give up"""
+    if job.is_final_attempt:
+        if not _release_job(
+            session, job, worker_id, status=JobStatus.FAILED, last_error=error[:2048]
+        ):
+            return False
+        logger.error(
+            f"Job {job.id} ({job.kind}) failed permanently after {job.attempts} attempts: {error}"
+        )
+    else:
+        delay = retry_delay(job.attempts)
+        if not _release_job(
+            session,
+            job,
+            worker_id,
+            status=JobStatus.QUEUED,
+            last_error=error[:2048],
+            run_after=datetime.now(timezone.utc) + timedelta(seconds=delay),
+        ):
+            return False
+        logger.warning(
+            f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}, retrying in {delay:.1f}s: {error}"
+        )
+    return True
+
+
+def get_document_jobs(session: Session, document_id: uuid.UUID) -> list[Job]:
+    statement = (
+        select(Job).where(Job.document_id == document_id).order_by(Job.created_at)  # type: ignore
+    )
+    return list(session.exec(statement).all())
@@ -5,8 +5,8 @@ import asyncio
 from collections.abc import AsyncGenerator
 from typing import List, Dict, Any
 
-from app.api.routes.documents import async_openai_client
 from app.services.chat_utils import count_tokens
+from app.services.embeddings import async_openai_client
 
 
 async def stream_cached_response(response: str) -> AsyncGenerator[str, None]:
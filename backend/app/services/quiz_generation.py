@@ -0,0 +1,123 @@
+"""
+Concurrent quiz generation
+
+Every (chunk batch, difficulty level) pair is an independent LLM request.
+They run concurrently, at most QUIZ_GENERATION_MAX_CONCURRENCY at a time per
+process, within a shared requests/tokens-per-minute budget; 429 and 5xx
+responses are retried with jittered backoff instead of pausing after every
+batch.
+"""
+
+import asyncio
+import json
+import logging
+import random
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import asdict, dataclass
+from typing import Any, TypeVar
+
+import openai
+
+from app.core.config import settings
+from app.prompts.quizzes import get_quiz_prompt
+from app.services.embedding_scheduler import RateLimiter, retry_after
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 20-30 quizzes of ~150 tokens each, budgeted on top of the prompt
+COMPLETION_TOKEN_ESTIMATE = 5000
+
+T = TypeVar("T")
+
+quiz_rate_limiter = RateLimiter(
+    settings.QUIZ_REQUESTS_PER_MINUTE, settings.QUIZ_TOKENS_PER_MINUTE
+)
+_semaphore = asyncio.Semaphore(settings.QUIZ_GENERATION_MAX_CONCURRENCY)
+
+
+@dataclass
+class QuizGenerationProgress:
+    total: int
+    completed: int = 0
+    failed: int = 0
+    quizzes: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+def _backoff(attempt: int, retry_after: float | None = None) -> float:
+    delay = min(settings.QUIZ_RETRY_BASE_SECONDS * 2**attempt, 60.0)
+    delay = random.uniform(delay / 2, delay)
+    return max(delay, retry_after or 0.0)
+
+
+async def request_quizzes(prompt: str, prompt_tokens: int) -> list[dict[str, Any]]:
+    """
+    Ask the LLM for quizzes, waiting for rate-limit budget first. Returns the
+    quiz objects of the response, or an empty list if it is malformed.
+    """
+    attempt = 0
+    while True:
+        await quiz_rate_limiter.acquire(prompt_tokens + COMPLETION_TOKEN_ESTIMATE)
+        try:
+            response = await get_quiz_prompt(prompt)
+            break
+        except (openai.RateLimitError, openai.InternalServerError) as e:
+            if attempt >= settings.QUIZ_MAX_RETRIES:
+                raise
+            delay = _backoff(attempt, retry_after(e))
+        except openai.APIConnectionError:
+            if attempt >= settings.QUIZ_MAX_RETRIES:
+                raise
+            delay = _backoff(attempt)
+
+        attempt += 1
+        logger.warning(
+            f"Quiz request failed (attempt {attempt}), retrying in {delay:.1f}s"
+        )
+        await asyncio.sleep(delay)
+
+    raw_content = response.choices[0].message.content or ""
+    try:
+        quiz_list = json.loads(raw_content).get("quizzes", [])
+    except json.JSONDecodeError as e:
+        logger.error(
+            f"Failed to parse LLM response for batch: {e}. Raw content: {raw_content[:200]}..."
+        )
+        return []
+    if not isinstance(quiz_list, list):
+        logger.error(
+            f"LLM did not return 'quizzes' as a list for batch. Got: {type(quiz_list)}"
+        )
+        return []
+    return quiz_list
+
+
+async def run_quiz_batches(
+    items: Sequence[T],
+    handle: Callable[[T], Awaitable[int]],
+    on_progress: Callable[[QuizGenerationProgress], None] | None = None,
+) -> QuizGenerationProgress:
+    """
+    Run `handle` (which returns the number of quizzes it saved) for every
+    item concurrently. A failing item is logged and counted, not raised, so
+    the others still finish; `on_progress` is called after each item.
+    """
+    progress = QuizGenerationProgress(total=len(items))
+
+    async def run(item: T) -> None:
+        async with _semaphore:
+            try:
+                saved = await handle(item)
+                progress.quizzes += saved
+                progress.completed += 1
+            except Exception as e:
+                progress.failed += 1
+                logger.error(f"Quiz batch failed: {e}", exc_info=True)
+        if on_progress is not None:
+            on_progress(progress)
+
+    await asyncio.gather(*(run(item) for item in items))
+    return progress
@@ -1,57 +1,44 @@
 """
 RAG (Retrieval-Augmented Generation) service for document context retrieval
 """
-import uuid
 from typing import List, Optional
 
-from app.api.routes.documents import (
-    async_openai_client,
-    EMBEDDING_MODEL,
-    index_name,
-    pc,
-)
+from app.models.course import Course
+from app.services.context_assembly import assemble_context
+from app.services.embeddings import get_embeddings
+from app.services.hybrid_retrieval import RetrievalConfig, hybrid_search
 
 
 async def get_question_embedding(question: str) -> List[float]:
-    """Generate embedding for a question"""
-    embed_resp = await async_openai_client.embeddings.create(
-        input=[question],
-        model=EMBEDDING_MODEL,
-    )
-    return embed_resp.data[0].embedding
+    """Generate embedding for a question (served from cache when seen before)"""
+    embeddings = await get_embeddings([question])
+    return embeddings[0]
 
 
 async def retrieve_relevant_context(
+    question: str,
     question_embedding: List[float], 
-    course_id: uuid.UUID,
-    top_k: int = 5
+    course: Course,
 ) -> Optional[str]:
     """
-    Retrieve relevant context from course documents using vector similarity
+    Retrieve relevant context from course documents using hybrid retrieval
     
     Args:
+        question: The question text, used for full-text matching
         question_embedding: The embedding vector for the question
-        course_id: UUID of the course to search within
-        top_k: Number of top matches to retrieve
+        course: The course to search within; its retrieval_* fields override
+            the default top_k and fusion weights
         
     Returns:
         Concatenated context string or None if no relevant content found
     """
     try:
-        # Query Pinecone for relevant chunks
-        index = pc.Index(index_name)
-        query_result = index.query(
-            vector=question_embedding,
-            filter={"course_id": str(course_id)},
-            top_k=top_k,
-            include_metadata=True,
-        )
+        # Fuse full-text and vector matches for relevant chunks
+        config = RetrievalConfig.for_course(course)
+        result = await hybrid_search(question, question_embedding, course.id, config)
         
-        contexts = [
-            match["metadata"]["text"]
-            for match in query_result["matches"]
-            if "metadata" in match and "text" in match["metadata"]
-        ]
+        # Deduplicate, diversify and merge neighbouring chunks within budget
+        contexts = assemble_context(result.matches, max_chunks=config.top_k)
 
         if not contexts:
             return None
@@ -60,4 +47,4 @@ async def retrieve_relevant_context(
         
     except Exception as e:
         print(f"Error retrieving context: {e}")
-        return None
\ No newline at end of file
+        return None
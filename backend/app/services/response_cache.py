@@ -0,0 +1,201 @@
+"""
+Per-course in-memory nearest-neighbour index of (question embedding -> answer)
+
+Each course keeps a fixed-capacity float32 matrix of unit-normalized question
+embeddings, so a lookup is one matrix-vector product regardless of how much
+chat history the course has. Entries are evicted by LRU or TTL.
+"""
+
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+import numpy as np
+
+from app.core.config import settings
+
+EvictionPolicy = Literal["lru", "ttl"]
+
+
+@dataclass
+class CacheEntry:
+    key: uuid.UUID
+    question: str
+    answer: str
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+def _normalize(vector: Any) -> np.ndarray | None:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm > 0 else None
+
+
+class CourseIndex:
+    """Fixed-capacity slot matrix for a single course; not thread-safe on its own."""
+
+    def __init__(self, capacity: int, policy: EvictionPolicy, ttl_seconds: float):
+        self.capacity = capacity
+        self.policy = policy
+        self.ttl_seconds = ttl_seconds
+        self.matrix: np.ndarray | None = None
+        self.slots: list[CacheEntry | None] = []
+        self.slot_for_key: dict[uuid.UUID, int] = {}
+        self.synced_at: float | None = None
+
+    def __len__(self) -> int:
+        return len(self.slot_for_key)
+
+    def _expired(self, entry: CacheEntry, now: float) -> bool:
+        return self.policy == "ttl" and now - entry.created_at > self.ttl_seconds
+
+    def _victim(self, now: float) -> int:
+        entries = [(i, e) for i, e in enumerate(self.slots) if e is not None]
+        for i, entry in entries:
+            if self._expired(entry, now):
+                return i
+        if self.policy == "ttl":
+            return min(entries, key=lambda item: item[1].created_at)[0]
+        return min(entries, key=lambda item: item[1].last_used)[0]
+
+    def _free(self, slot: int) -> None:
+        entry = self.slots[slot]
+        if entry is not None:
+            del self.slot_for_key[entry.key]
+            self.slots[slot] = None
+
+    def add(self, entry: CacheEntry, embedding: np.ndarray) -> None:
+        if entry.key in self.slot_for_key:
+            return
+        if self.matrix is None:
+            self.matrix = np.zeros((self.capacity, len(embedding)), dtype=np.float32)
+
+        if len(self.slots) < self.capacity:
+            slot = len(self.slots)
+            self.slots.append(None)
+        else:
+            free = [i for i, e in enumerate(self.slots) if e is None]
+            slot = free[0] if free else self._victim(time.monotonic())
+            self._free(slot)
+
+        self.matrix[slot] = embedding
+        self.slots[slot] = entry
+        self.slot_for_key[entry.key] = slot
+
+    def search(self, query: np.ndarray) -> tuple[CacheEntry, float] | None:
+        if self.matrix is None or not self.slot_for_key:
+            return None
+
+        used = len(self.slots)
+        similarities = self.matrix[:used] @ query
+        now = time.monotonic()
+        for i, entry in enumerate(self.slots):
+            if entry is None:
+                similarities[i] = -np.inf
+            elif self._expired(entry, now):
+                self._free(i)
+                similarities[i] = -np.inf
+
+        best = int(np.argmax(similarities))
+        entry = self.slots[best]
+        if entry is None:
+            return None
+        return entry, float(similarities[best])
+
+
+class ResponseCache:
+    """
+    Semantic response cache shared by every coroutine (and threadpool route)
+    in the process. All state changes happen under one lock and never await.
+    """
+
+    def __init__(
+        self,
+        *,
+        policy: EvictionPolicy | None = None,
+        max_entries_per_course: int | None = None,
+        ttl_seconds: float | None = None,
+    ):
+        self.policy: EvictionPolicy = policy or settings.RESPONSE_CACHE_POLICY
+        self.max_entries_per_course = (
+            max_entries_per_course or settings.RESPONSE_CACHE_MAX_ENTRIES_PER_COURSE
+        )
+        self.ttl_seconds = ttl_seconds or settings.RESPONSE_CACHE_TTL_SECONDS
+        self._courses: dict[uuid.UUID, CourseIndex] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _index(self, course_id: uuid.UUID) -> CourseIndex:
+        index = self._courses.get(course_id)
+        if index is None:
+            index = CourseIndex(
+                self.max_entries_per_course, self.policy, self.ttl_seconds
+            )
+            self._courses[course_id] = index
+        return index
+
+    def add(
+        self,
+        course_id: uuid.UUID,
+        key: uuid.UUID,
+        question: str,
+        answer: str,
+        embedding: Any,
+    ) -> None:
+        normalized = _normalize(embedding)
+        if normalized is None:
+            return
+        with self._lock:
+            self._index(course_id).add(
+                CacheEntry(key=key, question=question, answer=answer), normalized
+            )
+
+    def lookup(
+        self, course_id: uuid.UUID, embedding: Any, threshold: float
+    ) -> tuple[str, str] | None:
+        """Returns: (answer, original_question) for the closest match above threshold"""
+        query = _normalize(embedding)
+        with self._lock:
+            index = self._courses.get(course_id)
+            match = index.search(query) if index and query is not None else None
+            if match is None or match[1] < threshold:
+                self.misses += 1
+                return None
+
+            entry, _ = match
+            entry.last_used = time.monotonic()
+            self.hits += 1
+            return entry.answer, entry.question
+
+    def synced_at(self, course_id: uuid.UUID) -> float | None:
+        with self._lock:
+            index = self._courses.get(course_id)
+            return index.synced_at if index else None
+
+    def mark_synced(self, course_id: uuid.UUID, at: float) -> None:
+        with self._lock:
+            self._index(course_id).synced_at = at
+
+    def invalidate(self, course_id: uuid.UUID) -> None:
+        with self._lock:
+            self._courses.pop(course_id, None)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": settings.RESPONSE_CACHE_BACKEND,
+                "policy": self.policy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "courses": len(self._courses),
+                "entries": sum(len(index) for index in self._courses.values()),
+            }
+
+
+response_cache = ResponseCache()
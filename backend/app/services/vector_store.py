@@ -0,0 +1,610 @@
+"""
+Vector store backends
+
+`PineconeVectorStore` wraps the hosted index. `LocalVectorStore` keeps
+memory-mapped float32 matrices on disk, one segment per document grouped in
+a directory per course, and answers queries with an exact dot-product scan.
+`PgVectorStore` keeps vectors next to the chunks in Postgres.
+Both take Pinecone-shaped vectors and return Pinecone-shaped matches, and
+filter on `course_id` / `document_id` metadata.
+
+Pinecone vectors live in one namespace per course (`course_namespace`), so
+course queries and deletes don't scan the whole index with a metadata
+filter; documents ingested before that stay in the default namespace until
+they are re-ingested (`Document.embedding_namespace` is None for them). The
+local and pgvector stores already partition by course and ignore namespaces.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any
+
+import numpy as np
+from pinecone import Pinecone, ServerlessSpec
+from sqlalchemy import Float, inspect, literal, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, delete, select
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models.document import Document
+from app.models.embeddings import EMBEDDING_DIMENSION, Chunk, ChunkEmbedding, PgVector
+from app.schemas.public import DocumentStatus
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "developer-quickstart-py"
+EXPECTED_DIMENSION = EMBEDDING_DIMENSION
+FILTER_KEYS = ("course_id", "document_id")
+
+Vector = dict[str, Any]  # {"id", "values", "metadata"}
+Match = dict[str, Any]  # {"id", "score", "metadata"}
+
+
+def course_namespace(course_id: uuid.UUID | str) -> str:
+    return f"course-{course_id}"
+
+
+def vector_id(document_id: uuid.UUID | str) -> str:
+    """
+    New vector id for a chunk of the document. The document prefix lets a
+    document's vectors be listed and deleted in its namespace, including
+    vectors upserted by an attempt that never committed their Chunk rows.
+    """
+    return f"{document_id}#{uuid.uuid4()}"
+
+
+class VectorStore(ABC):
+    # Whether `namespace` partitions vectors; stores that ignore it return
+    # the same matches for every namespace
+    supports_namespaces = False
+
+    @abstractmethod
+    def upsert(
+        self, vectors: list[Vector], *, namespace: str | None = None
+    ) -> None: ...
+
+    @abstractmethod
+    def query(
+        self,
+        vector: list[float],
+        *,
+        top_k: int,
+        filter: dict[str, str],
+        include_values: bool = False,
+        namespace: str | None = None,
+    ) -> list[Match]:
+        """
+        Return the `top_k` best matches by cosine similarity, best first.
+        With `include_values` each match also carries its vector as "values".
+        """
+
+    @abstractmethod
+    def delete(
+        self, *, filter: dict[str, str], namespace: str | None = None
+    ) -> None: ...
+
+
+class PineconeVectorStore(VectorStore):
+    supports_namespaces = True
+
+    def __init__(
+        self, index_name: str = INDEX_NAME, dimension: int = EXPECTED_DIMENSION
+    ):
+        self.index_name = index_name
+        self.dimension = dimension
+        self.client = Pinecone(
+            api_key=os.getenv("PINECONE_API_KEY"),
+            environment=os.getenv("PINECONE_ENV_NAME"),
+        )
+        self._index_checked = False
+
+    def ensure_index_exists(self) -> None:
+        """Ensure Pinecone index exists with the correct dimension, recreate if wrong."""
+        if self.client.has_index(self.index_name):
+            existing = self.client.describe_index(self.index_name)
+            if existing.dimension == self.dimension:
+                return
+            self.client.delete_index(self.index_name)
+        self.client.create_index(
+            name=self.index_name,
+            dimension=self.dimension,
+            metric="cosine",
+            spec=ServerlessSpec(cloud="aws", region="us-east-1"),
+        )
+
+    @property
+    def index(self) -> Any:
+        return self.client.Index(self.index_name)
+
+    def upsert(self, vectors: list[Vector], *, namespace: str | None = None) -> None:
+        if not self._index_checked:
+            self.ensure_index_exists()
+            self._index_checked = True
+        self.index.upsert(vectors=vectors, namespace=namespace)
+
+    @staticmethod
+    def _filter(filter: dict[str, str], namespace: str | None) -> dict[str, str] | None:
+        # A course namespace holds only that course's vectors
+        if namespace is not None:
+            filter = {key: value for key, value in filter.items() if key != "course_id"}
+        return filter or None
+
+    def query(
+        self,
+        vector: list[float],
+        *,
+        top_k: int,
+        filter: dict[str, str],
+        include_values: bool = False,
+        namespace: str | None = None,
+    ) -> list[Match]:
+        result = self.index.query(
+            vector=vector,
+            filter=self._filter(filter, namespace),
+            top_k=top_k,
+            include_metadata=True,
+            include_values=include_values,
+            namespace=namespace,
+        )
+        return [
+            {
+                "id": match["id"],
+                "score": match["score"],
+                "metadata": match.get("metadata") or {},
+                **({"values": match["values"]} if include_values else {}),
+            }
+            for match in result["matches"]
+        ]
+
+    def delete(self, *, filter: dict[str, str], namespace: str | None = None) -> None:
+        if not self.client.has_index(self.index_name):
+            return
+        index = self.index
+        remaining = self._filter(filter, namespace)
+        if namespace is not None and remaining is None:
+            index.delete(delete_all=True, namespace=namespace)
+        elif namespace is not None and remaining and set(remaining) == {"document_id"}:
+            # Serverless indexes can't delete by metadata filter; vector ids
+            # start with their document id (see vector_id)
+            prefix = f"{remaining['document_id']}#"
+            for ids in index.list(prefix=prefix, namespace=namespace):
+                index.delete(ids=ids, namespace=namespace)
+        else:
+            index.delete(filter=filter, namespace=namespace)
+
+
+def _check_filter(filter: dict[str, str]) -> None:
+    unsupported = set(filter) - set(FILTER_KEYS)
+    if unsupported:
+        raise ValueError(f"Unsupported vector filter keys: {sorted(unsupported)}")
+
+
+def _metadata_path(vectors_path: str) -> str:
+    return vectors_path[: -len(".f32")] + ".jsonl"
+
+
+class _Segment:
+    """
+    One document's vectors (`<document_id>.f32`, row-major float32) and their
+    metadata (`<document_id>.jsonl`, one line per row). Vectors are appended
+    before metadata, so every complete metadata line has its row on disk.
+    """
+
+    def __init__(self, vectors_path: str, dimension: int):
+        self.vectors_path = vectors_path
+        self.metadata_path = _metadata_path(vectors_path)
+        self.dimension = dimension
+        self.matrix: np.ndarray | None = None
+        self.records: list[dict[str, Any]] = []
+        self._vectors_size = -1
+        self._metadata_offset = 0
+        self._inode = -1
+
+    def __len__(self) -> int:
+        return 0 if self.matrix is None else min(len(self.matrix), len(self.records))
+
+    def refresh(self) -> None:
+        """Pick up rows appended (or a rewrite made) by any process since the last read."""
+        try:
+            vectors_stat = os.stat(self.vectors_path)
+            metadata_size = os.path.getsize(self.metadata_path)
+        except FileNotFoundError:
+            vectors_stat, metadata_size = None, 0
+
+        # Missing or replaced (deleted and re-ingested) files start over
+        if vectors_stat is None or vectors_stat.st_ino != self._inode:
+            self.matrix, self.records = None, []
+            self._vectors_size, self._metadata_offset = -1, 0
+            if vectors_stat is None:
+                return
+            self._inode = vectors_stat.st_ino
+
+        vectors_size = vectors_stat.st_size
+        if vectors_size != self._vectors_size:
+            rows = vectors_size // (4 * self.dimension)
+            self.matrix = (
+                np.memmap(
+                    self.vectors_path,
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(rows, self.dimension),
+                )
+                if rows
+                else None
+            )
+            self._vectors_size = vectors_size
+
+        if metadata_size > self._metadata_offset:
+            with open(self.metadata_path, "rb") as f:
+                f.seek(self._metadata_offset)
+                data = f.read(metadata_size - self._metadata_offset)
+            complete = data[: data.rfind(b"\n") + 1]
+            self.records.extend(json.loads(line) for line in complete.splitlines())
+            self._metadata_offset += len(complete)
+
+    def search(
+        self, query: np.ndarray, top_k: int, include_values: bool = False
+    ) -> list[Match]:
+        rows = len(self)
+        if not rows:
+            return []
+        scores = self.matrix[:rows] @ query  # type: ignore[index]
+        k = min(top_k, rows)
+        best = np.argpartition(-scores, k - 1)[:k]
+        return [
+            {
+                "id": self.records[i]["id"],
+                "score": float(scores[i]),
+                "metadata": self.records[i]["metadata"],
+                **(
+                    {"values": self.matrix[i].tolist()}  # type: ignore[index]
+                    if include_values
+                    else {}
+                ),
+            }
+            for i in best
+        ]
+
+
+class LocalVectorStore(VectorStore):
+    """
+    On-disk store under `root`: `<root>/<course_id>/<document_id>.{f32,jsonl}`.
+
+    Vectors are unit-normalized on write so a query is a single matrix-vector
+    product per segment. Segments are append-only; one ingestion job writes a
+    given document, while any number of API processes read it. Upserting an
+    id that already exists adds a second row rather than replacing it.
+    """
+
+    def __init__(self, root: str, dimension: int = EXPECTED_DIMENSION):
+        self.root = root
+        self.dimension = dimension
+        self._segments: dict[str, _Segment] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _vectors_path(self, course_id: str, document_id: str) -> str:
+        return os.path.join(self.root, course_id, f"{document_id}.f32")
+
+    def _segment(self, vectors_path: str) -> _Segment:
+        segment = self._segments.get(vectors_path)
+        if segment is None:
+            segment = _Segment(vectors_path, self.dimension)
+            self._segments[vectors_path] = segment
+        segment.refresh()
+        return segment
+
+    def _matching_paths(self, filter: dict[str, str]) -> list[str]:
+        _check_filter(filter)
+        course_id = filter.get("course_id")
+        document_id = filter.get("document_id")
+        courses = [course_id] if course_id else sorted(os.listdir(self.root))
+        paths = []
+        for course in courses:
+            course_dir = os.path.join(self.root, course)
+            if not os.path.isdir(course_dir):
+                continue
+            if document_id:
+                candidate = self._vectors_path(course, document_id)
+                if os.path.exists(candidate):
+                    paths.append(candidate)
+            else:
+                paths.extend(
+                    os.path.join(course_dir, name)
+                    for name in sorted(os.listdir(course_dir))
+                    if name.endswith(".f32")
+                )
+        return paths
+
+    def upsert(self, vectors: list[Vector], *, namespace: str | None = None) -> None:
+        grouped: dict[tuple[str, str], list[Vector]] = defaultdict(list)
+        for vector in vectors:
+            metadata = vector["metadata"]
+            grouped[(metadata["course_id"], metadata["document_id"])].append(vector)
+
+        with self._lock:
+            for (course_id, document_id), group in grouped.items():
+                matrix = np.asarray([v["values"] for v in group], dtype=np.float32)
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                matrix = np.divide(matrix, norms, out=matrix, where=norms > 0)
+
+                vectors_path = self._vectors_path(course_id, document_id)
+                os.makedirs(os.path.dirname(vectors_path), exist_ok=True)
+                with open(vectors_path, "ab") as f:
+                    f.write(matrix.tobytes())
+                lines = "".join(
+                    json.dumps({"id": v["id"], "metadata": v["metadata"]}) + "\n"
+                    for v in group
+                )
+                with open(_metadata_path(vectors_path), "a") as f:
+                    f.write(lines)
+
+    def query(
+        self,
+        vector: list[float],
+        *,
+        top_k: int,
+        filter: dict[str, str],
+        include_values: bool = False,
+        namespace: str | None = None,
+    ) -> list[Match]:
+        query = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm == 0:
+            return []
+        query /= norm
+
+        with self._lock:
+            segments = [self._segment(path) for path in self._matching_paths(filter)]
+            matches = [
+                match
+                for segment in segments
+                for match in segment.search(query, top_k, include_values)
+            ]
+        matches.sort(key=lambda match: match["score"], reverse=True)
+        return matches[:top_k]
+
+    def delete(self, *, filter: dict[str, str], namespace: str | None = None) -> None:
+        if not filter:
+            raise ValueError("A course_id or document_id filter is required")
+        with self._lock:
+            for path in self._matching_paths(filter):
+                for file_path in (path, _metadata_path(path)):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(file_path)
+                self._segments.pop(path, None)
+
+
+class PgVectorStore(VectorStore):
+    """
+    Vectors in the `chunkembedding` table. A query is a single SQL statement
+    that filters by course or document, ranks by cosine distance (HNSW
+    index) and joins the chunk text, so no metadata is duplicated.
+
+    HNSW applies the filter after collecting `hnsw.ef_search` candidates from
+    the whole table, so a course holding a small share of the vectors would
+    get fewer than top_k matches. Queries raise ef_search to top_k and, where
+    pgvector supports it (0.8+), scan iteratively until enough rows match.
+    """
+
+    def __init__(self) -> None:
+        self.ensure_table_exists()
+        self.iterative_scan = self._supports_iterative_scan()
+
+    def ensure_table_exists(self) -> None:
+        """
+        Create the pgvector extension and the chunkembedding table if missing;
+        the migration skips them on databases without pgvector.
+        """
+        with engine.begin() as connection:
+            if inspect(connection).has_table(ChunkEmbedding.__tablename__):
+                return
+            available = connection.execute(
+                text("SELECT 1 FROM pg_available_extensions WHERE name = 'vector'")
+            ).scalar()
+            if not available:
+                raise RuntimeError(
+                    "VECTOR_STORE=pgvector requires the pgvector extension on "
+                    "the database server (e.g. the pgvector/pgvector Postgres image)"
+                )
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            ChunkEmbedding.__table__.create(connection)  # type: ignore[attr-defined]
+
+    @staticmethod
+    def _supports_iterative_scan() -> bool:
+        with engine.connect() as connection:
+            version = connection.execute(
+                text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            ).scalar()
+        major, minor = (int(part) for part in str(version).split(".")[:2])
+        return (major, minor) >= (0, 8)
+
+    def upsert(self, vectors: list[Vector], *, namespace: str | None = None) -> None:
+        if not vectors:
+            return
+        statement = insert(ChunkEmbedding).values(
+            [
+                {
+                    "chunk_id": uuid.UUID(vector["metadata"]["chunk_id"]),
+                    "course_id": uuid.UUID(vector["metadata"]["course_id"]),
+                    "document_id": uuid.UUID(vector["metadata"]["document_id"]),
+                    "embedding": vector["values"],
+                }
+                for vector in vectors
+            ]
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=["chunk_id"],
+            set_={"embedding": statement.excluded.embedding},
+        )
+        with Session(engine) as session:
+            session.execute(statement)
+            session.commit()
+
+    @staticmethod
+    def _conditions(filter: dict[str, str]) -> list[Any]:
+        _check_filter(filter)
+        return [
+            getattr(ChunkEmbedding, key) == uuid.UUID(value)
+            for key, value in filter.items()
+        ]
+
+    def query(
+        self,
+        vector: list[float],
+        *,
+        top_k: int,
+        filter: dict[str, str],
+        include_values: bool = False,
+        namespace: str | None = None,
+    ) -> list[Match]:
+        distance = col(ChunkEmbedding.embedding).op("<=>", return_type=Float)(
+            literal(vector, PgVector(EMBEDDING_DIMENSION))
+        )
+        statement = (
+            select(
+                Chunk.id,
+                Chunk.embedding_id,
+                Chunk.text_content,
+                ChunkEmbedding.course_id,
+                ChunkEmbedding.document_id,
+                distance.label("distance"),
+                *([ChunkEmbedding.embedding] if include_values else []),
+            )
+            .join(Chunk, col(Chunk.id) == col(ChunkEmbedding.chunk_id))
+            .where(*self._conditions(filter))
+            .order_by(distance)
+            .limit(top_k)
+        )
+        with Session(engine) as session:
+            # Transaction-local, so pooled connections keep the defaults
+            session.execute(
+                text("SELECT set_config('hnsw.ef_search', :value, true)"),
+                # pgvector caps ef_search at 1000
+                {"value": str(min(max(settings.PGVECTOR_EF_SEARCH, top_k), 1000))},
+            )
+            if self.iterative_scan:
+                session.execute(text("SET LOCAL hnsw.iterative_scan = relaxed_order"))
+            rows = session.exec(statement).all()
+        # relaxed_order may return rows slightly out of distance order
+        rows = sorted(rows, key=lambda row: row.distance)
+
+        return [
+            {
+                "id": row.embedding_id,
+                "score": 1.0 - row.distance,
+                "metadata": {
+                    "course_id": str(row.course_id),
+                    "document_id": str(row.document_id),
+                    "chunk_id": str(row.id),
+                    "text": row.text_content,
+                },
+                **({"values": row.embedding} if include_values else {}),
+            }
+            for row in rows
+        ]
+
+    def delete(self, *, filter: dict[str, str], namespace: str | None = None) -> None:
+        if not filter:
+            raise ValueError("A course_id or document_id filter is required")
+        with Session(engine) as session:
+            session.execute(delete(ChunkEmbedding).where(*self._conditions(filter)))
+            session.commit()
+
+
+_store: VectorStore | None = None
+
+
+def get_vector_store() -> VectorStore:
+    """Process-wide store selected by the VECTOR_STORE setting."""
+    global _store
+    if _store is None:
+        if settings.VECTOR_STORE == "local":
+            _store = LocalVectorStore(settings.VECTOR_STORE_DIR)
+        elif settings.VECTOR_STORE == "pgvector":
+            _store = PgVectorStore()
+        else:
+            _store = PineconeVectorStore()
+    return _store
+
+
+def split_batches(vectors: list[Vector]) -> list[list[Vector]]:
+    """
+    Group vectors into upsert requests of at most VECTOR_UPSERT_MAX_VECTORS
+    vectors and roughly VECTOR_UPSERT_MAX_BYTES of JSON each.
+    """
+    batches: list[list[Vector]] = []
+    current: list[Vector] = []
+    current_bytes = 0
+    for vector in vectors:
+        # ~20 characters per serialized float
+        size = (
+            len(vector["id"])
+            + len(json.dumps(vector.get("metadata") or {}))
+            + 20 * len(vector["values"])
+        )
+        if current and (
+            current_bytes + size > settings.VECTOR_UPSERT_MAX_BYTES
+            or len(current) >= settings.VECTOR_UPSERT_MAX_VECTORS
+        ):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(vector)
+        current_bytes += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+_upsert_semaphore = asyncio.Semaphore(settings.VECTOR_UPSERT_CONCURRENCY)
+
+
+async def upsert_vectors(
+    store: VectorStore, vectors: list[Vector], *, namespace: str | None = None
+) -> None:
+    """
+    Upsert in size-bounded batches, sent concurrently on worker threads (at
+    most VECTOR_UPSERT_CONCURRENCY per process) so the event loop is free.
+    """
+
+    async def send(batch: list[Vector]) -> None:
+        async with _upsert_semaphore:
+            await asyncio.to_thread(store.upsert, batch, namespace=namespace)
+
+    await asyncio.gather(*(send(batch) for batch in split_batches(vectors)))
+
+
+def document_namespace(document_id: uuid.UUID | str) -> str | None:
+    with Session(engine) as session:
+        return session.exec(
+            select(Document.embedding_namespace).where(
+                Document.id == uuid.UUID(str(document_id))
+            )
+        ).first()
+
+
+def course_namespaces(course_id: uuid.UUID) -> list[str | None]:
+    """
+    Namespaces holding a course's vectors: its own, plus the default one
+    while it has documents ingested before namespaces were used.
+    """
+    with Session(engine) as session:
+        legacy = session.exec(
+            select(Document.id)
+            .where(
+                Document.course_id == course_id,
+                Document.status != DocumentStatus.PENDING,
+                col(Document.embedding_namespace).is_(None),
+            )
+            .limit(1)
+        ).first()
+    return [course_namespace(course_id), *([None] if legacy else [])]
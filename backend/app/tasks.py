@@ -1,20 +1,24 @@
 import asyncio
-import json
 import logging
 import random
 import uuid
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Any
 
-import tiktoken
 from fastapi import HTTPException
-from sqlalchemy import and_
+from sqlalchemy import and_, update
 from sqlalchemy.orm import load_only, selectinload
-from sqlmodel import Session, select
+from sqlmodel import Session, col, select
 
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import CurrentUser
+from app.core.db import engine
 from app.models.course import Course
+from app.models.document import Document
 from app.models.embeddings import Chunk
-from app.models.quizzes import Quiz, QuizAttempt, QuizSession
-from app.prompts.quizzes import get_quiz_prompt, get_quizzes_generation_prompt
+from app.models.jobs import Job
+from app.models.quizzes import ChunkQuizGeneration, Quiz, QuizAttempt, QuizSession
+from app.prompts.quizzes import get_quizzes_generation_prompt
 from app.schemas.public import (
     DifficultyLevel,
     QuizChoice,
@@ -24,119 +28,290 @@ from app.schemas.public import (
     QuizzesPublic,
     SingleQuizScore,
 )
+from app.services.bulk_insert import bulk_insert
+from app.services.chat_utils import get_encoding
+from app.services.document_dedup import copy_source_quizzes
+from app.services.quiz_generation import (
+    QuizGenerationProgress,
+    request_quizzes,
+    run_quiz_batches,
+)
 from app.utils import clean_string
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 MAX_PROMPT_TOKENS = 25000
-ENCODER = tiktoken.encoding_for_model("gpt-4o")
+QUIZ_MODEL_ENCODING = "gpt-4o"
+
+
+def get_token_counts(texts: Sequence[str]) -> list[int]:
+    """Token counts of many texts, encoded in one multi-threaded batch."""
+    encoding = get_encoding(QUIZ_MODEL_ENCODING)
+    if encoding is None:
+        # Fallback estimation: ~4 chars per token
+        return [len(text) // 4 for text in texts]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(list(texts))]
+
+
+def chunk_token_counts(chunks: Sequence[Chunk]) -> list[int]:
+    """
+    Stored token counts of chunks; rows from before counts were stored are
+    tokenized in one batch.
+    """
+    missing = [chunk for chunk in chunks if chunk.token_count is None]
+    counted = dict(
+        zip(
+            (chunk.id for chunk in missing),
+            get_token_counts([chunk.text_content for chunk in missing]),
+            strict=True,
+        )
+    )
+    return [
+        chunk.token_count if chunk.token_count is not None else counted[chunk.id]
+        for chunk in chunks
+    ]
+
+
+@dataclass
+class ChunkBatch:
+    # Plain ids rather than rows: batches are saved on worker threads, where
+    # touching (possibly expired) rows of the job's session is not safe
+    chunk_ids: list[uuid.UUID]
+    text: str
+    token_count: int
 
 
-def get_token_count(text: str) -> int:
-    """Helper function to count tokens using tiktoken."""
-    return len(ENCODER.encode(text))
+def pack_chunks(
+    chunks: Sequence[Chunk],
+    max_tokens: int = MAX_PROMPT_TOKENS,
+    token_counts: Sequence[int] | None = None,
+) -> list[ChunkBatch]:
+    """
+    Greedily group consecutive chunks into prompts of under `max_tokens`.
+
+    Chunks without a stored count are tokenized in one batch (unless their
+    `token_counts` are given) and packed in a single pass. A chunk that alone exceeds the limit is
+    skipped.
+    """
+    batches: list[ChunkBatch] = []
+    current: list[Chunk] = []
+    current_tokens = 0
+
+    def close_batch() -> None:
+        batches.append(
+            ChunkBatch(
+                chunk_ids=[chunk.id for chunk in current],
+                text="".join(f"{chunk.text_content}\n\n" for chunk in current),
+                token_count=current_tokens,
+            )
+        )
+
+    counts = token_counts or chunk_token_counts(chunks)
+    for chunk, token_count in zip(chunks, counts, strict=True):
+        if token_count >= max_tokens:
+            logger.error(
+                f"Chunk {chunk.id} exceeds the maximum prompt token limit "
+                f"({token_count} tokens), skipping it."
+            )
+            continue
+        if current and current_tokens + token_count >= max_tokens:
+            close_batch()
+            current, current_tokens = [], 0
+        current.append(chunk)
+        current_tokens += token_count
+    if current:
+        close_batch()
+    return batches
+
+
+QUIZ_DIFFICULTY_LEVELS = [
+    DifficultyLevel.EASY,
+    DifficultyLevel.MEDIUM,
+    DifficultyLevel.HARD,
+]
+
+
+def save_batch_quizzes(
+    quiz_list: list[dict[str, Any]],
+    batch: ChunkBatch,
+    difficulty_level: DifficultyLevel,
+    document_id: uuid.UUID,
+    course_id: uuid.UUID,
+) -> int:
+    """
+    Commit the quizzes of one batch, and the watermarks of its chunks, in
+    their own transaction. A response without a usable quiz raises, so the
+    batch counts as failed and a retry requests its chunks again.
+    """
+    quizzes: list[Quiz] = []
+    for q_data in quiz_list:
+        if not isinstance(q_data, dict):
+            logger.warning(f"Skipping malformed item in quiz list: {q_data}")
+            continue
+
+        quizzes.append(
+            Quiz(
+                chunk_id=batch.chunk_ids[0],
+                correct_answer=clean_string(q_data["correct_answer"]),
+                course_id=course_id,
+                difficulty_level=difficulty_level,
+                distraction_1=clean_string(q_data["distraction_1"]),
+                distraction_2=clean_string(q_data["distraction_2"]),
+                distraction_3=clean_string(q_data["distraction_3"]),
+                document_id=document_id,
+                feedback=clean_string(q_data["feedback"]),
+                quiz_text=q_data["quiz"],
+                topic=clean_string(q_data["topic"]),
+            )
+        )
+
+    if not quizzes:
+        raise ValueError(f"No usable quizzes for chunks {batch.chunk_ids}")
+    with Session(engine) as session:
+        bulk_insert(session, quizzes)
+        bulk_insert(
+            session,
+            [
+                ChunkQuizGeneration(
+                    chunk_id=chunk_id, difficulty_level=difficulty_level
+                )
+                for chunk_id in batch.chunk_ids
+            ],
+        )
+        session.commit()
+    return len(quizzes)
 
 
 async def generate_quizzes_task(
-    document_id: uuid.UUID, course_id: uuid.UUID, session: SessionDep
+    document_id: uuid.UUID,
+    course_id: uuid.UUID,
+    session: Session,
+    on_progress: Callable[[QuizGenerationProgress], None] | None = None,
 ):
     try:
-        statement = select(Chunk).where(Chunk.course_id == course_id)
+        # Only the document's own chunks, minus near-duplicates of other
+        # chunks of the course and the chunk/difficulty pairs a previous
+        # attempt already committed
+        statement = select(Chunk).where(
+            Chunk.document_id == document_id, col(Chunk.duplicate_of).is_(None)
+        )
         all_chunks = session.exec(statement).all()
 
         if not all_chunks:
-            logger.warning(f"No chunks found for document {document_id}")
+            logger.warning(f"No chunks to quiz on for document {document_id}")
             return
 
-        # We will track which chunks have been processed
-        unprocessed_chunks = list(all_chunks)
-
-        for difficulty_level in [
-            DifficultyLevel.EASY,
-            DifficultyLevel.MEDIUM,
-            DifficultyLevel.HARD,
-        ]:
-            while unprocessed_chunks:
-                current_batch_chunks = []
-                batch_text_content = ""
-                current_token_count = 0
-
-                i = 0
-                while i < len(unprocessed_chunks):
-                    chunk = unprocessed_chunks[i]
-                    chunk_token_count = get_token_count(chunk.text_content)
-
-                    if current_token_count + chunk_token_count < MAX_PROMPT_TOKENS:
-                        current_token_count += chunk_token_count
-                        batch_text_content += chunk.text_content + "\n\n"
-                        current_batch_chunks.append(chunk)
-                        i += 1
-                    else:
-                        break  # Batch is full, stop adding chunks
-
-                # Remove processed chunks from the front of the list
-                unprocessed_chunks = unprocessed_chunks[i:]
-
-                if not current_batch_chunks:
-                    # Should only happen if the first chunk is larger than MAX_PROMPT_TOKENS
-                    logger.error(
-                        "A single chunk exceeds the maximum prompt token limit."
-                    )
-                    break
-
-                prompt = get_quizzes_generation_prompt(
-                    batch_text_content, difficulty_level
+        # A re-upload of an already processed PDF reuses its quizzes
+        document = session.get(Document, document_id)
+        if document is not None:
+            copy_source_quizzes(session, document)
+
+        done = {
+            (chunk_id, level)
+            for chunk_id, level in session.exec(
+                select(
+                    ChunkQuizGeneration.chunk_id, ChunkQuizGeneration.difficulty_level
                 )
+                .join(Chunk, Chunk.id == ChunkQuizGeneration.chunk_id)  # type: ignore[arg-type]
+                .where(Chunk.document_id == document_id)
+            ).all()
+        }
+
+        # Counted once; levels with the same pending chunks share batches
+        token_counts = dict(
+            zip(
+                (chunk.id for chunk in all_chunks),
+                chunk_token_counts(all_chunks),
+                strict=True,
+            )
+        )
+        packed: dict[tuple[uuid.UUID, ...], list[ChunkBatch]] = {}
+        work: list[tuple[ChunkBatch, DifficultyLevel]] = []
+        for level in QUIZ_DIFFICULTY_LEVELS:
+            pending = [chunk for chunk in all_chunks if (chunk.id, level) not in done]
+            key = tuple(chunk.id for chunk in pending)
+            if key and key not in packed:
+                packed[key] = pack_chunks(
+                    pending, token_counts=[token_counts[id] for id in key]
+                )
+            work.extend((batch, level) for batch in packed.get(key, []))
+
+        if not work:
+            logger.info(f"Quizzes for document {document_id} are up to date")
+            return
+
+        async def generate(item: tuple[ChunkBatch, DifficultyLevel]) -> int:
+            batch, difficulty_level = item
+            prompt = get_quizzes_generation_prompt(batch.text, difficulty_level)
+            quiz_list = await request_quizzes(prompt, batch.token_count)
+            return await asyncio.to_thread(
+                save_batch_quizzes,
+                quiz_list,
+                batch,
+                difficulty_level,
+                document_id,
+                course_id,
+            )
 
-                response = await get_quiz_prompt(prompt)
-
-                try:
-                    raw_content = response.choices[0].message.content
-                    parsed = json.loads(raw_content)
-                    quiz_list = parsed.get("quizzes", [])
-
-                    if not isinstance(quiz_list, list):
-                        logger.error(
-                            f"LLM did not return 'quizzes' as a list for batch. Got: {type(quiz_list)}"
-                        )
-                        continue
-                except json.JSONDecodeError as e:
-                    logger.error(
-                        f"Failed to parse LLM response for batch: {e}. Raw content: {raw_content[:200]}..."
-                    )
-                    continue
-
-                # 4. Save the generated quizzes to the database
-                for q_data in quiz_list:
-                    if not isinstance(q_data, dict):
-                        logger.warning(
-                            f"Skipping malformed item in quiz list: {q_data}"
-                        )
-                        continue
-
-                    new_quiz = Quiz(
-                        chunk_id=current_batch_chunks[0].id,
-                        correct_answer=clean_string(q_data["correct_answer"]),
-                        course_id=course_id,
-                        difficulty_level=difficulty_level,
-                        distraction_1=clean_string(q_data["distraction_1"]),
-                        distraction_2=clean_string(q_data["distraction_2"]),
-                        distraction_3=clean_string(q_data["distraction_3"]),
-                        document_id=document_id,
-                        feedback=clean_string(q_data["feedback"]),
-                        quiz_text=q_data["quiz"],
-                        topic=clean_string(q_data["topic"]),
-                    )
-                    session.add(new_quiz)
-
-                session.commit()
-                await asyncio.sleep(15)
-
-            unprocessed_chunks = list(all_chunks)
+        progress = await run_quiz_batches(work, generate, on_progress)
+        logger.info(
+            f"Generated {progress.quizzes} quizzes for document {document_id} "
+            f"({progress.completed}/{progress.total} batches, {progress.failed} failed)"
+        )
+        if progress.failed:
+            raise RuntimeError(
+                f"{progress.failed} of {progress.total} quiz batches failed"
+            )
 
     except Exception as e:
         logger.error(f"Error generating quizzes for document {document_id}: {e}")
+        raise
+
+
+def save_job_progress(job_id: uuid.UUID, progress: dict[str, int]) -> None:
+    # In its own session: committing the job's session would expire the
+    # chunks loaded through it while batches are still running
+    with Session(engine) as session:
+        session.execute(
+            update(Job)
+            .where(Job.id == job_id)  # type: ignore[arg-type]
+            .values(progress=progress)
+        )
+        session.commit()
+
+
+async def generate_quizzes_job(job: Job, session: Session) -> None:
+    """Job handler for GENERATE_QUIZZES_JOB."""
+    # Retries resume from the chunk watermarks instead of starting over
+    document_id = uuid.UUID(job.payload["document_id"])
+    job_id = job.id
+    latest: dict[str, int] | None = None
+    writer: asyncio.Task[None] | None = None
+
+    async def write_progress() -> None:
+        nonlocal latest
+        # Batches finishing during a write are coalesced into the next one
+        while latest is not None:
+            progress, latest = latest, None
+            await asyncio.to_thread(save_job_progress, job_id, progress)
+
+    def report(progress: QuizGenerationProgress) -> None:
+        nonlocal latest, writer
+        latest = progress.as_dict()
+        if writer is None or writer.done():
+            writer = asyncio.create_task(write_progress())
+
+    try:
+        await generate_quizzes_task(
+            document_id,
+            uuid.UUID(job.payload["course_id"]),
+            session,
+            on_progress=report,
+        )
+    finally:
+        if writer is not None:
+            await writer
 
 
 def score_quiz_batch(
@@ -0,0 +1,50 @@
+import hashlib
+import os
+from tempfile import SpooledTemporaryFile
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.api.routes import documents
+
+PDF = b"%PDF-1.7\n" + b"0" * 3_000_000 + b"\n%%EOF"
+
+
+def _upload(content: bytes) -> UploadFile:
+    # Starlette spools request files to disk above 1 MB
+    spooled = SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(content)
+    return UploadFile(spooled, filename="notes.pdf")
+
+
+def test_spool_upload_copies_and_hashes(tmp_path) -> None:
+    path = str(tmp_path / "upload.pdf")
+
+    content_hash = documents.spool_upload(_upload(PDF), path)
+
+    assert content_hash == hashlib.sha256(PDF).hexdigest()
+    with open(path, "rb") as f:
+        assert f.read() == PDF
+
+
+@pytest.mark.parametrize("content", [b"", b"<html>not a pdf</html>"])
+def test_spool_upload_rejects_non_pdfs(tmp_path, content: bytes) -> None:
+    path = str(tmp_path / "upload.pdf")
+
+    with pytest.raises(HTTPException) as error:
+        documents.spool_upload(_upload(content), path)
+
+    assert error.value.status_code == 400
+    assert not os.path.exists(path)
+
+
+def test_spool_upload_enforces_size_limit_while_streaming(
+    tmp_path, monkeypatch
+) -> None:
+    monkeypatch.setattr(documents, "MAX_FILE_SIZE_BYTES", 2 * 1024 * 1024)
+    path = str(tmp_path / "upload.pdf")
+
+    with pytest.raises(HTTPException, match="size limit"):
+        documents.spool_upload(_upload(PDF), path)
+
+    assert not os.path.exists(path)
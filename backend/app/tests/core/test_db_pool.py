@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError
+
+from app.core.db_pool import TimedQueuePool, pool_stats
+
+
+def test_pool_stats_count_checkouts_and_timeouts(tmp_path) -> None:
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    held = engine.connect()
+    stats = pool_stats(engine.pool)
+    assert stats["checked_out"] == 1
+    assert stats["checkouts"] == 1
+
+    with pytest.raises(TimeoutError):
+        engine.connect()
+    stats = pool_stats(engine.pool)
+    assert stats["timeouts"] == 1
+    assert stats["max_wait_ms"] >= 50
+
+    held.close()
+    assert pool_stats(engine.pool)["checked_in"] == 1
+    engine.dispose()
@@ -0,0 +1,50 @@
+import uuid
+
+from sqlalchemy import Column, Integer, MetaData, String, create_engine, text
+from sqlmodel import Field, Session, SQLModel, select
+
+from app.services.bulk_insert import bulk_insert
+
+metadata = MetaData()
+
+
+class BulkRow(SQLModel, table=True):
+    metadata = metadata
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    label: str = Field(sa_column=Column(String, nullable=False))
+    rank: int | None = Field(
+        default=None, sa_column=Column(Integer, server_default=text("7"))
+    )
+
+
+def test_bulk_insert_writes_rows_and_returns_keys(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+    metadata.create_all(engine)
+    rows = [BulkRow(label=f"row {i}") for i in range(250)]
+
+    with Session(engine) as session:
+        ids = bulk_insert(session, rows)
+        session.commit()
+
+    assert ids == [row.id for row in rows]
+    with Session(engine) as session:
+        stored = session.exec(select(BulkRow)).all()
+    assert {row.id for row in stored} == set(ids)
+    # Nobody set rank, so the server default applies
+    assert {row.rank for row in stored} == {7}
+    engine.dispose()
+
+
+def test_bulk_insert_keeps_explicit_values_over_server_default(tmp_path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+    metadata.create_all(engine)
+
+    with Session(engine) as session:
+        assert bulk_insert(session, []) == []
+        bulk_insert(session, [BulkRow(label="a", rank=1), BulkRow(label="b")])
+        session.commit()
+        ranks = dict(session.exec(select(BulkRow.label, BulkRow.rank)).all())
+
+    assert ranks == {"a": 1, "b": 7}
+    engine.dispose()
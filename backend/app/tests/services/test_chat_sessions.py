@@ -0,0 +1,166 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.db import async_engine
+from app.core.db_pool import pool_stats
+from app.services import chat_db, chat_service
+
+STREAMS = 3
+
+
+class SessionCounter:
+    """Stands in for chat_session(), tracking how many sessions are open."""
+
+    def __init__(self) -> None:
+        self.open = 0
+        self.opened = 0
+
+    def __call__(self) -> "SessionCounter":
+        return self
+
+    async def __aenter__(self) -> "SessionCounter":
+        self.open += 1
+        self.opened += 1
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        self.open -= 1
+
+
+def _patch_chat_service(monkeypatch, sessions: SessionCounter, generate) -> list[str]:
+    """Stub out everything around generation; returns the saved messages."""
+    course = SimpleNamespace(id=uuid.uuid4(), name="Physics")
+    saved: list[str] = []
+
+    async def fake_async(*_args, **_kwargs):
+        return None
+
+    async def fake_save(message, *_args, **_kwargs):
+        saved.append(message)
+
+    async def course_access(*_args):
+        return course
+
+    async def recent_messages(*_args, **_kwargs):
+        return []
+
+    async def embedding(_question):
+        return [0.1, 0.2]
+
+    async def context(*_args):
+        return "Newton's laws"
+
+    monkeypatch.setattr(chat_service, "chat_session", sessions)
+    monkeypatch.setattr(chat_service, "verify_course_access", course_access)
+    monkeypatch.setattr(chat_service, "get_recent_messages", recent_messages)
+    monkeypatch.setattr(chat_service, "get_question_embedding", embedding)
+    monkeypatch.setattr(chat_service, "check_cached_response", fake_async)
+    monkeypatch.setattr(chat_service, "retrieve_relevant_context", context)
+    monkeypatch.setattr(chat_service, "filter_chat_history", lambda *_args: [])
+    monkeypatch.setattr(chat_service, "generate_openai_response", generate)
+    monkeypatch.setattr(chat_service, "save_user_message", fake_save)
+    monkeypatch.setattr(chat_service, "save_system_message", fake_save)
+    return saved
+
+
+def test_streams_hold_no_session_while_generating(monkeypatch) -> None:
+    # Counts chat_session() contexts opened by the handler; this checks the
+    # session lifecycle, not connections of the real pool
+    sessions = SessionCounter()
+    release = asyncio.Event()
+
+    async def generate(_messages):
+        yield "partial "
+        await release.wait()
+        yield "answer"
+
+    saved = _patch_chat_service(monkeypatch, sessions, generate)
+
+    async def run() -> int:
+        streams = [
+            chat_service.handle_regular_question("What is F?", uuid.uuid4(), None)
+            for _ in range(STREAMS)
+        ]
+        # Every stream has sent its first chunk and is waiting on the model
+        await asyncio.gather(*(anext(stream) for stream in streams))
+        held_while_streaming = sessions.open
+        # Questions are saved before the answer is generated
+        assert saved == ["What is F?"] * STREAMS
+
+        release.set()
+        for stream in streams:
+            async for _ in stream:
+                pass
+        return held_while_streaming
+
+    assert asyncio.run(run()) == 0
+    assert sessions.open == 0
+    # One read session before streaming; writes go through the write buffer
+    assert sessions.opened == STREAMS
+    assert saved.count("partial answer") == STREAMS
+
+
+def test_question_is_kept_when_generation_fails(monkeypatch) -> None:
+    async def generate(_messages):
+        yield "partial "
+        raise RuntimeError("stream dropped")
+
+    saved = _patch_chat_service(monkeypatch, SessionCounter(), generate)
+
+    async def run() -> None:
+        async for _ in chat_service.handle_regular_question(
+            "What is F?", uuid.uuid4(), None
+        ):
+            pass
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+    assert saved == ["What is F?"]
+
+
+def test_streams_return_pool_connections_while_generating(monkeypatch) -> None:
+    # Against the real async engine (needs Postgres): more streams than the
+    # pool can hold wait on the model at once without exhausting it
+    streams_count = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW + 4
+    release = asyncio.Event()
+
+    async def generate(_messages):
+        yield "partial "
+        await release.wait()
+        yield "answer"
+
+    async def course_access(_course_id, session, _user):
+        await session.execute(text("SELECT 1"))
+        return SimpleNamespace(id=uuid.uuid4(), name="Physics")
+
+    _patch_chat_service(monkeypatch, SessionCounter(), generate)
+    monkeypatch.setattr(chat_service, "chat_session", chat_db.chat_session)
+    monkeypatch.setattr(chat_service, "verify_course_access", course_access)
+
+    async def run() -> tuple[dict, dict, dict]:
+        before = pool_stats(async_engine.pool)
+        streams = [
+            chat_service.handle_regular_question("What is F?", uuid.uuid4(), None)
+            for _ in range(streams_count)
+        ]
+        await asyncio.gather(*(anext(stream) for stream in streams))
+        streaming = pool_stats(async_engine.pool)
+
+        release.set()
+        for stream in streams:
+            async for _ in stream:
+                pass
+        after = pool_stats(async_engine.pool)
+        # Pooled connections belong to this event loop
+        await async_engine.dispose()
+        return before, streaming, after
+
+    before, streaming, after = asyncio.run(run())
+    assert streaming["checked_out"] == 0
+    assert streaming["checkouts"] - before["checkouts"] >= streams_count
+    assert after["timeouts"] == before["timeouts"]
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+from app.services import chat_utils
+
+
+class CountingEncoding:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def encode(self, text: str) -> list[str]:
+        self.calls += 1
+        return text.split()
+
+
+def test_count_tokens_is_memoized_by_content(monkeypatch) -> None:
+    encoding = CountingEncoding()
+    monkeypatch.setattr(chat_utils, "get_encoding", lambda _model: encoding)
+    monkeypatch.setattr(chat_utils, "_token_counts", chat_utils.OrderedDict())
+
+    assert chat_utils.count_tokens("one two three") == 3
+    assert chat_utils.count_tokens("one two three") == 3
+    assert chat_utils.count_tokens("one two three", model="gpt-4o") == 3
+    assert encoding.calls == 2
+
+
+def test_history_filter_uses_stored_token_counts(monkeypatch) -> None:
+    encoding = CountingEncoding()
+    monkeypatch.setattr(chat_utils, "get_encoding", lambda _model: encoding)
+    monkeypatch.setattr(chat_utils, "_token_counts", chat_utils.OrderedDict())
+    messages = [
+        SimpleNamespace(message="old question", is_system=False, token_count=3400),
+        SimpleNamespace(message="recent answer", is_system=True, token_count=50),
+        SimpleNamespace(message="recent question", is_system=False, token_count=None),
+    ]
+
+    history = chat_utils.filter_chat_history(messages, "question", "context")
+
+    assert [turn["content"] for turn in history] == [
+        "recent answer",
+        "recent question",
+    ]
+    # Only the question, the context and the row without a stored count
+    assert encoding.calls == 3
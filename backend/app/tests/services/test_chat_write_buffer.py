@@ -0,0 +1,134 @@
+import asyncio
+import uuid
+
+from sqlalchemy.exc import IntegrityError
+
+from app.models.chat import Chat
+from app.services.chat_write_buffer import ChatWriteBuffer
+
+
+class FakeDatabase:
+    """Records committed batches; rows with message "bad" violate a constraint."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+        self.edits: int = 0
+
+    def session(self) -> "FakeSession":
+        return FakeSession(self)
+
+
+class FakeSession:
+    def __init__(self, db: FakeDatabase) -> None:
+        self.db = db
+        self.rows: list[Chat] = []
+        self.edits = 0
+
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        pass
+
+    def add_all(self, rows: list[Chat]) -> None:
+        self.rows.extend(rows)
+
+    async def flush(self) -> None:
+        if any(row.message == "bad" for row in self.rows):
+            raise IntegrityError("INSERT", {}, Exception("foreign key"))
+
+    async def execute(self, _statement: object) -> None:
+        self.edits += 1
+
+    async def commit(self) -> None:
+        self.db.batches.append([row.message for row in self.rows])
+        self.db.edits += self.edits
+
+
+def _chat(course_id: uuid.UUID, message: str, is_system: bool = False) -> Chat:
+    return Chat(message=message, is_system=is_system, course_id=course_id)
+
+
+def test_rows_are_visible_before_they_are_written_in_one_batch() -> None:
+    db = FakeDatabase()
+    buffer = ChatWriteBuffer(60, 100, session_factory=db.session)
+    course_id = uuid.uuid4()
+
+    async def run() -> None:
+        question = await buffer.add(_chat(course_id, "question"))
+        await buffer.add(_chat(course_id, "answer", is_system=True))
+        await buffer.add(_chat(uuid.uuid4(), "other course"))
+        assert db.batches == []
+
+        recent = buffer.merge(course_id, [], limit=10, newest_first=True)
+        assert [row.message for row in recent] == ["answer", "question"]
+        last_system = buffer.merge(
+            course_id, [], limit=1, newest_first=True, is_system=True
+        )
+        assert [row.message for row in last_system] == ["answer"]
+
+        await buffer.flush()
+        assert db.batches == [["question", "answer", "other course"]]
+        # Rows read back from the database are not duplicated
+        merged = buffer.merge(course_id, [question], limit=10, newest_first=False)
+        assert merged == [question]
+        await buffer.close()
+
+    asyncio.run(run())
+
+
+def test_edits_apply_to_queued_and_written_rows() -> None:
+    db = FakeDatabase()
+    buffer = ChatWriteBuffer(60, 100, session_factory=db.session)
+    course_id = uuid.uuid4()
+
+    async def run() -> None:
+        queued = await buffer.add(_chat(course_id, "part one", is_system=True))
+        await buffer.update(queued, "part one, part two")
+        await buffer.flush()
+        assert db.batches == [["part one, part two"]]
+        assert db.edits == 0
+
+        # A copy loaded from the database by another session
+        written = _chat(course_id, "part one, part two", is_system=True)
+        written.id, written.created_at = queued.id, queued.created_at
+        await buffer.update(queued, "part one, part two, part three")
+        merged = buffer.merge(course_id, [written], limit=1, newest_first=True)
+        assert merged[0].message == "part one, part two, part three"
+
+        await buffer.close()
+        assert db.edits == 1
+
+    asyncio.run(run())
+
+
+def test_batch_size_triggers_a_flush_and_close_writes_the_rest() -> None:
+    db = FakeDatabase()
+    buffer = ChatWriteBuffer(60, 2, session_factory=db.session)
+    course_id = uuid.uuid4()
+
+    async def run() -> None:
+        await buffer.add(_chat(course_id, "a"))
+        await buffer.add(_chat(course_id, "b"))
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert db.batches == [["a", "b"]]
+
+        await buffer.add(_chat(course_id, "c"))
+        await buffer.close()
+        assert db.batches == [["a", "b"], ["c"]]
+
+    asyncio.run(run())
+
+
+def test_rejected_row_does_not_lose_the_batch() -> None:
+    db = FakeDatabase()
+    buffer = ChatWriteBuffer(60, 100, enabled=False, session_factory=db.session)
+    course_id = uuid.uuid4()
+
+    async def run() -> None:
+        buffer._pending.extend([_chat(course_id, "ok"), _chat(course_id, "bad")])
+        await buffer.add(_chat(course_id, "also ok"))
+
+    asyncio.run(run())
+    assert db.batches == [["ok"], ["also ok"]]
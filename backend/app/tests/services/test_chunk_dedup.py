@@ -0,0 +1,173 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlmodel import Session, SQLModel, col, delete, select
+
+from app.models.course import Course
+from app.models.document import Document
+from app.models.embeddings import Chunk
+from app.models.user import User
+from app.services import chunk_dedup, ingestion
+from app.services.chunk_dedup import (
+    DedupStats,
+    MinHashIndex,
+    minhash_signature,
+    promote_duplicates,
+    signature_similarity,
+)
+from app.services.ingestion import iter_records
+from app.services.vector_store import LocalVectorStore
+
+PARAGRAPH = (
+    "The derivative measures the instantaneous rate of change of a function "
+    "with respect to its variable. It is written dy/dx and equals the slope of "
+    "the tangent line at a point on the curve, which is the limit of secant "
+    "slopes as the interval shrinks to zero."
+)
+
+
+def test_signatures_estimate_similarity() -> None:
+    same = minhash_signature(PARAGRAPH)
+    edited = minhash_signature(PARAGRAPH.replace("curve,", "graph,"))
+    other = minhash_signature("Photosynthesis turns light, water and CO2 into sugar.")
+
+    assert signature_similarity(same, minhash_signature(PARAGRAPH)) == 1.0
+    assert signature_similarity(same, edited) > 0.8
+    assert signature_similarity(same, other) < 0.1
+    # Signatures are stored, so they must not change between processes or
+    # releases; case and spacing are ignored
+    expected = [572922278, 221308130, 603822675, 888955059]
+    assert minhash_signature("a b c d").tolist()[:4] == expected
+    assert minhash_signature("A  b C d").tolist()[:4] == expected
+
+
+def test_index_finds_only_near_duplicates() -> None:
+    index = MinHashIndex(threshold=0.8)
+    original = uuid.uuid4()
+    index.add(original, minhash_signature(PARAGRAPH))
+
+    assert index.find(minhash_signature(PARAGRAPH.upper())) == original
+    assert index.find(minhash_signature("An unrelated sentence about cells.")) is None
+
+
+def test_ingestion_flags_repeated_chunks() -> None:
+    async def chunks():
+        for text in [PARAGRAPH, "Limits come first.", PARAGRAPH + " Really."]:
+            yield text, 50
+
+    stats = DedupStats()
+
+    async def collect():
+        return [
+            record
+            async for record in iter_records(
+                chunks(), uuid.uuid4(), uuid.uuid4(), MinHashIndex(0.8), stats
+            )
+        ]
+
+    first, second, repeat = asyncio.run(collect())
+    assert first.duplicate_of is None and second.duplicate_of is None
+    assert repeat.duplicate_of == first.id
+    assert (stats.chunks, stats.duplicates, stats.tokens_saved) == (3, 1, 50)
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chunks.db'}")
+
+    @event.listens_for(engine, "connect")
+    def configure(connection, _record) -> None:
+        connection.execute("PRAGMA foreign_keys = ON")
+        # For the full-text index on chunk
+        connection.create_function(
+            "to_tsvector", 2, lambda _config, text: text, deterministic=True
+        )
+
+    tables = SQLModel.metadata.tables
+    SQLModel.metadata.create_all(
+        engine,
+        tables=[tables[name] for name in ["users", "course", "document", "chunk"]],
+    )
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def test_batches_of_duplicates_wait_for_the_chunks_they_repeat(
+    session: Session, tmp_path, monkeypatch
+) -> None:
+    user = User(email="owner@example.com", hashed_password="x")
+    course = Course(name="Calculus", owner_id=user.id)
+    document = Document(title="Notes", filename="notes.pdf", course_id=course.id)
+    session.add_all([user, course, document])
+    session.commit()
+
+    async def slow_first_batch(texts: list[str]) -> list[list[float]]:
+        # Batch 0 embeds slowly; batch 1 repeats it and embeds nothing
+        await asyncio.sleep(0.05)
+        return [[1.0, 0.0, 0.0, 0.0] for _ in texts]
+
+    monkeypatch.setattr(ingestion, "embed_chunks", slow_first_batch)
+    monkeypatch.setattr(ingestion, "EMBED_BATCH_SIZE", 2)
+    texts = [PARAGRAPH, "Limits come first.", PARAGRAPH, "Limits come first."]
+
+    async def chunks():
+        for text in texts:
+            yield text, 10
+
+    stored = asyncio.run(
+        ingestion.store_chunks(
+            iter_records(
+                chunks(), document.id, course.id, MinHashIndex(0.8), DedupStats()
+            ),
+            LocalVectorStore(str(tmp_path / "vectors"), dimension=4),
+            session,
+        )
+    )
+
+    assert stored == 4
+    rows = session.exec(select(Chunk).order_by(col(Chunk.chunk_index))).all()
+    assert [row.duplicate_of for row in rows[2:]] == [row.id for row in rows[:2]]
+
+
+def test_deleted_originals_hand_over_to_a_duplicate(
+    session: Session, monkeypatch
+) -> None:
+    user = User(email="owner@example.com", hashed_password="x")
+    course = Course(name="Calculus", owner_id=user.id)
+    documents = [
+        Document(title=f"Notes {i}", filename="notes.pdf", course_id=course.id)
+        for i in range(3)
+    ]
+    session.add_all([user, course, *documents])
+
+    def chunk(document: Document, duplicate_of: uuid.UUID | None = None) -> Chunk:
+        row = Chunk(
+            document_id=document.id,
+            course_id=course.id,
+            text_content=PARAGRAPH,
+            embedding_id=str(uuid.uuid4()),
+            duplicate_of=duplicate_of,
+        )
+        session.add(row)
+        session.commit()
+        return row
+
+    original = chunk(documents[0])
+    first, second = chunk(documents[1], original.id), chunk(documents[2], original.id)
+    jobs: list[dict] = []
+    monkeypatch.setattr(
+        chunk_dedup,
+        "enqueue_job",
+        lambda _session, _kind, payload, **_: jobs.append(payload),
+    )
+
+    assert promote_duplicates(session, documents[0].id) == [first.id]
+    session.execute(delete(Chunk).where(Chunk.document_id == documents[0].id))
+    session.commit()
+
+    assert (first.duplicate_of, second.duplicate_of) == (None, first.id)
+    assert jobs == [{"chunk_ids": [str(first.id)]}]
+    assert promote_duplicates(session, documents[1].id) == [second.id]
@@ -0,0 +1,64 @@
+import tiktoken
+
+from app.services.chunking import TokenChunker, chunk_text, iter_text_chunks
+
+# One token per byte, so counts are exact and multi-byte characters are split
+# across tokens, without downloading a real vocabulary
+BYTES = tiktoken.Encoding(
+    name="test_bytes",
+    pat_str=r"\s*\S+|\s+",
+    mergeable_ranks={bytes([i]): i for i in range(256)},
+    special_tokens={},
+)
+
+
+def _chunker(chunk_tokens: int = 60, overlap_tokens: int = 12) -> TokenChunker:
+    return TokenChunker(chunk_tokens, overlap_tokens, encoding=BYTES)
+
+
+def _text(sentences: int) -> str:
+    return " ".join(f"Sentence number {i} is here." for i in range(sentences))
+
+
+def test_chunks_fit_the_budget_and_point_into_the_text() -> None:
+    text = _text(40)
+    chunks = chunk_text(text, _chunker())
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.token_count <= 60
+        assert text[chunk.start : chunk.end] == chunk.text
+    # Together they cover the whole text, each chunk starting inside the last
+    assert chunks[0].start == 0 and chunks[-1].end == len(text)
+    for before, after in zip(chunks, chunks[1:], strict=False):
+        assert after.start < before.end
+        assert before.end - after.start <= 12
+
+
+def test_cuts_prefer_sentence_and_paragraph_ends() -> None:
+    text = _text(40)
+    for chunk in chunk_text(text, _chunker())[:-1]:
+        assert chunk.text.endswith(".")
+
+    paragraphs = "\n\n".join(_text(2) for _ in range(6))
+    chunks = chunk_text(paragraphs, _chunker(120, 0))
+    assert len(chunks) > 1
+    for chunk in chunks[:-1]:
+        assert paragraphs[chunk.end : chunk.end + 2] == "\n\n"
+
+
+def test_pages_stream_like_one_text() -> None:
+    pages = [_text(3), "", _text(7), _text(1), _text(12)]
+    streamed = list(iter_text_chunks(pages, _chunker()))
+
+    assert streamed == chunk_text("\n".join(p for p in pages if p), _chunker())
+
+
+def test_multibyte_characters_stay_whole() -> None:
+    text = "Größenordnung über Äpfel " * 20
+    chunks = chunk_text(text, _chunker(40, 8))
+
+    for chunk in chunks:
+        assert text[chunk.start : chunk.end] == chunk.text
+        # One token per byte, plus any whitespace trimmed off the edges
+        assert len(chunk.text.encode()) <= chunk.token_count <= 40
@@ -0,0 +1,75 @@
+from app.services.context_assembly import assemble_context, overlap_length
+
+SHARED = "the derivative measures the instantaneous rate of change"
+
+
+def _match(
+    id: str,
+    text: str,
+    score: float,
+    values: list[float] | None = None,
+    chunk_index: int | None = None,
+    document_id: str = "d1",
+) -> dict:
+    metadata = {"text": text, "document_id": document_id}
+    if chunk_index is not None:
+        metadata["chunk_index"] = chunk_index
+    match = {"id": id, "score": score, "metadata": metadata}
+    if values is not None:
+        match["values"] = values
+    return match
+
+
+def test_overlap_length_finds_shared_boundary() -> None:
+    assert overlap_length(f"Intro. {SHARED}", f"{SHARED}. Next part") == len(SHARED)
+    assert overlap_length("abc", "xyz") == 0
+
+
+def test_adjacent_chunks_are_merged_without_repeating_overlap() -> None:
+    first = f"Calculus basics. {SHARED}"
+    second = f"{SHARED}. It is written dy/dx."
+    passages = assemble_context(
+        [
+            _match("b", second, 1.0, chunk_index=4),
+            _match("a", first, 0.9, chunk_index=3),
+        ],
+        max_chunks=5,
+    )
+    assert passages == [f"Calculus basics. {SHARED}. It is written dy/dx."]
+
+
+def test_contained_duplicates_are_dropped() -> None:
+    passages = assemble_context(
+        [
+            _match("a", "Newton's second law: F = ma.", 1.0, document_id="d1"),
+            _match("b", "second law: F = ma", 0.8, document_id="d2"),
+        ],
+        max_chunks=5,
+    )
+    assert passages == ["Newton's second law: F = ma."]
+
+
+def test_mmr_prefers_diverse_chunks() -> None:
+    passages = assemble_context(
+        [
+            _match("a", "Topic A first view.", 1.0, [1, 0, 0], document_id="d1"),
+            _match("b", "Topic A second view.", 0.95, [0.99, 0.1, 0], document_id="d2"),
+            _match("c", "Topic B.", 0.8, [0, 1, 0], document_id="d3"),
+        ],
+        max_chunks=2,
+        mmr_lambda=0.5,
+    )
+    assert passages == ["Topic A first view.", "Topic B."]
+
+
+def test_token_budget_is_respected() -> None:
+    long_text = "word " * 400
+    passages = assemble_context(
+        [
+            _match("a", long_text, 1.0, document_id="d1"),
+            _match("b", "Short relevant fact.", 0.9, document_id="d2"),
+        ],
+        max_chunks=5,
+        token_budget=50,
+    )
+    assert passages == ["Short relevant fact."]
@@ -0,0 +1,134 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, event, inspect
+from sqlmodel import Session, SQLModel, select
+
+from app.models.course import Course
+from app.models.document import Document
+from app.models.embeddings import Chunk
+from app.models.quizzes import ChunkQuizGeneration, Quiz
+from app.models.user import User
+from app.schemas.public import DifficultyLevel, DocumentStatus
+from app.services.document_dedup import copy_source_quizzes, find_source_document
+
+TABLES = ["users", "course", "document", "chunk", "quiz", "chunkquizgeneration"]
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'dedup.db'}")
+
+    @event.listens_for(engine, "connect")
+    def add_functions(connection, _record) -> None:
+        # For the full-text index on chunk
+        connection.create_function(
+            "to_tsvector", 2, lambda _config, text: text, deterministic=True
+        )
+
+    tables = SQLModel.metadata.tables
+    SQLModel.metadata.create_all(engine, tables=[tables[name] for name in TABLES])
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def _document(
+    session: Session, course: Course, status: DocumentStatus, ordered: bool = True
+) -> Document:
+    document = Document(
+        title="Notes",
+        filename="notes.pdf",
+        course_id=course.id,
+        status=status,
+        content_hash="ab" * 32,
+    )
+    session.add(document)
+    now = datetime.now(timezone.utc)
+    for index, text in enumerate(["first chunk", "second chunk"]):
+        session.add(
+            Chunk(
+                document_id=document.id,
+                course_id=course.id,
+                text_content=text,
+                embedding_id=str(uuid.uuid4()),
+                chunk_index=index if ordered else None,
+                # Concurrent batches commit out of document order
+                created_at=now - timedelta(seconds=index),
+            )
+        )
+    session.commit()
+    return document
+
+
+def _quiz(chunk: Chunk, level: DifficultyLevel) -> Quiz:
+    return Quiz(
+        chunk_id=chunk.id,
+        course_id=chunk.course_id,
+        document_id=chunk.document_id,
+        difficulty_level=level,
+        quiz_text=f"What is in the {chunk.text_content}?",
+        correct_answer="a",
+        distraction_1="b",
+        distraction_2="c",
+        distraction_3="d",
+        topic="t",
+    )
+
+
+def test_quizzes_are_copied_onto_matching_chunks_once(session: Session) -> None:
+    user = User(email="owner@example.com", hashed_password="x")
+    courses = [Course(name=f"Course {i}", owner_id=user.id) for i in range(2)]
+    session.add_all([user, *courses])
+    source = _document(session, courses[0], DocumentStatus.COMPLETED)
+    _document(session, courses[0], DocumentStatus.PENDING)
+    copy = _document(session, courses[1], DocumentStatus.PROCESSING)
+
+    source_chunks = session.exec(
+        select(Chunk).where(Chunk.document_id == source.id)
+    ).all()
+    session.add(_quiz(source_chunks[0], DifficultyLevel.EASY))
+    for chunk in source_chunks:
+        session.add(
+            ChunkQuizGeneration(
+                chunk_id=chunk.id, difficulty_level=DifficultyLevel.EASY
+            )
+        )
+    session.commit()
+
+    # Only completed documents are sources
+    assert find_source_document(session, copy).id == source.id
+    assert copy_source_quizzes(session, copy) == 1
+    assert copy_source_quizzes(session, copy) == 0
+
+    (quiz,) = session.exec(select(Quiz).where(Quiz.document_id == copy.id)).all()
+    assert quiz.course_id == courses[1].id
+    copy_chunk_ids = set(
+        session.exec(select(Chunk.id).where(Chunk.document_id == copy.id)).all()
+    )
+    assert quiz.chunk_id in copy_chunk_ids
+    marks = session.exec(
+        select(ChunkQuizGeneration.chunk_id).where(
+            ChunkQuizGeneration.chunk_id.in_(copy_chunk_ids)  # type: ignore[attr-defined]
+        )
+    ).all()
+    assert set(marks) == copy_chunk_ids
+
+
+def test_only_ordered_documents_are_sources_and_no_op_copies_dont_commit(
+    session: Session,
+) -> None:
+    user = User(email="owner@example.com", hashed_password="x")
+    course = Course(name="Course", owner_id=user.id)
+    session.add_all([user, course])
+    _document(session, course, DocumentStatus.COMPLETED, ordered=False)
+    copy = _document(session, course, DocumentStatus.PROCESSING)
+    source = _document(session, course, DocumentStatus.COMPLETED)
+
+    # The earlier document's chunk order is unknown
+    assert find_source_document(session, copy).id == source.id
+
+    chunks = session.exec(select(Chunk).where(Chunk.document_id == copy.id)).all()
+    assert copy_source_quizzes(session, copy) == 0
+    assert not any(inspect(chunk).expired for chunk in chunks)
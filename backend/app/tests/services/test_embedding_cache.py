@@ -0,0 +1,84 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import update
+from sqlmodel import Session, col, delete, select
+
+from app.models.embedding_cache import EmbeddingCacheEntry
+from app.services.embedding_cache import (
+    EmbeddingCache,
+    content_hash,
+    prune_embedding_cache,
+)
+
+
+def test_content_hash_normalizes_whitespace() -> None:
+    assert content_hash("m", "What is  entropy?\n") == content_hash(
+        "m", "What is entropy?"
+    )
+    assert content_hash("m", "entropy") != content_hash("other-model", "entropy")
+
+
+def test_only_misses_are_fetched() -> None:
+    cache = EmbeddingCache(max_entries=10, persist=False)
+    requested: list[list[str]] = []
+
+    async def fetch(texts: list[str]) -> list[list[float]]:
+        requested.append(texts)
+        return [[float(len(text))] for text in texts]
+
+    first = asyncio.run(cache.embed(["a", "bb", "a"], "m", fetch))
+    second = asyncio.run(cache.embed(["bb", "ccc"], "m", fetch))
+
+    assert first == [[1.0], [2.0], [1.0]]
+    assert second == [[2.0], [3.0]]
+    assert requested == [["a", "bb"], ["ccc"]]
+
+
+def test_lru_evicts_least_recently_used() -> None:
+    cache = EmbeddingCache(max_entries=2, persist=False)
+
+    async def fetch(texts: list[str]) -> list[list[float]]:
+        return [[0.0] for _ in texts]
+
+    asyncio.run(cache.embed(["a", "b"], "m", fetch))
+    asyncio.run(cache.embed(["a"], "m", fetch))
+    asyncio.run(cache.embed(["c"], "m", fetch))
+
+    assert cache.misses == 3
+    asyncio.run(cache.embed(["a"], "m", fetch))
+    assert cache.misses == 3
+    asyncio.run(cache.embed(["b"], "m", fetch))
+    assert cache.misses == 4
+
+
+def test_unused_persistent_entries_are_pruned(db: Session) -> None:
+    keys = [content_hash("m", f"{uuid.uuid4()}") for _ in range(3)]
+    stale, served, fresh = keys
+    EmbeddingCache._store("m", {key: np.zeros(2) for key in keys})
+    long_ago = datetime.now(timezone.utc) - timedelta(days=365)
+    db.execute(
+        update(EmbeddingCacheEntry)
+        .where(col(EmbeddingCacheEntry.content_hash).in_([stale, served]))
+        .values(last_used_at=long_ago)
+    )
+    db.commit()
+
+    # Serving an entry from Postgres restarts its TTL
+    assert set(EmbeddingCache._load([served])) == {served}
+    prune_embedding_cache(db)
+
+    remaining = db.exec(
+        select(EmbeddingCacheEntry.content_hash).where(
+            col(EmbeddingCacheEntry.content_hash).in_(keys)
+        )
+    ).all()
+    assert set(remaining) == {served, fresh}
+    db.execute(
+        delete(EmbeddingCacheEntry).where(
+            col(EmbeddingCacheEntry.content_hash).in_(keys)
+        )
+    )
+    db.commit()
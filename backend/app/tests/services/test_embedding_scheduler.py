@@ -0,0 +1,49 @@
+import asyncio
+from typing import Any
+from unittest.mock import patch
+
+import httpx
+import openai
+
+from app.services.embedding_scheduler import EmbeddingScheduler, TokenBucket
+
+
+class FakeEmbeddings:
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+        self.calls = 0
+
+    async def create(self, input: list[str], model: str) -> Any:  # noqa: ARG002
+        self.calls += 1
+        if self.calls <= self.failures:
+            request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+            response = httpx.Response(429, request=request)
+            raise openai.RateLimitError("rate limited", response=response, body=None)
+        data = [type("Item", (), {"embedding": [float(len(text))]}) for text in input]
+        return type("Response", (), {"data": data})
+
+
+class FakeClient:
+    def __init__(self, failures: int = 0) -> None:
+        self.embeddings = FakeEmbeddings(failures)
+
+
+def test_token_bucket_waits_when_exhausted() -> None:
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.wait_time(60) == 0
+    bucket.consume(60)
+    assert 0.9 < bucket.wait_time(1) <= 1.0
+
+
+def test_scheduler_retries_rate_limited_requests() -> None:
+    client = FakeClient(failures=2)
+    scheduler = EmbeddingScheduler(client, "test-model", max_retries=3)  # type: ignore[arg-type]
+
+    async def no_sleep(_: float) -> None:
+        return None
+
+    with patch("app.services.embedding_scheduler.asyncio.sleep", new=no_sleep):
+        result = asyncio.run(scheduler.embed(["ab", "abcd"]))
+
+    assert result == [[2.0], [4.0]]
+    assert client.embeddings.calls == 3
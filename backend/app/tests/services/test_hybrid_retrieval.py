@@ -0,0 +1,75 @@
+import uuid
+from pathlib import Path
+
+from app.core.config import settings
+from app.models.course import Course
+from app.services import hybrid_retrieval
+from app.services.hybrid_retrieval import (
+    RetrievalConfig,
+    reciprocal_rank_fusion,
+    vector_search,
+)
+from app.services.vector_store import LocalVectorStore, course_namespace
+
+
+def _matches(*ids: str) -> list[dict]:
+    return [{"id": id, "score": 0.0, "metadata": {"text": id}} for id in ids]
+
+
+def test_rrf_rewards_agreement_between_legs() -> None:
+    fused = reciprocal_rank_fusion(
+        [(_matches("a", "b", "c"), 1.0), (_matches("c", "d"), 1.0)], k=60
+    )
+    assert [m["id"] for m in fused] == ["c", "a", "b", "d"]
+    assert fused[0]["score"] == 1 / 63 + 1 / 61
+
+
+def test_rrf_weights_shift_the_ranking() -> None:
+    rankings = [(_matches("a"), 1.0), (_matches("b"), 3.0)]
+    assert [m["id"] for m in reciprocal_rank_fusion(rankings, k=60)] == ["b", "a"]
+
+    rankings = [(_matches("a"), 1.0), (_matches("b"), 0.0)]
+    assert [m["id"] for m in reciprocal_rank_fusion(rankings, k=60)] == ["a", "b"]
+
+
+def test_config_uses_course_overrides() -> None:
+    course = Course(name="Physics", retrieval_top_k=8, retrieval_lexical_weight=0.0)
+    config = RetrievalConfig.for_course(course)
+    assert config.top_k == 8
+    assert config.lexical_weight == 0.0
+    assert config.vector_weight == settings.RETRIEVAL_VECTOR_WEIGHT
+
+    assert RetrievalConfig.for_course(None).top_k == settings.RETRIEVAL_TOP_K
+
+
+def test_vector_search_returns_each_match_once(tmp_path: Path, monkeypatch) -> None:
+    course_id = uuid.uuid4()
+    store = LocalVectorStore(str(tmp_path), dimension=2)
+    store.upsert(
+        [
+            {
+                "id": id,
+                "values": values,
+                "metadata": {
+                    "course_id": str(course_id),
+                    "document_id": document_id,
+                    "text": id,
+                },
+            }
+            for id, values, document_id in [
+                ("legacy", [1.0, 0.0], "d1"),
+                ("new", [1.0, 0.2], "d2"),
+            ]
+        ]
+    )
+    monkeypatch.setattr(hybrid_retrieval, "get_vector_store", lambda: store)
+    # The course still has a document from before namespaces
+    monkeypatch.setattr(
+        hybrid_retrieval,
+        "course_namespaces",
+        lambda course_id: [course_namespace(course_id), None],
+    )
+
+    matches = vector_search([1.0, 0.0], course_id, limit=5)
+
+    assert [match["id"] for match in matches] == ["legacy", "new"]
@@ -0,0 +1,134 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from sqlmodel import Session
+
+from app import worker
+from app.core.config import settings
+from app.models.jobs import Job
+from app.schemas.public import JobStatus
+from app.services.job_queue import (
+    claim_next_job,
+    complete_job,
+    enqueue_job,
+    fail_job,
+    get_document_jobs,
+    renew_job_lock,
+)
+
+
+def _unique_kind() -> str:
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def test_enqueue_and_claim_job(db: Session) -> None:
+    kind = _unique_kind()
+    document_id = uuid.uuid4()
+    job = enqueue_job(db, kind, {"value": 1}, document_id=document_id)
+    assert job.status == JobStatus.QUEUED
+    assert job.attempts == 0
+
+    claimed = claim_next_job(db, "worker-1", kinds=[kind])
+    assert claimed
+    assert claimed.id == job.id
+    assert claimed.status == JobStatus.RUNNING
+    assert claimed.attempts == 1
+    assert claimed.locked_by == "worker-1"
+
+    # Already running, nothing left to claim
+    assert claim_next_job(db, "worker-2", kinds=[kind]) is None
+
+    complete_job(db, claimed, "worker-1")
+    jobs = get_document_jobs(db, document_id)
+    assert [j.status for j in jobs] == [JobStatus.SUCCEEDED]
+
+
+def test_failed_job_is_rescheduled_with_backoff(db: Session) -> None:
+    kind = _unique_kind()
+    enqueue_job(db, kind, {}, max_attempts=2)
+
+    claimed = claim_next_job(db, "worker-1", kinds=[kind])
+    assert claimed
+    fail_job(db, claimed, "boom", "worker-1")
+    db.refresh(claimed)
+    assert claimed.status == JobStatus.QUEUED
+    assert claimed.last_error == "boom"
+    assert claimed.run_after > datetime.now(timezone.utc)
+
+    # Not due yet
+    assert claim_next_job(db, "worker-1", kinds=[kind]) is None
+
+
+def test_job_fails_permanently_after_max_attempts(db: Session) -> None:
+    kind = _unique_kind()
+    enqueue_job(db, kind, {}, max_attempts=1)
+
+    claimed = claim_next_job(db, "worker-1", kinds=[kind])
+    assert claimed
+    fail_job(db, claimed, "boom", "worker-1")
+    db.refresh(claimed)
+    assert claimed.status == JobStatus.FAILED
+
+
+def test_running_job_lock_is_renewed_only_by_its_worker(db: Session) -> None:
+    kind = _unique_kind()
+    enqueue_job(db, kind, {})
+
+    claimed = claim_next_job(db, "worker-1", kinds=[kind])
+    assert claimed
+    locked_at = claimed.locked_at
+
+    assert renew_job_lock(db, claimed.id, "worker-1")
+    db.refresh(claimed)
+    assert claimed.locked_at > locked_at
+    assert not renew_job_lock(db, claimed.id, "worker-2")
+
+    complete_job(db, claimed, "worker-1")
+    assert not renew_job_lock(db, claimed.id, "worker-1")
+
+
+def test_reclaimed_job_is_not_finished_by_its_former_worker(db: Session) -> None:
+    kind = _unique_kind()
+    enqueue_job(db, kind, {})
+    claimed = claim_next_job(db, "worker-1", kinds=[kind])
+    assert claimed
+
+    # The lock expired and worker-2 holds the job now
+    assert not complete_job(db, claimed, "worker-2")
+    assert not fail_job(db, claimed, "boom", "worker-2")
+    db.refresh(claimed)
+    assert (claimed.status, claimed.locked_by) == (JobStatus.RUNNING, "worker-1")
+
+    assert complete_job(db, claimed, "worker-1")
+    db.refresh(claimed)
+    assert claimed.status == JobStatus.SUCCEEDED
+
+
+def test_handler_is_cancelled_when_the_lock_is_lost(monkeypatch) -> None:
+    cancelled = asyncio.Event()
+    finished: list[str] = []
+
+    async def handler(_job, _session) -> None:
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    monkeypatch.setitem(worker.HANDLERS, "slow", handler)
+    monkeypatch.setattr(settings, "JOB_HEARTBEAT_SECONDS", 0.01)
+    monkeypatch.setattr(worker, "_renew_lock", lambda _job_id, _worker_id: False)
+    monkeypatch.setattr(
+        worker, "complete_job", lambda *_args: finished.append("complete")
+    )
+    monkeypatch.setattr(worker, "fail_job", lambda *_args: finished.append("fail"))
+    job = Job(kind="slow", status=JobStatus.RUNNING, attempts=1, locked_by="worker-1")
+    session = SimpleNamespace(rollback=lambda: None)
+
+    asyncio.run(asyncio.wait_for(worker.run_job(job, session), timeout=5))
+
+    assert cancelled.is_set()
+    # Whoever reclaimed the job reports its outcome
+    assert finished == []
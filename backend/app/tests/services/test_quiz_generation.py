@@ -0,0 +1,59 @@
+import asyncio
+
+from app.services import quiz_generation
+
+
+def test_batches_run_concurrently_and_report_progress(monkeypatch) -> None:
+    monkeypatch.setattr(quiz_generation, "_semaphore", asyncio.Semaphore(3))
+    running = 0
+    peak = 0
+    reports: list[dict[str, int]] = []
+
+    async def handle(item: int) -> int:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if item == 4:
+            raise RuntimeError("LLM unavailable")
+        return 10
+
+    progress = asyncio.run(
+        quiz_generation.run_quiz_batches(
+            range(8), handle, lambda p: reports.append(p.as_dict())
+        )
+    )
+
+    assert peak == 3
+    assert progress.as_dict() == {
+        "total": 8,
+        "completed": 7,
+        "failed": 1,
+        "quizzes": 70,
+    }
+    assert len(reports) == 8
+    assert reports[-1] == progress.as_dict()
+
+
+def test_request_quizzes_ignores_malformed_responses(monkeypatch) -> None:
+    class Response:
+        def __init__(self, content: str) -> None:
+            message = type("Message", (), {"content": content})
+            self.choices = [type("Choice", (), {"message": message})]
+
+    async def free(_tokens: int) -> None:
+        pass
+
+    contents = iter(['{"quizzes": [{"quiz": "Q"}]}', "not json", '{"quizzes": {}}'])
+
+    async def fake_prompt(_prompt: str) -> Response:
+        return Response(next(contents))
+
+    monkeypatch.setattr(quiz_generation.quiz_rate_limiter, "acquire", free)
+    monkeypatch.setattr(quiz_generation, "get_quiz_prompt", fake_prompt)
+
+    async def run() -> list[list]:
+        return [await quiz_generation.request_quizzes("prompt", 10) for _ in range(3)]
+
+    assert asyncio.run(run()) == [[{"quiz": "Q"}], [], []]
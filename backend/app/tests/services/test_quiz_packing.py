@@ -0,0 +1,190 @@
+import asyncio
+import threading
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlmodel import Session, SQLModel, select
+
+from app import tasks
+from app.models.course import Course
+from app.models.document import Document
+from app.models.embeddings import Chunk
+from app.models.jobs import Job
+from app.models.quizzes import ChunkQuizGeneration, Quiz
+from app.models.user import User
+from app.schemas.public import DifficultyLevel
+from app.services.quiz_generation import QuizGenerationProgress
+
+TABLES = ["users", "course", "document", "chunk", "quiz", "chunkquizgeneration"]
+
+
+def _chunk(text: str, token_count: int | None = None) -> Chunk:
+    return Chunk(
+        id=uuid.uuid4(),
+        document_id=uuid.uuid4(),
+        course_id=uuid.uuid4(),
+        text_content=text,
+        token_count=token_count,
+    )
+
+
+def test_chunks_are_packed_in_order_under_the_limit(monkeypatch) -> None:
+    calls: list[list[str]] = []
+
+    def word_counts(texts):
+        calls.append(list(texts))
+        return [len(text.split()) for text in texts]
+
+    monkeypatch.setattr(tasks, "get_token_counts", word_counts)
+    chunks = [_chunk("a b c"), _chunk("d e"), _chunk("f g h i"), _chunk("j")]
+    ids = [chunk.id for chunk in chunks]
+
+    batches = tasks.pack_chunks(chunks, max_tokens=6)
+
+    assert [batch.chunk_ids for batch in batches] == [ids[:2], ids[2:]]
+    assert [batch.token_count for batch in batches] == [5, 5]
+    assert batches[0].text == "a b c\n\nd e\n\n"
+    # All chunks are tokenized in a single batch call
+    assert len(calls) == 1
+
+
+def test_oversized_chunk_is_skipped(monkeypatch) -> None:
+    monkeypatch.setattr(
+        tasks, "get_token_counts", lambda texts: [len(t.split()) for t in texts]
+    )
+    chunks = [_chunk("a"), _chunk("b c d e f g h"), _chunk("i")]
+    ids = [chunk.id for chunk in chunks]
+
+    batches = tasks.pack_chunks(chunks, max_tokens=6)
+
+    assert [batch.chunk_ids for batch in batches] == [[ids[0], ids[2]]]
+
+
+def test_known_token_counts_are_not_recomputed(monkeypatch) -> None:
+    def fail(_texts):
+        raise AssertionError("chunks were tokenized again")
+
+    monkeypatch.setattr(tasks, "get_token_counts", fail)
+    chunks = [_chunk("a"), _chunk("b"), _chunk("c")]
+    ids = [chunk.id for chunk in chunks]
+
+    batches = tasks.pack_chunks(chunks, max_tokens=6, token_counts=[3, 2, 4])
+
+    assert [batch.chunk_ids for batch in batches] == [ids[:2], ids[2:]]
+
+
+def test_stored_token_counts_are_not_recomputed(monkeypatch) -> None:
+    calls: list[list[str]] = []
+
+    def word_counts(texts):
+        calls.append(list(texts))
+        return [len(text.split()) for text in texts]
+
+    monkeypatch.setattr(tasks, "get_token_counts", word_counts)
+    chunks = [_chunk("a b", token_count=4), _chunk("c d e"), _chunk("f", 1)]
+
+    assert tasks.chunk_token_counts(chunks) == [4, 3, 1]
+    assert calls == [["c d e"]]
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'quizzes.db'}")
+
+    @event.listens_for(engine, "connect")
+    def add_functions(connection, _record) -> None:
+        # For the full-text index on chunk
+        connection.create_function(
+            "to_tsvector", 2, lambda _config, text: text, deterministic=True
+        )
+
+    tables = SQLModel.metadata.tables
+    SQLModel.metadata.create_all(engine, tables=[tables[name] for name in TABLES])
+    # Batches are saved through the module's engine
+    monkeypatch.setattr(tasks, "engine", engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def test_empty_response_fails_its_batch_and_the_retry_resumes(
+    session: Session, monkeypatch
+) -> None:
+    user = User(email="owner@example.com", hashed_password="x")
+    course = Course(name="Calculus", owner_id=user.id)
+    document = Document(title="Notes", filename="notes.pdf", course_id=course.id)
+    # Half the prompt limit each, so every chunk gets its own batch
+    chunks = [
+        Chunk(
+            document_id=document.id,
+            course_id=course.id,
+            text_content=text,
+            embedding_id=str(uuid.uuid4()),
+            token_count=tasks.MAX_PROMPT_TOKENS // 2,
+        )
+        for text in ["limits", "derivatives"]
+    ]
+    session.add_all([user, course, document, *chunks])
+    session.commit()
+    monkeypatch.setattr(tasks, "QUIZ_DIFFICULTY_LEVELS", [DifficultyLevel.EASY])
+    requested: list[str] = []
+    empty = {"limits"}
+
+    async def fake_request(prompt: str, _token_count: int) -> list[dict]:
+        topic = next(
+            chunk.text_content for chunk in chunks if chunk.text_content in prompt
+        )
+        requested.append(topic)
+        if topic in empty:
+            return []
+        quiz = {"quiz": f"What are {topic}?", "correct_answer": "a", "feedback": ""}
+        return [
+            {
+                **quiz,
+                "distraction_1": "b",
+                "distraction_2": "c",
+                "distraction_3": "d",
+                "topic": topic,
+            }
+        ]
+
+    monkeypatch.setattr(tasks, "request_quizzes", fake_request)
+
+    with pytest.raises(RuntimeError, match="1 of 2 quiz batches failed"):
+        asyncio.run(tasks.generate_quizzes_task(document.id, course.id, session))
+    watermarks = session.exec(select(ChunkQuizGeneration.chunk_id)).all()
+    assert watermarks == [chunks[1].id]
+
+    empty.clear()
+    requested.clear()
+    asyncio.run(tasks.generate_quizzes_task(document.id, course.id, session))
+    assert requested == ["limits"]
+    assert len(session.exec(select(Quiz)).all()) == 2
+
+
+def test_job_progress_is_written_off_the_event_loop(monkeypatch) -> None:
+    writes: list[dict[str, int]] = []
+    loop_thread = threading.get_ident()
+
+    def save(_job_id, progress: dict[str, int]) -> None:
+        assert threading.get_ident() != loop_thread
+        writes.append(progress)
+
+    async def three_batches(_document_id, _course_id, _session, on_progress):
+        progress = QuizGenerationProgress(total=3)
+        for _ in range(3):
+            progress.completed += 1
+            on_progress(progress)
+
+    monkeypatch.setattr(tasks, "save_job_progress", save)
+    monkeypatch.setattr(tasks, "generate_quizzes_task", three_batches)
+    job = Job(
+        kind="generate_quizzes",
+        payload={"document_id": str(uuid.uuid4()), "course_id": str(uuid.uuid4())},
+    )
+
+    asyncio.run(tasks.generate_quizzes_job(job, session=None))
+
+    # Reports made while a write is pending collapse into the latest one
+    assert [write["completed"] for write in writes] == [3]
@@ -0,0 +1,63 @@
+import time
+import uuid
+
+from app.services.response_cache import ResponseCache
+
+
+def _unit(i: int, dim: int = 8) -> list[float]:
+    vector = [0.0] * dim
+    vector[i] = 1.0
+    return vector
+
+
+def test_lookup_returns_closest_answer_above_threshold() -> None:
+    cache = ResponseCache(policy="lru", max_entries_per_course=10)
+    course_id = uuid.uuid4()
+    cache.add(course_id, uuid.uuid4(), "q0", "a0", _unit(0))
+    cache.add(course_id, uuid.uuid4(), "q1", "a1", _unit(1))
+
+    assert cache.lookup(course_id, [0.1, 0.9] + [0.0] * 6, 0.85) == ("a1", "q1")
+    assert cache.lookup(course_id, _unit(2), 0.85) is None
+    assert cache.lookup(uuid.uuid4(), _unit(0), 0.85) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_lru_evicts_least_recently_used_per_course() -> None:
+    cache = ResponseCache(policy="lru", max_entries_per_course=2)
+    course_id = uuid.uuid4()
+    other_course = uuid.uuid4()
+    cache.add(course_id, uuid.uuid4(), "q0", "a0", _unit(0))
+    cache.add(course_id, uuid.uuid4(), "q1", "a1", _unit(1))
+    cache.add(other_course, uuid.uuid4(), "q2", "a2", _unit(2))
+
+    assert cache.lookup(course_id, _unit(0), 0.85) == ("a0", "q0")
+    cache.add(course_id, uuid.uuid4(), "q3", "a3", _unit(3))
+
+    assert cache.lookup(course_id, _unit(1), 0.85) is None
+    assert cache.lookup(course_id, _unit(0), 0.85) == ("a0", "q0")
+    assert cache.lookup(other_course, _unit(2), 0.85) == ("a2", "q2")
+    assert cache.stats()["entries"] == 3
+
+
+def test_ttl_expires_entries() -> None:
+    cache = ResponseCache(policy="ttl", max_entries_per_course=10, ttl_seconds=60)
+    course_id = uuid.uuid4()
+    cache.add(course_id, uuid.uuid4(), "q0", "a0", _unit(0))
+    assert cache.lookup(course_id, _unit(0), 0.85) == ("a0", "q0")
+
+    entry = cache._courses[course_id].slots[0]
+    assert entry is not None
+    entry.created_at = time.monotonic() - 120
+
+    assert cache.lookup(course_id, _unit(0), 0.85) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_duplicate_keys_are_ignored() -> None:
+    cache = ResponseCache(policy="lru", max_entries_per_course=10)
+    course_id = uuid.uuid4()
+    key = uuid.uuid4()
+    cache.add(course_id, key, "q0", "a0", _unit(0))
+    cache.add(course_id, key, "q0", "a0", _unit(0))
+
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,208 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sqlmodel import Session, col, delete
+
+from app.models.document import Document
+from app.models.embeddings import EMBEDDING_DIMENSION, Chunk
+from app.services import vector_store
+from app.services.vector_store import (
+    LocalVectorStore,
+    PgVectorStore,
+    PineconeVectorStore,
+    split_batches,
+    upsert_vectors,
+    vector_id,
+)
+from app.tests.utils.course import create_random_course
+
+DIM = 4
+
+
+def _vector(id: str, values: list[float], course_id: str, document_id: str) -> dict:
+    return {
+        "id": id,
+        "values": values,
+        "metadata": {"course_id": course_id, "document_id": document_id, "text": id},
+    }
+
+
+def test_query_ranks_by_cosine_within_filter(tmp_path: Path) -> None:
+    store = LocalVectorStore(str(tmp_path), dimension=DIM)
+    store.upsert(
+        [
+            _vector("a", [1, 0, 0, 0], "c1", "d1"),
+            _vector("b", [3, 3, 0, 0], "c1", "d1"),
+            _vector("c", [0, 0, 1, 0], "c1", "d2"),
+            _vector("d", [1, 0, 0, 0], "c2", "d3"),
+        ]
+    )
+
+    matches = store.query([1, 0.2, 0, 0], top_k=2, filter={"course_id": "c1"})
+    assert [m["id"] for m in matches] == ["a", "b"]
+    assert matches[0]["score"] == pytest.approx(0.98, abs=0.01)
+    assert matches[0]["metadata"]["text"] == "a"
+
+    matches = store.query([0, 0, 1, 0], top_k=5, filter={"document_id": "d2"})
+    assert [m["id"] for m in matches] == ["c"]
+
+
+def test_appends_are_visible_to_other_readers(tmp_path: Path) -> None:
+    writer = LocalVectorStore(str(tmp_path), dimension=DIM)
+    reader = LocalVectorStore(str(tmp_path), dimension=DIM)
+    writer.upsert([_vector("a", [1, 0, 0, 0], "c1", "d1")])
+    assert len(reader.query([0, 1, 0, 0], top_k=5, filter={"course_id": "c1"})) == 1
+
+    writer.upsert([_vector("b", [0, 1, 0, 0], "c1", "d1")])
+    matches = reader.query([0, 1, 0, 0], top_k=5, filter={"course_id": "c1"})
+    assert [m["id"] for m in matches] == ["b", "a"]
+
+
+def test_delete_by_document_and_course(tmp_path: Path) -> None:
+    store = LocalVectorStore(str(tmp_path), dimension=DIM)
+    store.upsert(
+        [
+            _vector("a", [1, 0, 0, 0], "c1", "d1"),
+            _vector("b", [1, 0, 0, 0], "c1", "d2"),
+        ]
+    )
+
+    store.delete(filter={"document_id": "d1"})
+    matches = store.query([1, 0, 0, 0], top_k=5, filter={"course_id": "c1"})
+    assert [m["id"] for m in matches] == ["b"]
+
+    store.delete(filter={"course_id": "c1"})
+    assert store.query([1, 0, 0, 0], top_k=5, filter={"course_id": "c1"}) == []
+
+    with pytest.raises(ValueError):
+        store.delete(filter={})
+    with pytest.raises(ValueError):
+        store.query([1, 0, 0, 0], top_k=5, filter={"owner": "x"})
+
+
+def test_upserts_are_split_by_size_and_count(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(vector_store.settings, "VECTOR_UPSERT_MAX_VECTORS", 3)
+    vectors = [_vector(str(i), [i, 1, 0, 0], "c1", "d1") for i in range(8)]
+
+    batches = split_batches(vectors)
+    assert [len(batch) for batch in batches] == [3, 3, 2]
+    assert [v for batch in batches for v in batch] == vectors
+
+    # One vector is ~150 bytes here
+    monkeypatch.setattr(vector_store.settings, "VECTOR_UPSERT_MAX_BYTES", 300)
+    assert [len(batch) for batch in split_batches(vectors)] == [2, 2, 2, 2]
+
+    store = LocalVectorStore(str(tmp_path), dimension=DIM)
+    asyncio.run(upsert_vectors(store, vectors, namespace="course-c1"))
+    matches = store.query([1, 1, 0, 0], top_k=10, filter={"course_id": "c1"})
+    assert sorted(m["id"] for m in matches) == sorted(v["id"] for v in vectors)
+
+
+def test_pinecone_namespaces_replace_the_course_filter() -> None:
+    course_filter = {"course_id": "c1"}
+    document_filter = {"course_id": "c1", "document_id": "d1"}
+
+    assert PineconeVectorStore._filter(course_filter, None) == course_filter
+    assert PineconeVectorStore._filter(course_filter, "course-c1") is None
+    assert PineconeVectorStore._filter(document_filter, "course-c1") == {
+        "document_id": "d1"
+    }
+
+
+class _FakeIndex:
+    def __init__(self, ids: list[str]) -> None:
+        self.ids = ids
+        self.deletes: list[dict] = []
+
+    def list(self, *, prefix: str, namespace: str):
+        yield [id for id in self.ids if id.startswith(prefix)]
+
+    def delete(self, **kwargs) -> None:
+        self.deletes.append(kwargs)
+
+
+def test_pinecone_deletes_documents_by_id_prefix_in_their_namespace() -> None:
+    document_id, other_id = "d1", "d2"
+    index = _FakeIndex([vector_id(document_id), vector_id(other_id)])
+    store = PineconeVectorStore.__new__(PineconeVectorStore)
+    store.index_name = "test"
+    store.client = SimpleNamespace(
+        has_index=lambda _name: True, Index=lambda _name: index
+    )
+
+    # Found by prefix whether or not their Chunk rows were ever committed
+    store.delete(filter={"document_id": document_id}, namespace="course-c1")
+    store.delete(filter={"course_id": "c1"}, namespace="course-c1")
+    store.delete(filter={"document_id": document_id})
+
+    assert index.deletes == [
+        {"ids": [index.ids[0]], "namespace": "course-c1"},
+        {"delete_all": True, "namespace": "course-c1"},
+        {"filter": {"document_id": document_id}, "namespace": None},
+    ]
+
+
+def test_pgvector_filtered_query_keeps_recall_across_courses(db: Session) -> None:
+    try:
+        store = PgVectorStore()
+    except RuntimeError:
+        pytest.skip("pgvector is not available")
+    rng = np.random.default_rng(0)
+    courses = [create_random_course(db) for _ in range(5)]
+    documents = [
+        Document(title="Notes", filename="notes.pdf", course_id=course.id)
+        for course in courses
+    ]
+    db.add_all(documents)
+    db.commit()
+    vectors, chunks = [], []
+    for document in documents:
+        for _ in range(100):
+            chunk = Chunk(
+                document_id=document.id,
+                course_id=document.course_id,
+                text_content="chunk",
+                embedding_id=vector_id(document.id),
+            )
+            chunks.append(chunk)
+            vectors.append(
+                {
+                    "id": chunk.embedding_id,
+                    "values": rng.standard_normal(EMBEDDING_DIMENSION).tolist(),
+                    "metadata": {
+                        "course_id": str(chunk.course_id),
+                        "document_id": str(chunk.document_id),
+                        "chunk_id": str(chunk.id),
+                    },
+                }
+            )
+    db.add_all(chunks)
+    db.commit()
+    store.upsert(vectors)
+
+    try:
+        course_id = str(courses[0].id)
+        question = rng.standard_normal(EMBEDDING_DIMENSION)
+        own = [v for v in vectors if v["metadata"]["course_id"] == course_id]
+        scores = [
+            np.dot(question, v["values"]) / np.linalg.norm(v["values"]) for v in own
+        ]
+        expected = {own[i]["id"] for i in np.argsort(scores)[::-1][:50]}
+
+        matches = store.query(
+            question.tolist(), top_k=50, filter={"course_id": course_id}
+        )
+
+        # A fifth of the vectors pass the filter; all top_k must still come back
+        assert len(matches) == 50
+        assert len(expected & {m["id"] for m in matches}) >= 45
+    finally:
+        course_ids = [course.id for course in courses]
+        for course in courses:
+            store.delete(filter={"course_id": str(course.id)})
+        db.execute(delete(Chunk).where(col(Chunk.course_id).in_(course_ids)))
+        db.execute(delete(Document).where(col(Document.course_id).in_(course_ids)))
+        db.commit()
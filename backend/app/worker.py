@@ -0,0 +1,175 @@
+"""
+Background worker entry point: `python -m app.worker`
+
+Polls the `job` table and runs document ingestion and quiz generation
+outside of the API processes, so slow PDFs never share an event loop with
+chat streams and queued work survives restarts.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from collections.abc import Awaitable, Callable
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models.jobs import Job
+from app.services.embedding_cache import prune_embedding_cache
+from app.services.ingestion import embed_chunks_job, process_pdf_job
+from app.services.job_queue import (
+    EMBED_CHUNKS_JOB,
+    GENERATE_QUIZZES_JOB,
+    PROCESS_PDF_JOB,
+    claim_next_job,
+    complete_job,
+    fail_job,
+    renew_job_lock,
+)
+from app.services.pdf_extraction import shutdown_extraction_pool
+from app.tasks import generate_quizzes_job
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Job, Session], Awaitable[None]]
+
+HANDLERS: dict[str, JobHandler] = {
+    PROCESS_PDF_JOB: process_pdf_job,
+    GENERATE_QUIZZES_JOB: generate_quizzes_job,
+    EMBED_CHUNKS_JOB: embed_chunks_job,
+}
+
+
+def _renew_lock(job_id: uuid.UUID, worker_id: str) -> bool:
+    with Session(engine) as session:
+        return renew_job_lock(session, job_id, worker_id)
+
+
+async def keep_job_locked(
+    job_id: uuid.UUID, worker_id: str, work: asyncio.Task[None]
+) -> None:
+    """
+    Heartbeat for a running job; runs in its own session until cancelled.
+    Cancels `work` if the lock was lost, since another worker may have
+    reclaimed the job.
+    """
+    while True:
+        await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+        try:
+            renewed = await asyncio.to_thread(_renew_lock, job_id, worker_id)
+        except Exception as e:
+            logger.warning(f"Failed to renew the lock of job {job_id}: {e}")
+            continue
+        if not renewed:
+            logger.warning(f"[{worker_id}] Lost the lock of job {job_id}, stopping it")
+            work.cancel()
+            return
+
+
+async def run_job(job: Job, session: Session) -> None:
+    # Read before the handler runs: its commits expire the job, and a
+    # reloaded locked_by may already name the worker that reclaimed it
+    worker_id = job.locked_by or ""
+    handler = HANDLERS.get(job.kind)
+    if handler is None:
+        job.max_attempts = job.attempts
+        fail_job(
+            session,
+            job,
+            f"No handler registered for job kind '{job.kind}'",
+            worker_id,
+        )
+        return
+
+    work = asyncio.create_task(handler(job, session))
+    heartbeat = asyncio.create_task(keep_job_locked(job.id, worker_id, work))
+    try:
+        await work
+    except asyncio.CancelledError:
+        if not heartbeat.done():
+            # The worker itself is shutting down
+            raise
+        session.rollback()
+    except Exception as e:
+        logger.error(f"Job {job.id} ({job.kind}) raised: {e}", exc_info=True)
+        session.rollback()
+        fail_job(session, job, repr(e), worker_id)
+    else:
+        complete_job(session, job, worker_id)
+    finally:
+        heartbeat.cancel()
+
+
+async def worker_slot(worker_id: str, stop: asyncio.Event) -> None:
+    """Claim and run jobs one at a time until asked to stop"""
+    while not stop.is_set():
+        with Session(engine) as session:
+            job = claim_next_job(session, worker_id)
+            if job is not None:
+                logger.info(f"[{worker_id}] Running job {job.id} ({job.kind})")
+                await run_job(job, session)
+                continue
+
+        try:
+            await asyncio.wait_for(
+                stop.wait(), timeout=settings.JOB_POLL_INTERVAL_SECONDS
+            )
+        except asyncio.TimeoutError:
+            pass
+
+
+def _prune_embedding_cache() -> int:
+    with Session(engine) as session:
+        return prune_embedding_cache(session)
+
+
+async def prune_embedding_cache_periodically(stop: asyncio.Event) -> None:
+    """Keep the persistent embedding cache from growing without bound"""
+    while not stop.is_set():
+        try:
+            pruned = await asyncio.to_thread(_prune_embedding_cache)
+            if pruned:
+                logger.info(f"Pruned {pruned} unused embedding cache entries")
+        except Exception as e:
+            logger.warning(f"Failed to prune the embedding cache: {e}")
+
+        try:
+            await asyncio.wait_for(
+                stop.wait(), timeout=settings.EMBEDDING_CACHE_PRUNE_SECONDS
+            )
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_worker(concurrency: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    base_id = f"{socket.gethostname()}:{os.getpid()}"
+    tasks = [worker_slot(f"{base_id}:{slot}", stop) for slot in range(concurrency)]
+    if settings.EMBEDDING_CACHE_PERSIST and settings.EMBEDDING_CACHE_TTL_DAYS > 0:
+        tasks.append(prune_embedding_cache_periodically(stop))
+    await asyncio.gather(*tasks)
+
+
+def main() -> None:
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    logger.info(
+        f"Starting job worker with concurrency {settings.JOB_WORKER_CONCURRENCY}"
+    )
+    try:
+        asyncio.run(run_worker(settings.JOB_WORKER_CONCURRENCY))
+    finally:
+        shutdown_extraction_pool()
+    logger.info("Job worker stopped")
+
+
+if __name__ == "__main__":
+    main()